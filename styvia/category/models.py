@@ -1,5 +1,6 @@
 from django.db import models
-from django.utils.text import slugify
+
+from core.slugs import unique_slug
 
 # Create your models here.
 
@@ -23,7 +24,7 @@ class MainCategory(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.name)
+            self.slug = unique_slug(self, self.name)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -51,7 +52,9 @@ class SubCategory(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.name)
+            self.slug = unique_slug(
+                self, self.name, queryset=SubCategory.objects.filter(main_category_id=self.main_category_id)
+            )
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -81,7 +84,9 @@ class Category(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.name)
+            self.slug = unique_slug(
+                self, self.name, queryset=Category.objects.filter(sub_category_id=self.sub_category_id)
+            )
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -1,3 +1,61 @@
 from django.contrib import admin
+from django.utils import timezone
+
+from .models import RequestProfile, Task
 
 # Register your models here.
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ["name", "status", "attempts", "max_attempts", "run_after", "created_at", "finished_at"]
+    list_filter = ["status", "name", "created_at"]
+    search_fields = ["name", "last_error"]
+    readonly_fields = [
+        "name", "args", "kwargs", "status", "attempts", "run_after",
+        "started_at", "finished_at", "last_error", "created_at", "updated_at",
+    ]
+    actions = ["retry_tasks"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry_tasks(self, request, queryset):
+        queryset.exclude(status=Task.RUNNING).update(status=Task.QUEUED, attempts=0, run_after=timezone.now())
+    retry_tasks.short_description = "Retry selected tasks"
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = [
+        "view_name", "requests", "average_ms", "max_ms", "average_db_ms", "average_template_ms",
+        "average_queries", "duplicate_queries", "requests_with_duplicates", "updated_at",
+    ]
+    search_fields = ["view_name"]
+    readonly_fields = [
+        "view_name", "requests", "total_ms", "max_ms", "db_ms", "template_ms", "queries",
+        "duplicate_queries", "requests_with_duplicates", "created_at", "updated_at",
+    ]
+    actions = ["reset_profiles"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="Avg ms")
+    def average_ms(self, obj):
+        return round(obj.avg_ms, 1)
+
+    @admin.display(description="Avg DB ms")
+    def average_db_ms(self, obj):
+        return round(obj.avg_db_ms, 1)
+
+    @admin.display(description="Avg template ms")
+    def average_template_ms(self, obj):
+        return round(obj.avg_template_ms, 1)
+
+    @admin.display(description="Avg queries")
+    def average_queries(self, obj):
+        return round(obj.avg_queries, 1)
+
+    def reset_profiles(self, request, queryset):
+        queryset.delete()
+    reset_profiles.short_description = "Reset selected profiles"
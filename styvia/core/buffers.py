@@ -0,0 +1,99 @@
+"""
+Per-process write-behind buffers.
+
+Counters that change on every request (product views, request profiles)
+are tallied in memory and written in bulk every few seconds instead of one
+UPDATE per request. A subclass says how a batch starts (``empty``), grows
+(``add``), is written (``write``, run inside a transaction) and is merged
+back after a failed write (``merge``); WriteBuffer does the locking, the
+flush schedule, keeping a failed batch for the next flush and the final
+flush at interpreter exit.
+"""
+import atexit
+import logging
+import threading
+import time
+import weakref
+
+from django.db import DatabaseError, transaction
+
+logger = logging.getLogger(__name__)
+
+_buffers = weakref.WeakSet()
+
+
+class WriteBuffer:
+    """
+    Tallies in memory, written to the database every ``flush_interval``
+    seconds or once ``max_pending`` keys are waiting, whichever comes first.
+    """
+
+    description = "buffered rows"
+
+    def __init__(self, flush_interval, max_pending=None):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._batch = self.empty()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        _buffers.add(self)
+
+    def empty(self):
+        raise NotImplementedError
+
+    def add(self, batch, *args, **kwargs):
+        raise NotImplementedError
+
+    def merge(self, batch, failed):
+        raise NotImplementedError
+
+    def write(self, batch):
+        raise NotImplementedError
+
+    def record(self, *args, **kwargs):
+        with self._lock:
+            self.add(self._batch, *args, **kwargs)
+            due = (
+                (self.max_pending is not None and len(self._batch) >= self.max_pending)
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return dict(self._batch)
+
+    def clear(self):
+        """Drop the buffered batch without writing it, e.g. between tests."""
+        with self._lock:
+            self._batch = self.empty()
+            self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Write the buffered batch; returns the number of keys written."""
+        with self._lock:
+            batch, self._batch = self._batch, self.empty()
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+
+        try:
+            with transaction.atomic():
+                self.write(batch)
+        except DatabaseError:
+            logger.exception("Could not flush %s %s; keeping them for the next flush", len(batch), self.description)
+            with self._lock:
+                self.merge(self._batch, batch)
+            return 0
+        return len(batch)
+
+
+@atexit.register
+def _flush_on_exit():
+    for buffer in list(_buffers):
+        try:
+            buffer.flush()
+        except Exception:
+            # The database may already be gone at interpreter shutdown.
+            pass
@@ -1,6 +1,13 @@
-from category.models import MainCategory
+from django.utils.functional import SimpleLazyObject
+
+from .navigation import NAV_VERSION, get_menu_tree
+from .versioning import get_version
+
 
 def category_processor(request):
-    
-    main_category = MainCategory.objects.filter(is_active=True).prefetch_related("subcategories__categories").order_by("order")
-    return {"main_categories":main_category}
\ No newline at end of file
+    # Both values are lazy: pages that never render the menu (admin, etc.)
+    # don't touch the cache, and a warm menu fragment never needs the tree.
+    return {
+        "main_categories": SimpleLazyObject(get_menu_tree),
+        "nav_version": SimpleLazyObject(lambda: get_version(NAV_VERSION)),
+    }
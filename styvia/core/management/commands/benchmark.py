@@ -0,0 +1,154 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.pagecache import PAGES_VERSION
+from core.versioning import bump_version
+from store.models import Product
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def benchmark_urls():
+    """(name, url) pairs for the listing, filter, facet, search, product, card fragment and home pages, picked from the data."""
+    product = (
+        Product.objects.filter(
+            is_active=True, product_subcategory__isnull=False, product_category__isnull=False, brand__isnull=False,
+        )
+        .select_related("product_main_category", "product_subcategory", "product_category")
+        .order_by("-view_count", "id")
+        .first()
+    )
+    if product is None:
+        raise CommandError("No active product with a category and brand to benchmark; run seed_catalog first.")
+
+    main = product.product_main_category
+    sub = product.product_subcategory
+    main_url = reverse("products_by_main_cat", args=[main.slug])
+    sub_url = reverse("product_by_sub_cat", args=[main.slug, sub.slug])
+    return [
+        ("home", reverse("home")),
+        ("listing:all", reverse("store")),
+        ("listing:main", main_url),
+        ("listing:sub", sub_url),
+        ("listing:sub:price_asc", f"{sub_url}?sort=price_asc"),
+        ("listing:sub:popularity", f"{sub_url}?sort=popularity"),
+        ("filter:brand", f"{main_url}?brand={product.brand_id}"),
+        ("filter:color", f"{sub_url}?color={product.color_key}"),
+        ("filter:price", f"{sub_url}?price_range=500-1000"),
+        ("filter:discount", f"{sub_url}?discount=30"),
+        ("facets:category", f"{main_url}?subcategory={sub.slug}&category={product.product_category.slug}"),
+        ("search", f"{reverse('store')}?q={product.product_name.split()[-1]}"),
+        ("product", product.get_absolute_url()),
+        ("cards:sub", f"{reverse('product_grid_page')}?main_category={main.slug}&sub_category={sub.slug}"),
+    ]
+
+
+def default_host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != "*"]
+    return hosts[0].lstrip(".") if hosts else "localhost"
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the storefront pages in-process and report latency percentiles and query counts. "
+        "With --baseline, fail when a page got slower or runs more queries than recorded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2, help="Untimed requests per page first.")
+        parser.add_argument("--warm-cache", action="store_true", help="Serve from the page cache instead of rendering each request.")
+        parser.add_argument("--only", action="append", default=[], help="Run benchmarks whose name starts with this; repeatable.")
+        parser.add_argument("--host", default=default_host())
+        parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+        parser.add_argument("--baseline", help="Results file from an earlier --json run to compare against.")
+        parser.add_argument("--max-regression", type=float, default=25.0, help="Allowed p50 slowdown against the baseline, in percent.")
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST=options["host"])
+        urls = [
+            (name, url) for name, url in benchmark_urls()
+            if not options["only"] or any(name.startswith(prefix) for prefix in options["only"])
+        ]
+
+        results = {}
+        self.stdout.write(f"{'benchmark':<24} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'queries':>8}")
+        for name, url in urls:
+            results[name] = self.run(client, url, options)
+            result = results[name]
+            self.stdout.write(
+                f"{name:<24} {result['p50_ms']:>8.1f} {result['p90_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+                f"{result['max_ms']:>8.1f} {result['queries']:>8}"
+            )
+
+        if options["json_path"]:
+            with open(options["json_path"], "w", encoding="utf-8") as stream:
+                json.dump(results, stream, indent=2)
+        if options["baseline"]:
+            self.compare(results, options["baseline"], options["max_regression"])
+
+    def run(self, client, url, options):
+        for _ in range(options["warmup"]):
+            self.get(client, url)
+
+        timings = []
+        queries = []
+        for _ in range(options["iterations"]):
+            if not options["warm_cache"]:
+                # New page-cache tokens, so the view renders instead of hitting the cache.
+                bump_version(PAGES_VERSION)
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                self.get(client, url)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(context.captured_queries))
+
+        timings.sort()
+        return {
+            "url": url,
+            "p50_ms": percentile(timings, 50),
+            "p90_ms": percentile(timings, 90),
+            "p99_ms": percentile(timings, 99),
+            "max_ms": timings[-1],
+            "queries": max(queries),
+        }
+
+    def get(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} returned {response.status_code}")
+        return response
+
+    def compare(self, results, baseline_path, max_regression):
+        try:
+            with open(baseline_path, encoding="utf-8") as stream:
+                baseline = json.load(stream)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Could not read baseline {baseline_path}: {error}")
+
+        failures = []
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            limit = before["p50_ms"] * (1 + max_regression / 100)
+            if result["p50_ms"] > limit:
+                failures.append(f"{name}: p50 {result['p50_ms']:.1f} ms, baseline {before['p50_ms']:.1f} ms")
+            if result["queries"] > before["queries"]:
+                failures.append(f"{name}: {result['queries']} queries, baseline {before['queries']}")
+        if failures:
+            raise CommandError("Performance regressions:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
@@ -0,0 +1,28 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from core.pagecache import PAGES_VERSION
+from core.renditions import save_renditions
+from core.versioning import bump_version
+
+
+class Command(BaseCommand):
+    help = "Generate missing or stale WebP renditions for every model with RENDITION_WIDTHS."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Rebuild renditions that are already up to date.")
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in apps.get_models():
+            if not hasattr(model, "RENDITION_WIDTHS"):
+                continue
+            updated = 0
+            for instance in model.objects.order_by("pk").iterator(chunk_size=200):
+                if save_renditions(instance, force=options["force"]):
+                    updated += 1
+            self.stdout.write(f"{model._meta.label}: {updated} updated")
+            total += updated
+        if total:
+            bump_version(PAGES_VERSION)
+        self.stdout.write(self.style.SUCCESS(f"Updated renditions for {total} objects."))
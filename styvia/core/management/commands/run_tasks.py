@@ -0,0 +1,39 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.tasks import claim_next, purge_finished, requeue_stale, run_task
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (image processing, etc.) until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty instead of polling.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait between polls of an empty queue.")
+        parser.add_argument("--max-tasks", type=int, default=0, help="Exit after running this many tasks (0 = no limit).")
+        parser.add_argument("--keep-days", type=int, default=7, help="Delete done tasks older than this on startup.")
+
+    def handle(self, *args, **options):
+        purged = purge_finished(timedelta(days=options["keep_days"]))
+        requeued = requeue_stale()
+        if purged or requeued:
+            self.stdout.write(f"Purged {purged} finished tasks, requeued {requeued} stale ones.")
+
+        processed = 0
+        try:
+            while not options["max_tasks"] or processed < options["max_tasks"]:
+                task_row = claim_next()
+                if task_row is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["sleep"])
+                    requeue_stale()
+                    continue
+                ok = run_task(task_row)
+                processed += 1
+                self.stdout.write(f"{'done' if ok else 'failed'}: {task_row.name} #{task_row.pk}")
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Ran {processed} tasks."))
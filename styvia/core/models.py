@@ -1,3 +1,85 @@
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
+
+class Task(models.Model):
+    """A unit of background work, run by `manage.py run_tasks`."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=200, help_text="Dotted path of a function registered with @task")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Background task"
+        verbose_name_plural = "Background tasks"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class RequestProfile(models.Model):
+    """Running totals for the sampled requests of one view, written by core.profiling."""
+
+    view_name = models.CharField(max_length=200, unique=True, help_text="URL name, e.g. products_by_main_cat")
+    requests = models.PositiveBigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    db_ms = models.FloatField(default=0)
+    template_ms = models.FloatField(default=0)
+    queries = models.PositiveBigIntegerField(default=0)
+    duplicate_queries = models.PositiveBigIntegerField(default=0, help_text="Repeats of a query already run with the same parameters")
+    requests_with_duplicates = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Request profile"
+        verbose_name_plural = "Request profiles"
+        ordering = ["-total_ms"]
+
+    def __str__(self):
+        return self.view_name
+
+    def _average(self, total):
+        return total / self.requests if self.requests else 0
+
+    @property
+    def avg_ms(self):
+        return self._average(self.total_ms)
+
+    @property
+    def avg_db_ms(self):
+        return self._average(self.db_ms)
+
+    @property
+    def avg_template_ms(self):
+        return self._average(self.template_ms)
+
+    @property
+    def avg_queries(self):
+        return self._average(self.queries)
@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from category.models import Category, MainCategory, SubCategory
+from .versioning import get_version
+
+NAV_VERSION = "nav"
+
+
+def build_menu_tree():
+    """Active MainCategory -> SubCategory -> Category tree as plain, cacheable dicts."""
+    main_categories = MainCategory.objects.filter(is_active=True).order_by("order").prefetch_related(
+        Prefetch(
+            "subcategories",
+            queryset=SubCategory.objects.filter(is_active=True).order_by("order", "name"),
+        ),
+        Prefetch(
+            "subcategories__categories",
+            queryset=Category.objects.filter(is_active=True).order_by("order", "name"),
+        ),
+    )
+    return [
+        {
+            "id": main_category.id,
+            "name": main_category.name,
+            "slug": main_category.slug,
+            "subcategories": [
+                {
+                    "id": sub_category.id,
+                    "name": sub_category.name,
+                    "slug": sub_category.slug,
+                    "categories": [
+                        {"id": category.id, "name": category.name, "slug": category.slug}
+                        for category in sub_category.categories.all()
+                    ],
+                }
+                for sub_category in main_category.subcategories.all()
+            ],
+        }
+        for main_category in main_categories
+    ]
+
+
+def get_menu_tree():
+    key = f"nav:tree:{get_version(NAV_VERSION)}"
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_menu_tree()
+        cache.set(key, tree, None)
+    return tree
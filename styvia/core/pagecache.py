@@ -0,0 +1,133 @@
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .navigation import NAV_VERSION
+from .versioning import get_versions
+
+PAGE_CACHE_TIMEOUT = getattr(settings, "PAGE_CACHE_TIMEOUT", 60 * 60 * 24)
+
+# Version names a cached page can depend on. Every page depends on the nav
+# menu and on PAGES_VERSION (brands, sellers: shown on every listing); the
+# rest narrow invalidation to the listings a change can actually show up in.
+PAGES_VERSION = "pages"
+HOME_VERSION = "pages:home"
+ALL_PRODUCTS_VERSION = "pages:all"
+# Size names and which sizes are active, shown on every product page. Size
+# edits are rare, so they invalidate all product pages at once rather than
+# looking up the products each size reaches.
+SIZES_VERSION = "pages:sizes"
+
+
+def main_category_version(main_category_id):
+    return f"pages:main:{main_category_id}"
+
+
+def sub_category_version(sub_category_id):
+    return f"pages:sub:{sub_category_id}"
+
+
+def product_version(product_id):
+    return f"pages:product:{product_id}"
+
+
+def sorted_params(request):
+    return sorted((key, value) for key, values in request.GET.lists() for value in values)
+
+
+def page_cache_key(request, versions, params):
+    parts = [request.path, urlencode(params), *(f"{name}={versions[name]}" for name in sorted(versions))]
+    return "page:" + hashlib.md5("|".join(parts).encode()).hexdigest()
+
+
+def version_validators(request, versions, params=()):
+    """
+    (ETag, Last-Modified timestamp) for the content at ``request.path``
+    depending on ``versions`` (name -> token, as from get_versions) and
+    ``params``.
+
+    Version tokens are the time they were bumped (see core.versioning), so
+    the newest one is when anything the content shows last changed, and
+    neither validator needs to look at the data itself. Last-Modified has
+    whole seconds only, so it is None while that second is still running: a
+    change later in the same second would carry the same date, and a client
+    revalidating with If-Modified-Since would get a 304 for a stale copy.
+    Until then clients revalidate with the ETag.
+    """
+    parts = [request.path, urlencode(params), *(f"{name}={versions[name]}" for name in sorted(versions))]
+    etag = '"' + hashlib.md5("|".join(parts).encode()).hexdigest() + '"'
+    last_modified = max(int(token, 16) for token in versions.values()) // 10**9
+    if last_modified >= int(time.time()):
+        last_modified = None
+    return etag, last_modified
+
+
+def patch_validators(response, etag, last_modified):
+    """
+    Set the validators from version_validators. ``no-cache`` makes browsers
+    and CDNs revalidate on every use, which is cheap (see
+    cache_page_versions), rather than guess a freshness lifetime from
+    Last-Modified and show a stale page.
+    """
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, public=True, no_cache=True)
+
+
+def cache_page_versions(page_versions, page_params=sorted_params, timeout=PAGE_CACHE_TIMEOUT):
+    """
+    Cache a view's rendered response for anonymous GET requests.
+
+    ``page_versions(request, *args, **kwargs)`` names the versions the page
+    depends on; bumping any of them (see core.versioning) makes every page
+    cached under the old token unreachable, so pages are invalidated as soon
+    as something they show changes instead of when a TTL runs out.
+
+    ``page_params(request)`` returns the query parameters the page depends
+    on, in a canonical order; by default every parameter, sorted.
+
+    The same versions give the page an ETag and Last-Modified, so a
+    conditional request for a page that has not changed gets a 304 after
+    one cache round trip for the tokens, without reading the cached page.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            names = [NAV_VERSION, PAGES_VERSION, *page_versions(request, *args, **kwargs)]
+            versions = get_versions(names)
+            params = page_params(request)
+            etag, last_modified = version_validators(request, versions, params)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                patch_validators(response, etag, last_modified)
+                patch_vary_headers(response, ("Cookie",))
+                return response
+
+            key = page_cache_key(request, versions, params)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                patch_validators(response, etag, last_modified)
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming and not response.cookies:
+                    cache.set(key, (response.content, response["Content-Type"]), timeout)
+                    patch_validators(response, etag, last_modified)
+            patch_vary_headers(response, ("Cookie",))
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,211 @@
+"""
+Opt-in request profiling.
+
+With PROFILING_ENABLED, ProfilingMiddleware samples PROFILING_SAMPLE_RATE of
+requests (staff can force a sample with ``?profile=1``) and measures, per
+request, the SQL queries run, repeats of an identical query, the time spent
+in the database and in rendering templates. Sampled responses shown to
+staff (or with DEBUG) carry the numbers in a ``Server-Timing`` header, which
+browser dev tools display next to the request; requests repeating a query
+PROFILING_DUPLICATE_WARNING times or more are logged with the query, the
+usual sign of an N+1.
+
+Totals per URL name are buffered in memory and added to RequestProfile
+every PROFILING_FLUSH_INTERVAL seconds, so the report in the admin costs
+one small UPDATE per view per interval rather than a write per request.
+"""
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.template.backends.django import Template as DjangoTemplate
+
+from .buffers import WriteBuffer
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = getattr(settings, "PROFILING_ENABLED", False)
+SAMPLE_RATE = getattr(settings, "PROFILING_SAMPLE_RATE", 0.05)
+FLUSH_INTERVAL = getattr(settings, "PROFILING_FLUSH_INTERVAL", 60)
+DUPLICATE_WARNING = getattr(settings, "PROFILING_DUPLICATE_WARNING", 5)
+UNRESOLVED = "(unresolved)"
+
+_current = ContextVar("request_profile", default=None)
+
+
+class RequestStats:
+    """Measurements for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_ms = 0
+        self.db_ms = 0
+        self.template_ms = 0
+        self.queries = Counter()
+        self.rendering = False
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicate_count(self):
+        return sum(count - 1 for count in self.queries.values())
+
+    def most_repeated(self):
+        """(count, sql) of the query run most often with the same parameters."""
+        if not self.queries:
+            return 0, ""
+        (sql, _params), count = self.queries.most_common(1)[0]
+        return count, sql
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - start) * 1000
+            self.queries[(sql, repr(params))] += 1
+
+    def server_timing(self):
+        return ", ".join([
+            f'db;dur={self.db_ms:.1f};desc="{self.query_count} queries, {self.duplicate_count} repeated"',
+            f"tpl;dur={self.template_ms:.1f}",
+            f"total;dur={self.total_ms:.1f}",
+        ])
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        stats = _current.get()
+        if stats is None or stats.rendering:
+            # Not profiled, or a template rendered from inside another one.
+            return render(self, *args, **kwargs)
+        stats.rendering = True
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            # Includes queries run lazily from the template.
+            stats.template_ms += (time.perf_counter() - start) * 1000
+            stats.rendering = False
+
+    wrapper._profiled = True
+    return wrapper
+
+
+def install_template_timer():
+    if not getattr(DjangoTemplate.render, "_profiled", False):
+        DjangoTemplate.render = _timed_render(DjangoTemplate.render)
+
+
+class ProfileBuffer(WriteBuffer):
+    """Per-process totals per view name, added to RequestProfile in bulk."""
+
+    FIELDS = ("requests", "total_ms", "db_ms", "template_ms", "queries", "duplicate_queries", "requests_with_duplicates")
+    description = "request profiles"
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        super().__init__(flush_interval)
+
+    def empty(self):
+        return defaultdict(Counter)
+
+    def add(self, batch, view_name, stats):
+        totals = batch[view_name]
+        totals["requests"] += 1
+        totals["total_ms"] += stats.total_ms
+        totals["db_ms"] += stats.db_ms
+        totals["template_ms"] += stats.template_ms
+        totals["queries"] += stats.query_count
+        totals["duplicate_queries"] += stats.duplicate_count
+        totals["requests_with_duplicates"] += 1 if stats.duplicate_count else 0
+        totals["max_ms"] = max(totals["max_ms"], stats.total_ms)
+
+    def merge(self, batch, failed):
+        for name, values in failed.items():
+            totals = batch[name]
+            max_ms = max(totals["max_ms"], values["max_ms"])
+            totals.update(values)
+            totals["max_ms"] = max_ms
+
+    def pending(self):
+        with self._lock:
+            return {name: dict(totals) for name, totals in self._batch.items()}
+
+    def write(self, batch):
+        from .models import RequestProfile
+
+        RequestProfile.objects.bulk_create(
+            [RequestProfile(view_name=name) for name in batch], ignore_conflicts=True
+        )
+        for name, values in batch.items():
+            RequestProfile.objects.filter(view_name=name).update(
+                max_ms=Greatest(F("max_ms"), values["max_ms"]),
+                **{field: F(field) + values[field] for field in self.FIELDS},
+            )
+
+
+profiles = ProfileBuffer()
+
+
+def _is_staff(request):
+    user = getattr(request, "user", None)
+    return bool(user and user.is_staff)
+
+
+class ProfilingMiddleware:
+    """
+    Samples requests and records their query count, DB time and template time.
+
+    Listed right after AuthenticationMiddleware so ``?profile=1`` can be
+    limited to staff before anything is instrumented; the total covers the
+    view and the middleware listed after it. It removes itself at startup
+    unless PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_template_timer()
+
+    def __call__(self, request):
+        sampled = random.random() < SAMPLE_RATE
+        # ?profile=1 forces a sample for staff only. request.user is lazy, so
+        # other requests don't pay for loading it here.
+        forced = request.GET.get("profile") == "1" and _is_staff(request)
+        if not sampled and not forced:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats.record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        stats.total_ms = (time.perf_counter() - stats.started) * 1000
+
+        match = request.resolver_match
+        view_name = (match.view_name if match else None) or UNRESOLVED
+        count, sql = stats.most_repeated()
+        if count >= DUPLICATE_WARNING:
+            logger.warning("%s ran the same query %s times: %s", view_name, count, sql)
+        if settings.DEBUG or forced or _is_staff(request):
+            response["Server-Timing"] = stats.server_timing()
+        profiles.record(view_name, stats)
+        return response
+
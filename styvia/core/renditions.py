@@ -0,0 +1,190 @@
+import posixpath
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+from .tasks import task
+
+RENDITION_FORMAT = "WEBP"
+RENDITION_QUALITY = 80
+RENDITION_DIR = "renditions"
+
+# Sent with ``instance`` after a background task rewrote an object's images
+# or manifest, so cached pages showing it can be invalidated.
+renditions_updated = Signal()
+
+
+def rendition_name(original_name, width):
+    """Deterministic storage name of one rendition, e.g. renditions/products/images/shirt-640w.webp."""
+    directory, filename = posixpath.split(original_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(RENDITION_DIR, directory, f"{stem}-{width}w.webp")
+
+
+def build_renditions(field_file, widths):
+    """
+    Write resized WebP copies of ``field_file`` and return its manifest entry.
+
+    Widths larger than the original are skipped. The entry records names, not
+    URLs, so templates get URLs from the storage without opening any file.
+    """
+    storage = field_file.storage
+    field_file.open("rb")
+    try:
+        with Image.open(field_file) as source:
+            image = ImageOps.exif_transpose(source)
+            image.load()
+    finally:
+        field_file.close()
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if image.mode in ("LA", "PA") or "transparency" in image.info else "RGB")
+
+    sources = {}
+    for width in sorted(widths):
+        if width >= image.width:
+            continue
+        height = round(image.height * width / image.width)
+        buffer = BytesIO()
+        image.resize((width, height), Image.LANCZOS).save(buffer, RENDITION_FORMAT, quality=RENDITION_QUALITY)
+        name = rendition_name(field_file.name, width)
+        if storage.exists(name):
+            storage.delete(name)
+        sources[str(width)] = storage.save(name, ContentFile(buffer.getvalue()))
+
+    return {"original": field_file.name, "width": image.width, "height": image.height, "sources": sources}
+
+
+def delete_renditions(storage, entry):
+    for name in entry.get("sources", {}).values():
+        storage.delete(name)
+
+
+def strip_metadata(field_file):
+    """
+    Rewrite an upload without its EXIF block (camera, GPS, ...), applying the
+    EXIF orientation first. Returns True when the file was rewritten.
+    """
+    field_file.open("rb")
+    try:
+        with Image.open(field_file) as source:
+            if not source.getexif():
+                return False
+            image_format = source.format
+            image = ImageOps.exif_transpose(source)
+            image.load()
+    finally:
+        field_file.close()
+
+    buffer = BytesIO()
+    save_options = {"quality": 90} if image_format in ("JPEG", "WEBP") else {}
+    image.save(buffer, image_format, **save_options)
+    storage = field_file.storage
+    name = field_file.name
+    storage.delete(name)
+    field_file.name = storage.save(name, ContentFile(buffer.getvalue()))
+    return True
+
+
+def renditions_stale(instance):
+    """True when some image field has no manifest entry for its current file."""
+    manifest = instance.renditions or {}
+    for field_name in instance.RENDITION_WIDTHS:
+        field_file = getattr(instance, field_name)
+        entry = manifest.get(field_name)
+        if (entry.get("original") if entry else None) != (field_file.name or None):
+            return True
+    return False
+
+
+def queue_renditions(instance):
+    """Hand image post-processing for ``instance`` to the background queue if anything changed."""
+    if renditions_stale(instance):
+        process_images.delay(instance._meta.label, instance.pk)
+
+
+@task
+def process_images(model_label, pk):
+    """Strip metadata from new uploads and (re)build their renditions."""
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+
+    manifest = instance.renditions or {}
+    renamed = {}
+    for field_name in instance.RENDITION_WIDTHS:
+        field_file = getattr(instance, field_name)
+        entry = manifest.get(field_name)
+        if field_file and (not entry or entry.get("original") != field_file.name):
+            original_name = field_file.name
+            if strip_metadata(field_file) and field_file.name != original_name:
+                renamed[field_name] = field_file.name
+
+    if refresh_renditions(instance) or renamed:
+        model.objects.filter(pk=pk).update(renditions=instance.renditions, **renamed)
+        renditions_updated.send(sender=model, instance=instance)
+
+
+def refresh_renditions(instance, force=False):
+    """
+    Bring ``instance.renditions`` in line with its image fields.
+
+    Fields listed in the model's RENDITION_WIDTHS are rebuilt when their file
+    changed since the manifest was written (or always with ``force``).
+    Renditions of replaced or cleared files are deleted. Returns True when the
+    manifest changed and needs saving.
+    """
+    manifest = dict(instance.renditions or {})
+    changed = False
+    for field_name, widths in instance.RENDITION_WIDTHS.items():
+        field_file = getattr(instance, field_name)
+        entry = manifest.get(field_name)
+        if entry and (force or entry.get("original") != field_file.name):
+            delete_renditions(field_file.storage, entry)
+            del manifest[field_name]
+            changed = True
+        if field_file and field_name not in manifest:
+            try:
+                manifest[field_name] = build_renditions(field_file, widths)
+            except (OSError, ValueError):
+                # Missing or unreadable upload: templates fall back to the original.
+                continue
+            changed = True
+    if changed:
+        instance.renditions = manifest
+    return changed
+
+
+def save_renditions(instance, force=False):
+    """Refresh the manifest and store it with an UPDATE, without calling save() again."""
+    if refresh_renditions(instance, force=force):
+        type(instance).objects.filter(pk=instance.pk).update(renditions=instance.renditions)
+        return True
+    return False
+
+
+def srcset(field_file, entry):
+    """``srcset`` value for a field: every rendition plus the original at its real width."""
+    if not field_file:
+        return ""
+    if not entry or entry.get("original") != field_file.name:
+        return ""
+    storage = field_file.storage
+    candidates = [f"{storage.url(name)} {width}w" for width, name in sorted(entry["sources"].items(), key=lambda item: int(item[0]))]
+    candidates.append(f"{field_file.url} {entry['width']}w")
+    return ", ".join(candidates)
+
+
+def rendition_url(field_file, entry, width):
+    """URL of the smallest rendition at least ``width`` wide, or of the original."""
+    if not field_file:
+        return ""
+    if entry and entry.get("original") == field_file.name:
+        for rendition_width, name in sorted(entry["sources"].items(), key=lambda item: int(item[0])):
+            if int(rendition_width) >= width:
+                return field_file.storage.url(name)
+    return field_file.url
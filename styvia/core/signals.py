@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from category.models import Category, MainCategory, SubCategory
+from design.models import Hero, MainCategoryBanner, MainCategoryBannerImage
+from .navigation import NAV_VERSION
+from .pagecache import HOME_VERSION, main_category_version
+from .renditions import renditions_updated
+from .versioning import bump_version
+
+
+@receiver(post_save, sender=MainCategory)
+@receiver(post_save, sender=SubCategory)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=MainCategory)
+@receiver(post_delete, sender=SubCategory)
+@receiver(post_delete, sender=Category)
+def invalidate_navigation(sender, **kwargs):
+    bump_version(NAV_VERSION)
+
+
+@receiver(post_save, sender=Hero)
+@receiver(post_delete, sender=Hero)
+@receiver(renditions_updated, sender=Hero)
+def invalidate_home_page(sender, **kwargs):
+    bump_version(HOME_VERSION)
+
+
+@receiver(post_save, sender=MainCategoryBanner)
+@receiver(post_delete, sender=MainCategoryBanner)
+@receiver(post_save, sender=MainCategoryBannerImage)
+@receiver(post_delete, sender=MainCategoryBannerImage)
+@receiver(renditions_updated, sender=MainCategoryBannerImage)
+def invalidate_banner_pages(sender, instance, **kwargs):
+    if sender is MainCategoryBanner:
+        main_category_id = instance.main_category_id
+    else:
+        main_category_id = (
+            MainCategoryBanner.objects.filter(pk=instance.banner_id).values_list("main_category_id", flat=True).first()
+        )
+    if main_category_id:
+        bump_version(main_category_version(main_category_id))
@@ -0,0 +1,68 @@
+"""
+Unique slug allocation.
+
+A name whose slug is taken gets the next free numeric suffix: "basic-tee",
+then "basic-tee-2", "basic-tee-3", ... The taken suffixes are read with one
+prefix query on the (indexed) slug column, and imports allocate a whole
+batch of slugs with a query per hundred distinct names, so saving a
+duplicate name never ends in an IntegrityError and a retry.
+"""
+import re
+
+from django.db.models import Q
+from django.utils.text import slugify
+
+SUFFIX_RE = re.compile(r"-(\d+)$")
+# Room kept at the end of a long slug for "-" plus the suffix.
+SUFFIX_ROOM = 6
+BASES_PER_QUERY = 100
+
+
+def slug_base(value, max_length, fallback="item"):
+    return slugify(value)[:max_length - SUFFIX_ROOM].strip("-") or fallback
+
+
+def unique_slugs(queryset, values, field_name="slug", fallback=None):
+    """
+    Free slugs for a batch of new objects, in the order of ``values``.
+
+    ``queryset`` holds the rows the slugs must not clash with, e.g. the
+    subcategories of one main category. Equal values within the batch get
+    consecutive suffixes.
+    """
+    max_length = queryset.model._meta.get_field(field_name).max_length
+    fallback = fallback or queryset.model._meta.model_name
+    bases = [slug_base(value, max_length, fallback) for value in values]
+
+    next_suffix = {}
+    distinct = sorted(set(bases))
+    # Grouped so the OR of prefix lookups stays within SQLite's expression depth limit.
+    for start in range(0, len(distinct), BASES_PER_QUERY):
+        group = set(distinct[start:start + BASES_PER_QUERY])
+        condition = Q()
+        for base in group:
+            condition |= Q(**{field_name: base}) | Q(**{f"{field_name}__startswith": f"{base}-"})
+        for slug in queryset.filter(condition).values_list(field_name, flat=True):
+            if slug in group:
+                next_suffix[slug] = max(next_suffix.get(slug, 1), 2)
+                continue
+            match = SUFFIX_RE.search(slug)
+            if match and slug[:match.start()] in group:
+                base = slug[:match.start()]
+                next_suffix[base] = max(next_suffix.get(base, 1), int(match.group(1)) + 1)
+
+    slugs = []
+    for base in bases:
+        suffix = next_suffix.get(base)
+        slugs.append(base if suffix is None else f"{base}-{suffix}")
+        next_suffix[base] = (suffix or 1) + 1
+    return slugs
+
+
+def unique_slug(instance, value, field_name="slug", queryset=None):
+    """Free slug for ``instance``; ``queryset`` narrows the rows it must be unique among."""
+    if queryset is None:
+        queryset = type(instance)._default_manager.all()
+    if instance.pk is not None:
+        queryset = queryset.exclude(pk=instance.pk)
+    return unique_slugs(queryset, [value], field_name)[0]
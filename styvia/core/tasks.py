@@ -0,0 +1,140 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Retry n waits RETRY_BASE_DELAY * 2**(n-1) seconds, up to RETRY_MAX_DELAY.
+RETRY_BASE_DELAY = getattr(settings, "TASKS_RETRY_BASE_DELAY", 30)
+RETRY_MAX_DELAY = getattr(settings, "TASKS_RETRY_MAX_DELAY", 60 * 60)
+# A task still "running" after this long is assumed to belong to a dead worker.
+STALE_AFTER = timedelta(seconds=getattr(settings, "TASKS_STALE_AFTER", 15 * 60))
+# Run tasks inline instead of queueing them (for tests and local setups without a worker).
+ALWAYS_EAGER = getattr(settings, "TASKS_ALWAYS_EAGER", False)
+
+_registry = {}
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def task(func):
+    """
+    Register ``func`` as a background task and give it ``func.delay(*args, **kwargs)``.
+
+    Arguments must be JSON serializable; pass primary keys, not model instances.
+    """
+    name = f"{func.__module__}.{func.__name__}"
+    _registry[name] = func
+    func.task_name = name
+    func.delay = lambda *args, **kwargs: enqueue(name, *args, **kwargs)
+    return func
+
+
+def enqueue(name, *args, **kwargs):
+    """
+    Queue a registered task. The row is written in the caller's transaction, so
+    a worker never sees a task for data that was rolled back.
+    """
+    if ALWAYS_EAGER:
+        transaction.on_commit(lambda: get_task(name)(*args, **kwargs))
+        return None
+    return Task.objects.create(name=name, args=list(args), kwargs=kwargs)
+
+
+def enqueue_many(name, arg_lists):
+    """Queue one task per argument list with a single INSERT, e.g. after a bulk import."""
+    if ALWAYS_EAGER:
+        for args in arg_lists:
+            enqueue(name, *args)
+        return []
+    return Task.objects.bulk_create([Task(name=name, args=list(args)) for args in arg_lists], batch_size=500)
+
+
+def get_task(name):
+    if name not in _registry:
+        # Importing the module runs its @task decorators.
+        try:
+            import_string(name)
+        except ImportError:
+            pass
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownTask(name) from None
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+
+def requeue_stale():
+    """Put tasks abandoned by a crashed worker back in the queue."""
+    return Task.objects.filter(status=Task.RUNNING, started_at__lt=timezone.now() - STALE_AFTER).update(
+        status=Task.QUEUED, run_after=timezone.now()
+    )
+
+
+def claim_next():
+    """
+    Atomically take the oldest due task, or return None.
+
+    The claim is a conditional UPDATE on the queued status, so two workers
+    racing for the same row cannot both win, without needing SELECT ... FOR
+    UPDATE SKIP LOCKED (which SQLite lacks).
+    """
+    now = timezone.now()
+    while True:
+        task_id = (
+            Task.objects.filter(status=Task.QUEUED, run_after__lte=now)
+            .order_by("run_after", "id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if task_id is None:
+            return None
+        claimed = Task.objects.filter(pk=task_id, status=Task.QUEUED).update(
+            status=Task.RUNNING, started_at=now, attempts=F("attempts") + 1
+        )
+        if claimed:
+            return Task.objects.get(pk=task_id)
+
+
+def run_task(task_row):
+    """Run one claimed task and record the outcome; failures are retried with backoff."""
+    try:
+        func = get_task(task_row.name)
+        with transaction.atomic():
+            func(*task_row.args, **task_row.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("Task %s failed (attempt %s)", task_row, task_row.attempts)
+        if task_row.attempts < task_row.max_attempts:
+            Task.objects.filter(pk=task_row.pk).update(
+                status=Task.QUEUED, run_after=timezone.now() + retry_delay(task_row.attempts),
+                last_error=error, updated_at=timezone.now(),
+            )
+        else:
+            Task.objects.filter(pk=task_row.pk).update(
+                status=Task.FAILED, finished_at=timezone.now(), last_error=error, updated_at=timezone.now(),
+            )
+        return False
+
+    Task.objects.filter(pk=task_row.pk).update(
+        status=Task.DONE, finished_at=timezone.now(), last_error="", updated_at=timezone.now()
+    )
+    return True
+
+
+def purge_finished(older_than):
+    """Delete done tasks that finished before ``now - older_than``; failed ones are kept for inspection."""
+    return Task.objects.filter(status=Task.DONE, finished_at__lt=timezone.now() - older_than).delete()[0]
@@ -0,0 +1,22 @@
+from django import template
+
+from core.renditions import rendition_url, srcset
+
+register = template.Library()
+
+
+@register.filter
+def image_srcset(obj, field_name):
+    """{{ product_image|image_srcset:"image" }} -> "…-320w.webp 320w, …, original.jpg 1600w"."""
+    if obj is None:
+        return ""
+    return srcset(getattr(obj, field_name), (obj.renditions or {}).get(field_name))
+
+
+@register.filter
+def image_url(obj, spec):
+    """{{ brand|image_url:"brand_logo:240" }} -> URL of the smallest rendition at least 240px wide."""
+    if obj is None:
+        return ""
+    field_name, _, width = spec.partition(":")
+    return rendition_url(getattr(obj, field_name), (obj.renditions or {}).get(field_name), int(width or 0))
@@ -1,3 +1,182 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from category.models import MainCategory, SubCategory
+from . import profiling
+from .models import RequestProfile, Task
+from .slugs import SUFFIX_ROOM, unique_slug, unique_slugs
+from .tasks import claim_next, run_task, task
+
+calls = []
+
+
+@task
+def record_call(value):
+    calls.append(value)
+
+
+@task
+def always_fail():
+    raise ValueError("broken image")
+
+
+@mock.patch("core.profiling.PROFILING_ENABLED", True)
+@mock.patch("core.profiling.SAMPLE_RATE", 0)
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        # The module-wide buffer is flushed at exit, after the test database is gone.
+        profiling.profiles.clear()
+        self.addCleanup(profiling.profiles.clear)
+
+    def get(self, user):
+        request = RequestFactory().get("/", {"profile": "1"})
+        request.user = user
+        self.instrumented = None
+
+        def view(request):
+            self.instrumented = profiling._current.get() is not None
+            return HttpResponse("ok")
+
+        return profiling.ProfilingMiddleware(view)(request)
+
+    def test_profile_parameter_is_ignored_for_other_users(self):
+        for user in (AnonymousUser(), User(username="shopper")):
+            with self.subTest(user=user):
+                self.assertNotIn("Server-Timing", self.get(user))
+                self.assertFalse(self.instrumented)
+        self.assertEqual(profiling.profiles.pending(), {})
+
+    def test_staff_can_force_a_sample(self):
+        response = self.get(User(username="admin", is_staff=True))
+        self.assertTrue(self.instrumented)
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertEqual(profiling.profiles.pending()[profiling.UNRESOLVED]["requests"], 1)
+
+
+class ProfileBufferTests(TestCase):
+    def stats(self, total_ms):
+        stats = profiling.RequestStats()
+        stats.total_ms = total_ms
+        return stats
+
+    def test_flush_adds_to_existing_totals(self):
+        buffer = profiling.ProfileBuffer(flush_interval=3600)
+        buffer.record("home", self.stats(10))
+        buffer.record("home", self.stats(30))
+        self.assertEqual(buffer.flush(), 1)
+        buffer.record("home", self.stats(20))
+        buffer.flush()
+        profile = RequestProfile.objects.get(view_name="home")
+        self.assertEqual((profile.requests, profile.total_ms, profile.max_ms), (3, 60, 30))
+
+    def test_failed_write_is_kept_for_the_next_flush(self):
+        buffer = profiling.ProfileBuffer(flush_interval=3600)
+        buffer.record("home", self.stats(40))
+        with mock.patch.object(buffer, "write", side_effect=DatabaseError), self.assertLogs("core.buffers"):
+            self.assertEqual(buffer.flush(), 0)
+        buffer.record("home", self.stats(10))
+        self.assertEqual(buffer.pending()["home"]["requests"], 2)
+        self.assertEqual(buffer.pending()["home"]["max_ms"], 40)
+        buffer.flush()
+        self.assertEqual(RequestProfile.objects.get(view_name="home").requests, 2)
+
+
+class SlugTests(TestCase):
+    def test_taken_slugs_get_the_next_free_suffix(self):
+        first = MainCategory.objects.create(name="Basic Tee")
+        second = MainCategory.objects.create(name="Basic tee!")
+        MainCategory.objects.create(name="Old", slug="basic-tee-9")
+        MainCategory.objects.create(name="Basic Teeshirt")
+        self.assertEqual((first.slug, second.slug), ("basic-tee", "basic-tee-2"))
+        self.assertEqual(MainCategory.objects.create(name="basic TEE").slug, "basic-tee-10")
+
+    def test_batches_number_equal_names_consecutively(self):
+        MainCategory.objects.create(name="Shirts")
+        slugs = unique_slugs(MainCategory.objects.all(), ["Shirts", "Jeans", "Shirts", "!!!", "Jeans"])
+        self.assertEqual(slugs, ["shirts-2", "jeans", "shirts-3", "maincategory", "jeans-2"])
+
+    def test_an_instance_keeps_its_own_slug(self):
+        category = MainCategory.objects.create(name="Shoes")
+        self.assertEqual(unique_slug(category, "Shoes"), "shoes")
+
+    def test_queryset_narrows_the_clash_check(self):
+        men = MainCategory.objects.create(name="Men")
+        women = MainCategory.objects.create(name="Women")
+        SubCategory.objects.create(main_category=men, name="Topwear")
+        self.assertEqual(SubCategory.objects.create(main_category=women, name="Topwear").slug, "topwear")
+        self.assertEqual(SubCategory.objects.create(main_category=men, name="Topwear").slug, "topwear-2")
+
+    def test_long_names_leave_room_for_a_suffix(self):
+        slugs = unique_slugs(MainCategory.objects.all(), ["x" * 200, "x" * 200])
+        max_length = MainCategory._meta.get_field("slug").max_length
+        self.assertEqual(len(slugs[0]), max_length - SUFFIX_ROOM)
+        self.assertEqual(slugs[1], f"{slugs[0]}-2")
+        self.assertEqual(unique_slugs(MainCategory.objects.all(), ["a" * 93 + " b"]), ["a" * 93])
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_a_claimed_task_is_not_claimed_again(self):
+        first = record_call.delay(1)
+        second = record_call.delay(2)
+        claimed = claim_next()
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (first.pk, Task.RUNNING, 1))
+        self.assertEqual(claim_next().pk, second.pk)
+        self.assertIsNone(claim_next())
+
+    def test_a_lost_race_moves_on_to_the_next_task(self):
+        first = record_call.delay(1)
+        second = record_call.delay(2)
+        original_first = QuerySet.first
+
+        def first_then_lose_the_race(queryset):
+            # Another worker claims the row between our SELECT and UPDATE.
+            task_id = original_first(queryset)
+            if task_id == first.pk:
+                Task.objects.filter(pk=task_id).update(status=Task.RUNNING, attempts=1)
+            return task_id
+
+        with mock.patch.object(QuerySet, "first", autospec=True, side_effect=first_then_lose_the_race):
+            self.assertEqual(claim_next().pk, second.pk)
+        self.assertEqual(Task.objects.get(pk=first.pk).attempts, 1)
+
+    def test_run_tasks_runs_each_task_once(self):
+        record_call.delay(1)
+        record_call.delay(2)
+        out = StringIO()
+        call_command("run_tasks", "--once", stdout=out)
+        call_command("run_tasks", "--once", stdout=out)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(set(Task.objects.values_list("status", flat=True)), {Task.DONE})
+        self.assertIn("Ran 2 tasks.", out.getvalue())
+
+    def test_failures_are_retried_until_the_attempt_limit(self):
+        queued = always_fail.delay()
+        Task.objects.filter(pk=queued.pk).update(max_attempts=2)
+
+        with self.assertLogs("core.tasks"):
+            self.assertFalse(run_task(claim_next()))
+        retry = Task.objects.get(pk=queued.pk)
+        self.assertEqual((retry.status, retry.attempts), (Task.QUEUED, 1))
+        self.assertIn("ValueError: broken image", retry.last_error)
+        self.assertGreater(retry.run_after, timezone.now())
+        self.assertIsNone(claim_next())
+
+        Task.objects.filter(pk=queued.pk).update(run_after=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs("core.tasks"):
+            self.assertFalse(run_task(claim_next()))
+        failed = Task.objects.get(pk=queued.pk)
+        self.assertEqual((failed.status, failed.attempts), (Task.FAILED, 2))
+        self.assertIsNotNone(failed.finished_at)
+        self.assertIsNone(claim_next())
@@ -0,0 +1,45 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY_PREFIX = "version:"
+
+
+def _new_token():
+    # Time based rather than a counter, so a token lost to cache eviction is
+    # never handed out again for different content.
+    return format(time.time_ns(), "x")
+
+
+def get_version(name):
+    """Current version token for a named piece of cached content."""
+    key = VERSION_KEY_PREFIX + name
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_token(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(names):
+    """Version tokens for several names, fetched in one cache round trip."""
+    keys = {name: VERSION_KEY_PREFIX + name for name in names}
+    found = cache.get_many(keys.values())
+    return {name: found.get(key) or get_version(name) for name, key in keys.items()}
+
+
+def bump_version(*names):
+    """
+    Invalidate everything cached under ``names`` once the current transaction commits.
+
+    Returns the new tokens so a process that already applied the change to
+    its own in-memory state can mark that state as current.
+    """
+    tokens = {name: _new_token() for name in names}
+
+    def bump():
+        cache.set_many({VERSION_KEY_PREFIX + name: token for name, token in tokens.items()}, None)
+
+    transaction.on_commit(bump)
+    return tokens
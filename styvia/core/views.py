@@ -2,9 +2,11 @@ from django.shortcuts import render
 from store.models import Brand
 from design.models import Hero
 from store.models import Product
+from .pagecache import HOME_VERSION, cache_page_versions
 # Create your views here.
+@cache_page_versions(lambda request: [HOME_VERSION])
 def home(request):
     hero_images = Hero.objects.filter(is_active=True).order_by("-created_at")
     brands = Brand.objects.filter(is_active=True, is_popular=True)
-    popular_products = Product.objects.filter(is_featured=True).prefetch_related("variants", "product_images").select_related("brand", "seller")
+    popular_products = Product.objects.filter(is_featured=True).select_related("brand", "primary_image")
     return render(request, "core/html/home.html", {"hero_images":hero_images, "brands":brands, "popular_products":popular_products})
\ No newline at end of file
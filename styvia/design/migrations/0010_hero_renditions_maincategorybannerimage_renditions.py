@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('design', '0009_alter_hero_desktop_image_maincategorybanner_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hero',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='maincategorybannerimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 from category.models import MainCategory
+from core.renditions import queue_renditions
 # Create your models here.
 class Hero(models.Model):
     title = models.CharField(max_length=50, help_text="Hero banner title")
@@ -9,9 +10,12 @@ class Hero(models.Model):
     is_active = models.BooleanField(default=True)
     order = models.PositiveIntegerField(default=0)
     link = models.URLField(max_length=200, null=True, blank=True)
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    RENDITION_WIDTHS = {"desktop_image": (960, 1440), "mobile_image": (480, 768)}
+
     class Meta:
         verbose_name = "Hero banner"
         verbose_name_plural = "Hero banners"
@@ -22,6 +26,10 @@ class Hero(models.Model):
         
     def __str__(self):
         return f"{self.title}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        queue_renditions(self)
     
     def clean(self):
         if self.is_active:
@@ -53,9 +61,12 @@ class MainCategoryBannerImage(models.Model):
     link = models.URLField(max_length=200, blank=True)
     order = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    RENDITION_WIDTHS = {"image": (768, 1280)}
+
     class Meta:
         verbose_name = "Main category banner image"
         verbose_name_plural = "Main category banner images"
@@ -72,6 +83,10 @@ class MainCategoryBannerImage(models.Model):
 
     def __str__(self):
         return f"{self.banner.main_category.name} - images"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        queue_renditions(self)
     
 
     
\ No newline at end of file
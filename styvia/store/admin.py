@@ -1,10 +1,12 @@
 from django.contrib import admin
-from .models import Brand,Seller,ProductVariant,ProductImage,Product
+from .models import Brand,Seller,ProductVariant,ProductImage,Product,StockReservation
 from sizemanager.models import Size, SizeGroup
 from django import forms
+from django.core.exceptions import ValidationError
 from django.contrib import messages
 from django.http import HttpResponseRedirect
 from django.urls import reverse
+from .search import get_search_backend
 # Register your models here.
 
 class ProductVariantInlineForm(forms.ModelForm):
@@ -13,6 +15,30 @@ class ProductVariantInlineForm(forms.ModelForm):
         model = ProductVariant
         fields = '__all__'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if "stock" in self.fields:
+            # Posts back the stock the form showed; on a bound form
+            # self.initial is re-read from the database, not what was shown.
+            self.fields["stock"].show_hidden_initial = True
+
+    def displayed_stock(self):
+        """The stock value the form was rendered with, or None if it was not posted."""
+        field = self.fields["stock"]
+        value = field.hidden_widget().value_from_datadict(self.data, self.files, self.add_initial_prefix("stock"))
+        try:
+            return field.to_python(value)
+        except ValidationError:
+            return None
+
+    def save(self, commit=True):
+        if self.instance.pk and "stock" in self.cleaned_data:
+            # Checkouts change stock while the form is open; apply the edit as a difference.
+            displayed = self.displayed_stock()
+            if displayed is not None:
+                self.instance._stock_delta = self.cleaned_data["stock"] - displayed
+        return super().save(commit)
+
 @admin.register(Brand)
 class BrandAdmin(admin.ModelAdmin):
     list_display = ["brand_name", "is_active", "is_popular", "created_at"]
@@ -103,8 +129,8 @@ class ProductImageInline(admin.TabularInline):
 class ProductAdmin(admin.ModelAdmin):
     list_display = ["product_name", "product_type", "brand", "seller","base_price", "color", "sale_price","is_active", "is_featured","view_count","created_on"]
     list_editable = ["is_active", "is_featured"]
-    list_filter = ["product_type", "color", "is_active", "is_featured", "brand","product_main_category","created_on"]
-    search_fields = ["product_name", "sku", "description", "brand__brand_name", "color"]
+    list_filter = ["product_type", "color_family", "is_active", "is_featured", "brand","product_main_category","created_on"]
+    search_fields = ["product_name", "sku"]
     prepopulated_fields = {"slug": ("product_name",)}
     readonly_fields = ["sku", "view_count", "created_on", "updated_on"]
     autocomplete_fields = ["brand", "seller", "product_main_category", "product_subcategory", "product_category"]
@@ -132,6 +158,15 @@ class ProductAdmin(admin.ModelAdmin):
         })
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Name/SKU lookups plus the full-text index (description, brand, categories, color)
+        # instead of icontains scans over every text column.
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        product_ids = get_search_backend().search(search_term, limit=1000) if search_term else []
+        if product_ids:
+            results |= queryset.filter(pk__in=product_ids)
+        return results, may_have_duplicates
+
     def get_inline_instances(self, request, obj=None):
         if not obj:
             return []
@@ -174,6 +209,10 @@ class ProductVariantAdmin(admin.ModelAdmin):
         })
     )
 
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault("form", ProductVariantInlineForm)
+        return super().get_changelist_form(request, **kwargs)
+
 
 @admin.register(ProductImage)
 class ProductImageAdmin(admin.ModelAdmin):
@@ -197,4 +236,16 @@ class ProductImageAdmin(admin.ModelAdmin):
 
 
 
-    
\ No newline at end of file
+    
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ["variant", "quantity", "status", "token", "expires_at", "created_at"]
+    list_filter = ["status", "created_at"]
+    search_fields = ["token", "variant__sku", "variant__product__product_name"]
+    list_select_related = ["variant__product", "variant__size"]
+    readonly_fields = ["token", "variant", "quantity", "status", "expires_at", "created_at", "updated_at"]
+
+    def has_add_permission(self, request):
+        return False
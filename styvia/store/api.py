@@ -0,0 +1,267 @@
+"""
+Read-only JSON API for the storefront.
+
+Listings take the same filter parameters as the HTML listings
+(subcategory, category, brand, color, price_range, discount, q, sort),
+scoped with ``main_category`` / ``sub_category`` slugs instead of the URL
+path, and page with the same keyset cursors. ``fields`` picks the product
+fields to return (``?fields=id,name,price``); listings then only load the
+columns those fields need.
+
+Responses carry an ETag and Last-Modified built from the page-cache
+versions the data depends on (see core.pagecache.version_validators), so a
+client revalidating an unchanged listing gets a 304 without the listing
+being queried.
+"""
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response
+
+from core.navigation import NAV_VERSION
+from core.pagecache import PAGES_VERSION, SIZES_VERSION, patch_validators, product_version, version_validators
+from core.renditions import rendition_url, srcset
+from core.versioning import get_versions
+from .facets import get_facets
+from .filters import FilterSpec
+from .listings import listing_cursor, listing_ordering, listing_products, resolve_scope, scope_params, scope_version
+from .models import Product
+from .pagination import KeysetPaginator
+from .popularity import record_view
+from .views import product_detail_queryset
+
+API_PAGE_SIZE = 24
+MAX_API_PAGE_SIZE = 100
+
+
+def _decimal(value):
+    return str(value) if value is not None else None
+
+
+def _image(image, width):
+    if image is None:
+        return None
+    entry = (image.renditions or {}).get("image")
+    return {
+        "url": rendition_url(image.image, entry, width),
+        "srcset": srcset(image.image, entry),
+        "alt": image.alt_text,
+    }
+
+
+def _brand(brand):
+    return {"id": brand.pk, "name": brand.brand_name, "slug": brand.slug} if brand else None
+
+
+def _named(obj):
+    return {"name": obj.name, "slug": obj.slug} if obj else None
+
+
+# Listing fields: name -> (columns to load, value).
+PRODUCT_FIELDS = {
+    "id": (("id",), lambda product: product.pk),
+    "slug": (("slug",), lambda product: product.slug),
+    "url": (("slug",), lambda product: product.get_absolute_url()),
+    "name": (("product_name",), lambda product: product.product_name),
+    "brand": (("brand", "brand__brand_name", "brand__slug"), lambda product: _brand(product.brand)),
+    "color": (("color", "color_key"), lambda product: {"name": product.color, "key": product.color_key}),
+    "price": (("effective_price", "sale_price", "base_price"), lambda product: _decimal(product.current_price)),
+    "base_price": (("base_price",), lambda product: _decimal(product.base_price)),
+    "sale_price": (("sale_price",), lambda product: _decimal(product.sale_price)),
+    "discount_percent": (("discount_percent",), lambda product: product.discount_percent),
+    "image": (
+        ("primary_image", "primary_image__image", "primary_image__alt_text", "primary_image__renditions"),
+        lambda product: _image(product.primary_image, 640),
+    ),
+}
+DEFAULT_LIST_FIELDS = ("id", "url", "name", "brand", "price", "base_price", "discount_percent", "image")
+
+# Detail-only fields, read from product_detail_queryset().
+DETAIL_FIELDS = {
+    "detailed_name": lambda product: product.product_detailed_name,
+    "description": lambda product: product.description,
+    "seller": lambda product: {"name": product.seller.business_name} if product.seller else None,
+    "categories": lambda product: {
+        "main": _named(product.product_main_category),
+        "sub": _named(product.product_subcategory),
+        "category": _named(product.product_category),
+    },
+    "images": lambda product: [_image(image, 960) for image in product.product_images.all()],
+    "sizes": lambda product: [
+        {
+            "size": option["size"].name if option["size"] else option["variant"].size_display,
+            "variant_id": option["variant"].pk if option["variant"] else None,
+            "price": _decimal(option["price"]),
+            "in_stock": option["in_stock"],
+        }
+        for option in product.get_size_options()
+    ],
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+def parse_fields(value, available, default):
+    """Requested field names in a canonical order; raises BadRequest for unknown ones."""
+    if not value:
+        return tuple(default)
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names - set(available)
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in available if name in names)
+
+
+def parse_limit(value):
+    if not value:
+        return API_PAGE_SIZE
+    try:
+        return min(max(int(value), 1), MAX_API_PAGE_SIZE)
+    except ValueError:
+        raise BadRequest("limit must be a number")
+
+
+def conditional_json(request, version_names, params, build):
+    """
+    JsonResponse of ``build()`` with validators from ``version_names``, or a
+    304 without calling ``build`` when the client's copy is current.
+    """
+    versions = get_versions([NAV_VERSION, PAGES_VERSION, *version_names])
+    etag, last_modified = version_validators(request, versions, params)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(build())
+    patch_validators(response, etag, last_modified)
+    return response
+
+
+def api_view(view):
+    """GET/HEAD only; BadRequest becomes a 400 and Http404 a JSON 404."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return _error("Method not allowed", status=405)
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as error:
+            return _error(str(error))
+        except Http404 as error:
+            return _error(str(error) or "Not found", status=404)
+
+    return wrapper
+
+
+@api_view
+def product_list(request):
+    """
+    A page of products: ``results``, ``next_cursor`` and ``previous_cursor``,
+    plus ``count`` on the first page only.
+    """
+    main, sub = resolve_scope(request.GET)
+    filters = FilterSpec.from_querydict(request.GET)
+    fields = parse_fields(request.GET.get("fields"), PRODUCT_FIELDS, DEFAULT_LIST_FIELDS)
+    limit = parse_limit(request.GET.get("limit"))
+    cursor = listing_cursor(request.GET.get("cursor"), filters)
+    params = [
+        *scope_params(main, sub), *filters.query_items(),
+        ("fields", ",".join(fields)), ("limit", limit), ("cursor", cursor),
+    ]
+
+    def build():
+        products = listing_products(main, sub, filters)
+        ordering = listing_ordering(filters)
+
+        columns = {name.lstrip("-") for name in ordering if name != "search_rank"}
+        for name in fields:
+            columns.update(PRODUCT_FIELDS[name][0])
+        related = [name for name in ("brand", "primary_image") if name in columns]
+        paginator = KeysetPaginator(
+            products.select_related(*related).only(*columns), ordering, per_page=limit
+        )
+        page = paginator.get_page(cursor or None)
+        data = {
+            "results": [{name: PRODUCT_FIELDS[name][1](product) for name in fields} for product in page],
+            "next_cursor": page.next_cursor,
+            "previous_cursor": page.previous_cursor,
+        }
+        if not cursor:
+            data["count"] = products.count()
+        return data
+
+    return conditional_json(request, [scope_version(main, sub)], params, build)
+
+
+@api_view
+def product_detail(request, product_slug):
+    """One product with its sizes, prices per size, availability and images."""
+    available = (*PRODUCT_FIELDS, *DETAIL_FIELDS)
+    fields = parse_fields(request.GET.get("fields"), available, available)
+    product_id = Product.objects.filter(slug=product_slug, is_active=True).values_list("pk", flat=True).first()
+    if product_id is None:
+        raise Http404("No such product")
+    record_view(product_id)
+
+    def build():
+        product = product_detail_queryset().filter(pk=product_id).first()
+        if product is None:
+            raise Http404("No such product")
+        data = {}
+        for name in fields:
+            value = DETAIL_FIELDS.get(name) or PRODUCT_FIELDS[name][1]
+            data[name] = value(product)
+        return data
+
+    return conditional_json(request, [product_version(product_id), SIZES_VERSION], [("fields", ",".join(fields))], build)
+
+
+@api_view
+def facets(request):
+    """
+    Filter sidebar data for a scope: brand and colour counts, price and
+    discount bands, and the subcategories and categories to filter by.
+    Counts narrow to the selected ``subcategory`` / ``category`` slugs, as
+    on the HTML listings.
+    """
+    main, sub = resolve_scope(request.GET)
+    filters = FilterSpec.from_querydict(request.GET)
+    params = [
+        *scope_params(main, sub),
+        *[("subcategory", slug) for slug in filters.subcategories],
+        *[("category", slug) for slug in filters.categories],
+    ]
+
+    def build():
+        if sub:
+            subcategories = [sub]
+        else:
+            subcategories = main["subcategories"] if main else []
+        if main and not sub and filters.subcategories:
+            selected = [entry for entry in subcategories if entry["slug"] in filters.subcategories]
+        else:
+            selected = subcategories
+        categories = [category for entry in selected for category in entry["categories"]]
+
+        if filters.categories and (main or sub):
+            data = get_facets("category", [c["id"] for c in categories if c["slug"] in filters.categories])
+        elif sub:
+            data = get_facets("sub", [sub["id"]])
+        elif main and filters.subcategories:
+            data = get_facets("sub", [entry["id"] for entry in selected])
+        elif main:
+            data = get_facets("main", [main["id"]])
+        else:
+            data = get_facets()
+        data = dict(data)
+        data["subcategories"] = [
+            {"name": entry["name"], "slug": entry["slug"]} for entry in subcategories
+        ] if main and not sub else []
+        data["categories"] = [{"name": c["name"], "slug": c["slug"]} for c in categories]
+        return data
+
+    return conditional_json(request, [scope_version(main, sub)], params, build)
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import api
+
+urlpatterns = [
+    path("products/", api.product_list, name="api_product_list"),
+    path("products/<slug:product_slug>/", api.product_detail, name="api_product_detail"),
+    path("facets/", api.facets, name="api_facets"),
+]
@@ -0,0 +1,60 @@
+"""
+Pre-rendered product cards.
+
+Listing and home pages render their product cards through
+``{% product_cards products %}``: the HTML of each card is cached under a
+fingerprint of everything the card shows (name, link, prices, brand, primary
+image and its renditions) plus the card template's source, so a card is
+rendered once and reused until one of those changes; there is nothing to
+invalidate. A page fetches all its cards in one cache round trip and only
+renders the missing ones.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+
+CARD_TEMPLATES = {
+    "grid": "store/partials/product_card.html",
+    "compact": "store/partials/product_card_compact.html",
+}
+CARD_CACHE_TIMEOUT = getattr(settings, "PRODUCT_CARD_CACHE_TIMEOUT", 60 * 60 * 24)
+
+_template_digests = {}
+
+
+def _template(style):
+    template = get_template(CARD_TEMPLATES[style])
+    if style not in _template_digests:
+        # Deploying a changed card template changes every card's key.
+        _template_digests[style] = hashlib.md5(template.template.source.encode()).hexdigest()[:8]
+    return template, _template_digests[style]
+
+
+def card_fingerprint(product):
+    image = product.primary_image
+    brand = product.brand
+    parts = (
+        product.pk, product.product_name, product.slug, product.base_price, product.sale_price, product.effective_price,
+        brand.brand_name if brand else None,
+        (image.image.name, image.alt_text, image.renditions) if image else None,
+    )
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def render_product_cards(products, style="grid"):
+    """HTML of every product's card, in order; products need brand and primary_image loaded."""
+    template, template_digest = _template(style)
+    keys = [f"card:{style}:{template_digest}:{card_fingerprint(product)}" for product in products]
+    cached = cache.get_many(keys)
+    missing = {}
+    cards = []
+    for product, key in zip(products, keys):
+        html = cached.get(key)
+        if html is None:
+            html = missing[key] = template.render({"product": product})
+        cards.append(html)
+    if missing:
+        cache.set_many(missing, CARD_CACHE_TIMEOUT)
+    return cards
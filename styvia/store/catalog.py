@@ -0,0 +1,466 @@
+"""
+Streaming catalog import/export.
+
+One record per product, with its variants and image references nested:
+
+    {"sku": "MEN-TSH-BLA-00042", "name": "Basic Tee", "description": "...",
+     "color": "Black", "product_type": "topwear", "brand": "Nike",
+     "seller": "acme-traders", "main_category": "men", "subcategory": "topwear",
+     "category": "t-shirts", "size_group": "Apparel", "base_price": "999.00",
+     "sale_price": "799.00", "is_active": true, "is_featured": false,
+     "variants": [{"size": "M", "stock": 10, "price_adjustment": "0"}],
+     "images": [{"path": "products/images/tee.jpg", "alt_text": "", "order": 0}]}
+
+JSONL files hold one such object per line. CSV files hold one product per
+row with the same columns; ``variants`` is written as
+``size:stock[:price_adjustment]`` items joined by ``;`` and ``images`` as
+storage paths joined by ``|``.
+
+Rows are matched to existing products by ``sku``; rows without one create
+products. Records are processed in chunks, each chunk in one transaction
+with a fixed number of queries, so memory stays bounded by the chunk size.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+
+from category.models import Category, MainCategory, SubCategory
+from core.pagecache import PAGES_VERSION
+from core.slugs import unique_slugs
+from core.tasks import enqueue_many
+from core.versioning import bump_version
+from sizemanager.models import Size, SizeGroup
+from .facets import rebuild_facets
+from .models import Brand, Product, ProductImage, ProductVariant, Seller
+from .search import get_search_backend, indexable_products
+from .skus import assign_product_skus, assign_variant_skus
+from .suggest import invalidate_suggestions
+
+CHUNK_SIZE = 1000
+
+PRODUCT_COLUMNS = [
+    "sku", "name", "detailed_name", "description", "color", "product_type", "brand", "seller",
+    "main_category", "subcategory", "category", "size_group", "base_price", "sale_price",
+    "is_active", "is_featured", "variants", "images",
+]
+PRODUCT_TYPES = {value for value, _label in Product._meta.get_field("product_type").choices}
+
+# Product fields an import may overwrite on an existing product.
+UPDATE_FIELDS = [
+    "product_name", "product_detailed_name", "description", "color", "color_key", "color_family",
+    "product_type", "brand", "seller", "product_main_category", "product_subcategory",
+    "product_category", "size_group", "base_price", "sale_price", "effective_price", "discount_percent",
+    "is_active", "is_featured",
+]
+
+
+class RecordError(ValueError):
+    pass
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# Reading and writing files
+
+def read_records(stream, file_format):
+    """Yield (line_number, record) pairs from a CSV or JSONL text stream."""
+    if file_format == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as error:
+                yield line_number, RecordError(f"invalid JSON: {error}")
+        return
+
+    for line_number, row in enumerate(csv.DictReader(stream), start=2):
+        record = {key: value for key, value in row.items() if key is not None}
+        record["variants"] = [_parse_csv_variant(item) for item in (row.get("variants") or "").split(";") if item.strip()]
+        record["images"] = [{"path": path.strip(), "order": order} for order, path in enumerate((row.get("images") or "").split("|")) if path.strip()]
+        yield line_number, record
+
+
+def _parse_csv_variant(item):
+    size, _, rest = item.strip().partition(":")
+    stock, _, price_adjustment = rest.partition(":")
+    return {"size": size, "stock": stock or 0, "price_adjustment": price_adjustment or 0}
+
+
+def write_records(stream, file_format, records):
+    if file_format == "jsonl":
+        for record in records:
+            stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return
+
+    writer = csv.DictWriter(stream, fieldnames=PRODUCT_COLUMNS)
+    writer.writeheader()
+    for record in records:
+        row = dict(record)
+        row["variants"] = ";".join(
+            f"{variant['size']}:{variant['stock']}:{variant['price_adjustment']}" for variant in record["variants"]
+        )
+        row["images"] = "|".join(image["path"] for image in record["images"])
+        writer.writerow(row)
+
+
+# Export
+
+def export_records(queryset=None, chunk_size=CHUNK_SIZE):
+    """Yield export records, reading products a chunk at a time with their variants and images."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    queryset = queryset.select_related(
+        "brand", "seller", "product_main_category", "product_subcategory", "product_category", "size_group",
+    ).prefetch_related("variants__size", "product_images").order_by("pk")
+    for product in queryset.iterator(chunk_size=chunk_size):
+        yield product_record(product)
+
+
+def product_record(product):
+    return {
+        "sku": product.sku,
+        "name": product.product_name,
+        "detailed_name": product.product_detailed_name or "",
+        "description": product.description,
+        "color": product.color,
+        "product_type": product.product_type,
+        "brand": product.brand.brand_name if product.brand else "",
+        "seller": product.seller.slug if product.seller else "",
+        "main_category": product.product_main_category.slug if product.product_main_category else "",
+        "subcategory": product.product_subcategory.slug if product.product_subcategory else "",
+        "category": product.product_category.slug if product.product_category else "",
+        "size_group": product.size_group.name if product.size_group else "",
+        "base_price": str(product.base_price),
+        "sale_price": str(product.sale_price) if product.sale_price is not None else "",
+        "is_active": product.is_active,
+        "is_featured": product.is_featured,
+        "variants": [
+            {
+                "sku": variant.sku,
+                "size": variant.size.name if variant.size else "",
+                "size_display": variant.size_display,
+                "stock": variant.stock,
+                "price_adjustment": str(variant.price_adjustment),
+                "is_active": variant.is_active,
+            }
+            for variant in product.variants.all()
+        ],
+        "images": [
+            {"path": image.image.name, "alt_text": image.alt_text, "is_primary": image.is_primary, "order": image.order}
+            for image in product.product_images.all()
+        ],
+    }
+
+
+# Import
+
+class Lookups:
+    """Every brand, seller, category and size keyed the way import files name them, loaded once."""
+
+    def __init__(self, create_brands=False, dry_run=False):
+        self.create_brands = create_brands
+        self.dry_run = dry_run
+        self.brands = {brand.brand_name.lower(): brand for brand in Brand.objects.all()}
+        self.sellers = {seller.slug: seller for seller in Seller.objects.all()}
+        self.main_categories = {main.slug: main for main in MainCategory.objects.all()}
+        self.subcategories = {
+            (sub.main_category_id, sub.slug): sub for sub in SubCategory.objects.all()
+        }
+        self.categories = {
+            (category.sub_category_id, category.slug): category for category in Category.objects.all()
+        }
+        self.size_groups = {group.name.lower(): group for group in SizeGroup.objects.all()}
+        self.sizes = {(size.group_id, size.name.lower()): size for size in Size.objects.all()}
+
+    def brand(self, name):
+        if not name:
+            return None
+        brand = self.brands.get(name.lower())
+        if brand is None:
+            if not self.create_brands:
+                raise RecordError(f"unknown brand {name!r}")
+            brand = Brand(brand_name=name) if self.dry_run else Brand.objects.create(brand_name=name)
+            self.brands[name.lower()] = brand
+        return brand
+
+    def seller(self, slug):
+        if not slug:
+            return None
+        try:
+            return self.sellers[slug]
+        except KeyError:
+            raise RecordError(f"unknown seller {slug!r}") from None
+
+    def categories_for(self, main_slug, sub_slug, category_slug):
+        main = sub = category = None
+        if main_slug:
+            main = self.main_categories.get(main_slug)
+            if main is None:
+                raise RecordError(f"unknown main category {main_slug!r}")
+        if sub_slug:
+            sub = self.subcategories.get((main.pk if main else None, sub_slug))
+            if sub is None:
+                raise RecordError(f"unknown subcategory {sub_slug!r} in {main_slug!r}")
+        if category_slug:
+            category = self.categories.get((sub.pk if sub else None, category_slug))
+            if category is None:
+                raise RecordError(f"unknown category {category_slug!r} in {sub_slug!r}")
+        return main, sub, category
+
+    def size_group(self, name):
+        if not name:
+            return None
+        try:
+            return self.size_groups[name.lower()]
+        except KeyError:
+            raise RecordError(f"unknown size group {name!r}") from None
+
+    def size(self, group, name):
+        if group is None:
+            raise RecordError("variants need a size_group")
+        try:
+            return self.sizes[(group.pk, str(name).lower())]
+        except KeyError:
+            raise RecordError(f"unknown size {name!r} in {group.name!r}") from None
+
+
+def _decimal(value, field, required=False):
+    if value in (None, ""):
+        if required:
+            raise RecordError(f"{field} is required")
+        return None
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise RecordError(f"{field} is not a number: {value!r}") from None
+
+
+def _bool(value, default):
+    if value in (None, ""):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def _int(value, field):
+    try:
+        number = int(value or 0)
+    except (TypeError, ValueError):
+        raise RecordError(f"{field} is not a whole number: {value!r}") from None
+    if number < 0:
+        raise RecordError(f"{field} cannot be negative")
+    return number
+
+
+def parse_record(record, lookups):
+    """Validate one record into (product field values, variant dicts, image dicts)."""
+    if isinstance(record, Exception):
+        raise record
+    name = (record.get("name") or "").strip()
+    if not name:
+        raise RecordError("name is required")
+    color = (record.get("color") or "").strip()
+    if not color:
+        raise RecordError("color is required")
+    product_type = record.get("product_type") or "topwear"
+    if product_type not in PRODUCT_TYPES:
+        raise RecordError(f"unknown product_type {product_type!r}")
+
+    main, sub, category = lookups.categories_for(
+        record.get("main_category"), record.get("subcategory"), record.get("category")
+    )
+    size_group = lookups.size_group(record.get("size_group"))
+    fields = {
+        "sku": (record.get("sku") or "").strip(),
+        "product_name": name[:200],
+        "product_detailed_name": (record.get("detailed_name") or None),
+        "description": record.get("description") or "",
+        "color": color[:50],
+        "product_type": product_type,
+        "brand": lookups.brand(record.get("brand")),
+        "seller": lookups.seller(record.get("seller")),
+        "product_main_category": main,
+        "product_subcategory": sub,
+        "product_category": category,
+        "size_group": size_group,
+        "base_price": _decimal(record.get("base_price"), "base_price", required=True),
+        "sale_price": _decimal(record.get("sale_price"), "sale_price"),
+        "is_active": _bool(record.get("is_active"), True),
+        "is_featured": _bool(record.get("is_featured"), False),
+    }
+
+    variants = {}
+    for variant in record.get("variants") or []:
+        size = lookups.size(size_group, variant.get("size"))
+        variants[size.pk] = {
+            "size": size,
+            "size_display": variant.get("size_display") or "",
+            "stock": _int(variant.get("stock"), "stock"),
+            "price_adjustment": _decimal(variant.get("price_adjustment"), "price_adjustment") or Decimal("0"),
+            "is_active": _bool(variant.get("is_active"), True),
+        }
+
+    images = [
+        {
+            "path": image["path"],
+            "alt_text": image.get("alt_text") or "",
+            "is_primary": _bool(image.get("is_primary"), False),
+            "order": _int(image.get("order"), "order"),
+        }
+        for image in record.get("images") or []
+        if image.get("path")
+    ]
+    return fields, list(variants.values()), images
+
+
+def _column_values(product):
+    return [getattr(product, Product._meta.get_field(name).attname) for name in UPDATE_FIELDS]
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.variants = 0
+        self.images = 0
+        self.errors = []
+
+    @property
+    def skipped(self):
+        return len(self.errors)
+
+
+def import_chunk(rows, lookups, result, dry_run=False, queue_images=True):
+    """Import one chunk of (line_number, record) pairs."""
+    parsed = []
+    seen_skus = set()
+    for line_number, record in rows:
+        try:
+            fields, variants, images = parse_record(record, lookups)
+            if fields["sku"] in seen_skus:
+                raise RecordError(f"sku {fields['sku']!r} appears twice in the same chunk")
+        except RecordError as error:
+            result.errors.append((line_number, str(error)))
+            continue
+        if fields["sku"]:
+            seen_skus.add(fields["sku"])
+        parsed.append((fields, variants, images))
+    if dry_run or not parsed:
+        return
+
+    with transaction.atomic():
+        existing = Product.objects.in_bulk(
+            [fields["sku"] for fields, _variants, _images in parsed if fields["sku"]], field_name="sku"
+        )
+        new_products, changed_products, products = [], [], []
+        for fields, _variants, _images in parsed:
+            product = existing.get(fields["sku"])
+            if product is None:
+                product = Product(**fields)
+                new_products.append(product)
+            else:
+                before = _column_values(product)
+                for name, value in fields.items():
+                    setattr(product, name, value)
+            # save() is bypassed, so derive its stored columns here.
+            product.refresh_pricing()
+            product.refresh_color()
+            if product.pk and _column_values(product) != before:
+                # Rewriting unchanged rows is most of the cost of re-importing an export.
+                changed_products.append(product)
+            products.append(product)
+
+        if new_products:
+            assign_product_skus(new_products)
+            for product, slug in zip(new_products, unique_slugs(Product.objects.all(), [product.product_name for product in new_products])):
+                product.slug = slug
+            Product.objects.bulk_create(new_products, batch_size=500)
+        if changed_products:
+            Product.objects.bulk_update(changed_products, UPDATE_FIELDS, batch_size=500)
+
+        _import_variants(products, parsed, result)
+        _import_images(products, parsed, result, queue_images)
+        Product.objects.filter(pk__in=[product.pk for product in products]).refresh_primary_images()
+
+    result.created += len(new_products)
+    result.updated += len(products) - len(new_products)
+    # bulk writes send no signals: index the chunk here, facets once at the end.
+    get_search_backend().index_products(indexable_products(Product.objects.filter(pk__in=[product.pk for product in products])))
+
+
+def _import_variants(products, parsed, result):
+    existing = {
+        (variant.product_id, variant.size_id): variant
+        for variant in ProductVariant.objects.filter(product__in=products)
+    }
+    new_variants, changed_variants = [], []
+    for product, (_fields, variants, _images) in zip(products, parsed):
+        for values in variants:
+            variant = existing.get((product.pk, values["size"].pk))
+            if variant is None:
+                new_variants.append(ProductVariant(product=product, **values))
+            elif any(getattr(variant, name) != value for name, value in values.items()):
+                for name, value in values.items():
+                    setattr(variant, name, value)
+                changed_variants.append(variant)
+
+    if new_variants:
+        assign_variant_skus(new_variants)
+        ProductVariant.objects.bulk_create(new_variants, batch_size=500)
+    if changed_variants:
+        ProductVariant.objects.bulk_update(
+            changed_variants, ["size_display", "stock", "price_adjustment", "is_active"], batch_size=500
+        )
+    result.variants += len(new_variants) + len(changed_variants)
+
+
+def _import_images(products, parsed, result, queue_images=True):
+    existing = set(
+        ProductImage.objects.filter(product__in=products).values_list("product_id", "image")
+    )
+    new_images = []
+    for product, (_fields, _variants, images) in zip(products, parsed):
+        for values in images:
+            if (product.pk, values["path"]) in existing:
+                continue
+            existing.add((product.pk, values["path"]))
+            new_images.append(ProductImage(
+                product=product, image=values["path"], alt_text=values["alt_text"],
+                is_primary=values["is_primary"], order=values["order"],
+            ))
+    if new_images:
+        ProductImage.objects.bulk_create(new_images, batch_size=500)
+    if new_images and queue_images:
+        # save() would have queued these one by one.
+        enqueue_many(
+            "core.renditions.process_images", [[ProductImage._meta.label, image.pk] for image in new_images]
+        )
+    result.images += len(new_images)
+
+
+def import_records(records, chunk_size=CHUNK_SIZE, create_brands=False, dry_run=False, progress=None, queue_images=True):
+    """
+    Import (line_number, record) pairs chunk by chunk and return an ImportResult.
+
+    With ``queue_images=False`` new images get no background processing; the
+    caller builds their renditions itself.
+    """
+    lookups = Lookups(create_brands=create_brands, dry_run=dry_run)
+    result = ImportResult()
+    for rows in chunked(records, chunk_size):
+        import_chunk(rows, lookups, result, dry_run=dry_run, queue_images=queue_images)
+        if progress:
+            progress(result)
+    if result.created or result.updated:
+        rebuild_facets()
+        invalidate_suggestions()
+        bump_version(PAGES_VERSION)
+    return result
@@ -0,0 +1,88 @@
+import re
+
+
+def normalize_color_name(value):
+    """Normalize color text for deduping/filtering (case, spaces, stray symbols)."""
+    if not value:
+        return ""
+
+    cleaned = re.sub(r"[^a-zA-Z0-9\s/&,+-]", " ", str(value)).lower()
+    parts = [
+        re.sub(r"\s+", " ", part).strip(" -_")
+        for part in re.split(r"\s*(?:and|&|/|,|\+)\s*", cleaned)
+        if part and part.strip(" -_")
+    ]
+
+    if not parts:
+        single = re.sub(r"\s+", " ", cleaned).strip(" -_")
+        return single
+
+    # Keep order while removing duplicates in multi-color names.
+    seen = set()
+    unique_parts = []
+    for part in parts:
+        if part not in seen:
+            seen.add(part)
+            unique_parts.append(part)
+
+    return " and ".join(unique_parts)
+
+
+# Broad color families used to group the free-text ``Product.color`` values.
+COLOR_FAMILIES = {
+    "black": "#000000",
+    "white": "#FFFFFF",
+    "grey": "#808080",
+    "red": "#FF0000",
+    "pink": "#FFC0CB",
+    "orange": "#FFA500",
+    "yellow": "#FFFF00",
+    "green": "#008000",
+    "blue": "#0000FF",
+    "purple": "#800080",
+    "brown": "#A52A2A",
+    "beige": "#F5F5DC",
+    "gold": "#FFD700",
+    "silver": "#C0C0C0",
+    "multicolor": "",
+    "other": "#CCCCCC",
+}
+
+# Shades that don't contain their family's name.
+COLOR_ALIASES = {
+    "gray": "grey",
+    "charcoal": "grey",
+    "navy": "blue",
+    "teal": "blue",
+    "maroon": "red",
+    "burgundy": "red",
+    "wine": "red",
+    "coral": "orange",
+    "mustard": "yellow",
+    "olive": "green",
+    "mint": "green",
+    "lavender": "purple",
+    "violet": "purple",
+    "tan": "brown",
+    "khaki": "beige",
+    "cream": "beige",
+    "off white": "white",
+    "ivory": "white",
+}
+
+
+def color_family(color_key):
+    """Family name for a normalized color key, e.g. "navy blue" -> "blue"."""
+    if not color_key:
+        return "other"
+    if " and " in color_key:
+        return "multicolor"
+
+    words = color_key.split()
+    for alias in sorted(COLOR_ALIASES, key=len, reverse=True):
+        if alias in color_key and all(word in words for word in alias.split()):
+            return COLOR_ALIASES[alias]
+    for word in reversed(words):
+        if word in COLOR_FAMILIES:
+            return word
+    return "other"
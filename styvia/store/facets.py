@@ -0,0 +1,234 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+
+from .models import Brand, FacetCount, Product
+
+# Facet counts are kept per scope so a listing can read its whole filter
+# sidebar from FacetCount with a single grouped query.
+SCOPE_FIELDS = (
+    ("main", "product_main_category_id"),
+    ("sub", "product_subcategory_id"),
+    ("category", "product_category_id"),
+)
+
+# Bands are half-open, [low, high), matching the price_range filter; the
+# last one has no upper bound.
+PRICE_BANDS = (
+    ("0-500", "Under ₹500"),
+    ("500-1000", "₹500 - ₹1000"),
+    ("1000-2000", "₹1000 - ₹2000"),
+    ("2000-5000", "₹2000 - ₹5000"),
+    ("5000-", "₹5000 and above"),
+)
+
+DISCOUNT_BANDS = (10, 20, 30, 40, 50)
+
+
+def price_band(price):
+    """Return the PRICE_BANDS value a price falls in (lower bound inclusive)."""
+    for value, _label in PRICE_BANDS[:-1]:
+        low, high = (int(bound) for bound in value.split("-"))
+        if low <= price < high:
+            return value
+    return PRICE_BANDS[-1][0]
+
+
+def discount_band(percent):
+    bands = [band for band in DISCOUNT_BANDS if percent >= band]
+    return str(bands[-1]) if bands else None
+
+
+def facet_values(brand_id, brand_name, color_key, effective_price, discount_percent):
+    """(facet, value, label) triples a single active product contributes to each of its scopes."""
+    values = set()
+    if brand_id is not None:
+        values.add(("brand", str(brand_id), brand_name))
+
+    if color_key:
+        values.add(("color", color_key, color_key))
+
+    # The stored columns the listing filters query, so counts and results agree.
+    if effective_price is not None:
+        values.add(("price", price_band(effective_price), ""))
+
+    band = discount_band(discount_percent)
+    if band:
+        values.add(("discount", band, ""))
+    return values
+
+
+def product_contributions(product):
+    """Every (scope_type, scope_id, facet, value, label) row a product is counted in."""
+    if product is None or not product.is_active:
+        return set()
+
+    brand = product.brand
+    if brand is not None and not brand.is_active:
+        brand = None
+    values = facet_values(
+        brand.pk if brand else None,
+        brand.brand_name if brand else "",
+        product.color_key,
+        product.effective_price,
+        product.discount_percent,
+    )
+    scopes = [
+        (scope_type, getattr(product, field))
+        for scope_type, field in SCOPE_FIELDS
+        if getattr(product, field) is not None
+    ]
+    return {
+        (scope_type, scope_id, facet, value, label)
+        for scope_type, scope_id in scopes
+        for facet, value, label in values
+    }
+
+
+def apply_contribution_change(before, after):
+    """Move counts from the ``before`` contributions of a product to its ``after`` ones."""
+    deltas = Counter()
+    labels = {}
+    for key in before:
+        deltas[key[:4]] -= 1
+    for key in after:
+        deltas[key[:4]] += 1
+        labels[key[:4]] = key[4]
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        FacetCount.objects.bulk_create(
+            [
+                FacetCount(scope_type=key[0], scope_id=key[1], facet=key[2], value=key[3], label=labels[key])
+                for key, delta in deltas.items()
+                if delta > 0
+            ],
+            ignore_conflicts=True,
+        )
+        for (scope_type, scope_id, facet, value), delta in deltas.items():
+            FacetCount.objects.filter(
+                scope_type=scope_type, scope_id=scope_id, facet=facet, value=value
+            ).update(count=F("count") + delta)
+
+
+def refresh_brand(brand):
+    """Recount one brand's facet rows after it is renamed or (de)activated."""
+    with transaction.atomic():
+        forget_brand(brand.pk)
+        if not brand.is_active:
+            return
+
+        rows = []
+        for scope_type, field in SCOPE_FIELDS:
+            scope_counts = (
+                Product.objects.filter(brand=brand, is_active=True, **{f"{field}__isnull": False})
+                .values_list(field)
+                .annotate(total=Count("id"))
+                .order_by()
+            )
+            rows.extend(
+                FacetCount(
+                    scope_type=scope_type, scope_id=scope_id, facet="brand",
+                    value=str(brand.pk), label=brand.brand_name, count=total,
+                )
+                for scope_id, total in scope_counts
+            )
+        FacetCount.objects.bulk_create(rows)
+
+
+def forget_brand(brand_id):
+    FacetCount.objects.filter(facet="brand", value=str(brand_id)).delete()
+
+
+def forget_scope(scope_type, scope_id):
+    FacetCount.objects.filter(scope_type=scope_type, scope_id=scope_id).delete()
+
+
+def rebuild_facets():
+    """Recompute every facet count from the product table."""
+    brand_names = dict(Brand.objects.filter(is_active=True).values_list("id", "brand_name"))
+    counts = Counter()
+    labels = {}
+
+    rows = Product.objects.filter(is_active=True).values_list(
+        "brand_id", "color_key", "effective_price", "discount_percent",
+        *(field for _scope_type, field in SCOPE_FIELDS),
+    ).order_by()
+    for brand_id, color_key, effective_price, discount_percent, *scope_ids in rows.iterator(chunk_size=2000):
+        if brand_id not in brand_names:
+            brand_id = None
+        values = facet_values(brand_id, brand_names.get(brand_id, ""), color_key, effective_price, discount_percent)
+        for (scope_type, _field), scope_id in zip(SCOPE_FIELDS, scope_ids):
+            if scope_id is None:
+                continue
+            for facet, value, label in values:
+                counts[(scope_type, scope_id, facet, value)] += 1
+                labels[(scope_type, scope_id, facet, value)] = label
+
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create(
+            [
+                FacetCount(scope_type=key[0], scope_id=key[1], facet=key[2], value=key[3], label=labels[key], count=total)
+                for key, total in counts.items()
+            ],
+            batch_size=1000,
+        )
+    return len(counts)
+
+
+def get_facets(scope_type=None, scope_ids=()):
+    """
+    Filter sidebar data for the union of the given scopes, read with one query.
+
+    Without a scope only the static price/discount bands are returned, with no
+    counts.
+    """
+    totals = {}
+    if scope_type and scope_ids:
+        rows = (
+            FacetCount.objects.filter(scope_type=scope_type, scope_id__in=scope_ids, count__gt=0)
+            .values("facet", "value")
+            .annotate(total=Sum("count"), label=Max("label"))
+            .order_by()
+        )
+        for row in rows:
+            totals.setdefault(row["facet"], {})[row["value"]] = (row["label"], row["total"])
+    counted = bool(scope_type and scope_ids)
+
+    brands = sorted(
+        (
+            {"id": int(value), "brand_name": label, "count": total}
+            for value, (label, total) in totals.get("brand", {}).items()
+        ),
+        key=lambda brand: brand["brand_name"].lower(),
+    )
+    colors = [
+        {"value": value, "count": total}
+        for value, (_label, total) in sorted(totals.get("color", {}).items())
+    ]
+    price_counts = totals.get("price", {})
+    price_bands = [
+        {"value": value, "label": label, "count": price_counts.get(value, (None, 0))[1] if counted else None}
+        for value, label in PRICE_BANDS
+    ]
+    discount_counts = totals.get("discount", {})
+    discount_bands = [
+        {
+            "value": str(band),
+            "label": f"{band}% and above",
+            "count": sum(
+                total for value, (_label, total) in discount_counts.items() if int(value) >= band
+            ) if counted else None,
+        }
+        for band in DISCOUNT_BANDS
+    ]
+    return {
+        "brands": brands,
+        "colors": colors,
+        "price_bands": price_bands,
+        "discount_bands": discount_bands,
+    }
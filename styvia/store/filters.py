@@ -0,0 +1,179 @@
+import hashlib
+import re
+from urllib.parse import urlencode
+
+from .colors import normalize_color_name
+
+SLUG_RE = re.compile(r"^[-\w]+$")
+MAX_VALUES_PER_FILTER = 50
+# Larger ids cannot match a row and overflow the database's integer binding.
+MAX_ID = 2 ** 63 - 1
+
+# Listing sorts as (value, label, keyset ordering); each ordering ends in id
+# so it is total, and each has a matching index on Product.
+SORTS = (
+    ("newest", "Newest", ("-created_on", "-id")),
+    ("price_asc", "Price: Low to High", ("effective_price", "id")),
+    ("price_desc", "Price: High to Low", ("-effective_price", "-id")),
+    ("discount", "Discount", ("-discount_percent", "-id")),
+    ("popularity", "Popularity", ("-view_count", "-id")),
+)
+SORT_ORDERINGS = {value: ordering for value, _label, ordering in SORTS}
+SORT_CHOICES = [(value, label) for value, label, _ordering in SORTS]
+DEFAULT_SORT = "newest"
+
+
+def _slugs(values):
+    return tuple(sorted({value.strip() for value in values if SLUG_RE.match(value.strip())}))
+
+
+def _ids(values):
+    ids = set()
+    for value in values:
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            continue
+        if 0 < number <= MAX_ID:
+            ids.add(number)
+    return tuple(sorted(ids))
+
+
+def _price_range(value):
+    # "low-high" covers low <= price < high; "low-" has no upper bound.
+    low, _dash, high = (value or "").partition("-")
+    try:
+        low = int(low)
+        high = int(high) if high else None
+    except ValueError:
+        return None
+    if low < 0 or (high is not None and high <= low):
+        return None
+    return f"{low}-{'' if high is None else high}"
+
+
+def _percent(value):
+    try:
+        percent = int(value)
+    except (TypeError, ValueError):
+        return None
+    return str(percent) if 0 < percent < 100 else None
+
+
+class FilterSpec:
+    """
+    Listing filters parsed from a query string into one canonical form.
+
+    Values are validated, deduplicated and sorted, so ``?brand=2&brand=1`` and
+    ``?brand=1&brand=2&brand=x`` give equal specs with the same ``digest``.
+    Unknown parameters are dropped.
+    """
+
+    def __init__(self, subcategories=(), categories=(), brands=(), colors=(), price_range=None, discount=None, query="", sort=None):
+        self.subcategories = subcategories
+        self.categories = categories
+        self.brands = brands
+        self.colors = colors
+        self.price_range = price_range
+        self.discount = discount
+        self.query = query
+        self.sort = sort
+
+    @classmethod
+    def from_querydict(cls, params):
+        def values(name):
+            return params.getlist(name)[:MAX_VALUES_PER_FILTER]
+
+        colors = {normalize_color_name(color) for color in values("color")}
+        query = " ".join(params.get("q", "").split())
+        sort = params.get("sort")
+        if sort not in SORT_ORDERINGS or (sort == DEFAULT_SORT and not query):
+            # Searches default to relevance, so "newest" only matters with a query.
+            sort = None
+        return cls(
+            subcategories=_slugs(values("subcategory")),
+            categories=_slugs(values("category")),
+            brands=_ids(values("brand")),
+            colors=tuple(sorted(color for color in colors if color)),
+            price_range=_price_range(params.get("price_range")),
+            discount=_percent(params.get("discount")),
+            query=query,
+            sort=sort,
+        )
+
+    def price_bounds(self):
+        """(low, high) of the price range, high exclusive and None when open-ended."""
+        if self.price_range is None:
+            return None
+        low, _dash, high = self.price_range.partition("-")
+        return int(low), int(high) if high else None
+
+    def query_items(self):
+        """(name, value) pairs in canonical order; empty filters are left out."""
+        items = [("subcategory", slug) for slug in self.subcategories]
+        items += [("category", slug) for slug in self.categories]
+        items += [("brand", str(brand_id)) for brand_id in self.brands]
+        items += [("color", color) for color in self.colors]
+        if self.price_range:
+            items.append(("price_range", self.price_range))
+        if self.discount:
+            items.append(("discount", self.discount))
+        if self.query:
+            items.append(("q", self.query))
+        if self.sort:
+            items.append(("sort", self.sort))
+        return items
+
+    @property
+    def querystring(self):
+        return urlencode(self.query_items())
+
+    @property
+    def digest(self):
+        return hashlib.md5(self.querystring.encode()).hexdigest()[:16]
+
+    def selected(self):
+        """The shape the listing templates use for checked/selected inputs."""
+        return {
+            "subcategory_slugs": list(self.subcategories),
+            "category_slugs": list(self.categories),
+            "brand_ids": [str(brand_id) for brand_id in self.brands],
+            "colors": list(self.colors),
+            "price_range": self.price_range,
+            "discount": self.discount,
+            "q": self.query,
+            "sort": self.sort or ("" if self.query else DEFAULT_SORT),
+        }
+
+    def __bool__(self):
+        return bool(self.query_items())
+
+    def __eq__(self, other):
+        return isinstance(other, FilterSpec) and self.query_items() == other.query_items()
+
+    def __hash__(self):
+        return hash(self.querystring)
+
+    def __repr__(self):
+        return f"<FilterSpec {self.querystring or '(none)'}>"
+
+
+def filter_products(products, filters):
+    """Apply every filter in ``filters`` except the search query, which callers rank separately."""
+    if filters.subcategories:
+        products = products.filter(product_subcategory__slug__in=filters.subcategories)
+    if filters.categories:
+        products = products.filter(product_category__slug__in=filters.categories)
+    if filters.brands:
+        products = products.filter(brand_id__in=filters.brands)
+    if filters.price_range:
+        min_price, max_price = filters.price_bounds()
+        products = products.filter(effective_price__gte=min_price)
+        if max_price is not None:
+            products = products.filter(effective_price__lt=max_price)
+    if filters.discount:
+        products = products.filter(discount_percent__gte=int(filters.discount))
+    if filters.colors:
+        products = products.filter(color_key__in=filters.colors)
+    return products
+
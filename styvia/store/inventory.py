@@ -0,0 +1,137 @@
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.pagecache import product_version
+from core.versioning import bump_version
+from .models import ProductVariant, StockReservation
+
+HOLD_DURATION = timedelta(minutes=getattr(settings, "STOCK_HOLD_MINUTES", 15))
+
+
+class OutOfStock(Exception):
+    def __init__(self, variant_id, requested):
+        super().__init__(f"Variant {variant_id} does not have {requested} in stock")
+        self.variant_id = variant_id
+        self.requested = requested
+
+
+def _stock_changed(variant_ids):
+    # Product pages show which sizes are in stock; stock moves through plain
+    # UPDATEs here, so no post_save receiver invalidates them.
+    product_ids = set(ProductVariant.objects.filter(pk__in=variant_ids).values_list("product_id", flat=True))
+    if product_ids:
+        bump_version(*(product_version(product_id) for product_id in product_ids))
+
+
+def _quantities(items):
+    quantities = Counter()
+    for variant_id, quantity in (items.items() if isinstance(items, dict) else items):
+        if quantity <= 0:
+            raise ValueError(f"Quantity for variant {variant_id} must be positive")
+        quantities[int(variant_id)] += quantity
+    return quantities
+
+
+def reserve(items, hold=HOLD_DURATION, token=None):
+    """
+    Hold stock for several variants at once: all lines or none.
+
+    ``items`` maps variant id -> quantity (or is an iterable of pairs). Each
+    line is a single conditional UPDATE (``stock >= quantity``), so there is
+    no read-modify-write window to oversell in. Rows are visited in id order,
+    so concurrent reservations lock them in the same order and cannot
+    deadlock, and the transaction holds the locks only for those UPDATEs.
+    Raises OutOfStock, rolling back every line, if any variant is short.
+    Returns the reservation token.
+    """
+    quantities = _quantities(items)
+    token = token or uuid.uuid4()
+    expires_at = timezone.now() + hold
+    with transaction.atomic():
+        for variant_id in sorted(quantities):
+            quantity = quantities[variant_id]
+            taken = ProductVariant.objects.filter(pk=variant_id, is_active=True, stock__gte=quantity).update(
+                stock=F("stock") - quantity
+            )
+            if not taken:
+                raise OutOfStock(variant_id, quantity)
+        StockReservation.objects.bulk_create([
+            StockReservation(token=token, variant_id=variant_id, quantity=quantity, expires_at=expires_at)
+            for variant_id, quantity in quantities.items()
+        ])
+        _stock_changed(quantities)
+    return token
+
+
+def extend(token, hold=HOLD_DURATION):
+    """Push back the expiry of a checkout's holds; returns the number of lines still held."""
+    return StockReservation.objects.filter(token=token, status=StockReservation.HELD).update(
+        expires_at=timezone.now() + hold, updated_at=timezone.now()
+    )
+
+
+def commit(token):
+    """
+    Turn a checkout's holds into a sale; the stock stays taken.
+
+    Returns the number of lines committed. Fewer lines than were reserved means
+    some holds were already released, and the caller should re-reserve them.
+    """
+    return StockReservation.objects.filter(token=token, status=StockReservation.HELD).update(
+        status=StockReservation.COMMITTED, updated_at=timezone.now()
+    )
+
+
+def _return_to_stock(reservations, status):
+    with transaction.atomic():
+        rows = list(
+            reservations.filter(status=StockReservation.HELD)
+            .select_for_update()
+            .values_list("id", "variant_id", "quantity")
+        )
+        if not rows:
+            return 0
+        StockReservation.objects.filter(pk__in=[row[0] for row in rows]).update(
+            status=status, updated_at=timezone.now()
+        )
+        returned = Counter()
+        for _id, variant_id, quantity in rows:
+            returned[variant_id] += quantity
+        for variant_id in sorted(returned):
+            ProductVariant.objects.filter(pk=variant_id).update(stock=F("stock") + returned[variant_id])
+        _stock_changed(returned)
+    return len(rows)
+
+
+def release(token):
+    """Give a checkout's held stock back, e.g. when the cart is abandoned."""
+    return _return_to_stock(StockReservation.objects.filter(token=token), StockReservation.RELEASED)
+
+
+def release_expired(batch_size=500):
+    """Return stock from holds past their expiry, a batch at a time; returns lines released."""
+    total = 0
+    while True:
+        batch = StockReservation.objects.filter(
+            status=StockReservation.HELD, expires_at__lt=timezone.now()
+        ).order_by("expires_at").values_list("id", flat=True)[:batch_size]
+        released = _return_to_stock(
+            StockReservation.objects.filter(pk__in=list(batch)), StockReservation.EXPIRED
+        )
+        total += released
+        if released < batch_size:
+            return total
+
+
+def adjust_stock(variant_id, delta):
+    """Apply a manual stock correction without overwriting concurrent reservations; never below zero."""
+    if delta:
+        ProductVariant.objects.filter(pk=variant_id).update(stock=Greatest(F("stock") + delta, 0))
+        _stock_changed([variant_id])
@@ -0,0 +1,87 @@
+"""
+Product listings addressed by query parameters rather than the URL path.
+
+The JSON API and the infinite-scroll card fragments name their scope with
+``main_category`` / ``sub_category`` slugs next to the usual filter
+parameters. Slugs are resolved through the cached menu tree, so working
+out the scope (and its page-cache version) costs no queries.
+"""
+from django.http import Http404
+
+from core.navigation import get_menu_tree
+from core.pagecache import ALL_PRODUCTS_VERSION, main_category_version, sub_category_version
+from .filters import DEFAULT_SORT, SORT_ORDERINGS, FilterSpec, filter_products
+from .models import Product
+from .pagination import KeysetPaginator
+from .search import search_products
+
+PRODUCT_ORDERING = SORT_ORDERINGS[DEFAULT_SORT]
+SEARCH_ORDERING = ("search_rank", "id")
+
+
+def resolve_scope(params):
+    """Menu-tree entries (main, sub) for the scope slugs, either None; Http404 if unknown."""
+    main_slug = params.get("main_category")
+    sub_slug = params.get("sub_category")
+    main = sub = None
+    if main_slug:
+        main = next((entry for entry in get_menu_tree() if entry["slug"] == main_slug), None)
+    if sub_slug:
+        sub = next((entry for entry in (main or {}).get("subcategories", ()) if entry["slug"] == sub_slug), None)
+    if (main_slug and main is None) or (sub_slug and sub is None):
+        raise Http404("No such category")
+    return main, sub
+
+
+def scope_params(main, sub):
+    """The scope as canonical (name, value) pairs, for cache keys and URLs."""
+    items = []
+    if main:
+        items.append(("main_category", main["slug"]))
+    if sub:
+        items.append(("sub_category", sub["slug"]))
+    return items
+
+
+def scope_version(main, sub):
+    if sub:
+        return sub_category_version(sub["id"])
+    if main:
+        return main_category_version(main["id"])
+    return ALL_PRODUCTS_VERSION
+
+
+def listing_ordering(filters):
+    if filters.sort:
+        return SORT_ORDERINGS[filters.sort]
+    return SEARCH_ORDERING if filters.query else PRODUCT_ORDERING
+
+
+def listing_products(main, sub, filters):
+    """Active products in the scope matching ``filters``, ranked when there is a search query."""
+    products = Product.objects.filter(is_active=True)
+    if main:
+        products = products.filter(product_main_category_id=main["id"])
+    if sub:
+        products = products.filter(product_subcategory_id=sub["id"])
+    products = filter_products(products, filters)
+    if filters.query:
+        products = search_products(products, filters.query)
+    return products
+
+
+def listing_cursor(cursor, filters):
+    """``cursor`` spelled canonically, or "" when it is invalid (and so gives the first page)."""
+    if not cursor:
+        return ""
+    return KeysetPaginator(Product.objects.all(), listing_ordering(filters)).normalize_cursor(cursor) or ""
+
+
+def listing_params(request):
+    """Canonical query parameters a cached listing page depends on."""
+    filters = FilterSpec.from_querydict(request.GET)
+    items = filters.query_items()
+    cursor = listing_cursor(request.GET.get("cursor"), filters)
+    if cursor:
+        items.append(("cursor", cursor))
+    return items
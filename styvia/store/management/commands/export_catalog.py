@@ -0,0 +1,27 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from store.catalog import CHUNK_SIZE, export_records, write_records
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = "Export products with their variants and image references as CSV or JSONL."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="Output file; standard output when omitted.")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension, else jsonl.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument("--active-only", action="store_true")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or ("csv" if path and path.endswith(".csv") else "jsonl")
+        products = Product.objects.filter(is_active=True) if options["active_only"] else Product.objects.all()
+        records = export_records(products, chunk_size=options["chunk_size"])
+        if path:
+            with open(path, "w", newline="", encoding="utf-8") as stream:
+                write_records(stream, file_format, records)
+        else:
+            write_records(sys.stdout, file_format, records)
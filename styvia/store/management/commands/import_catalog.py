@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.catalog import CHUNK_SIZE, import_records, read_records
+
+
+class Command(BaseCommand):
+    help = "Import products with their variants and image references from a CSV or JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument("--create-brands", action="store_true", help="Create brands that do not exist yet.")
+        parser.add_argument("--dry-run", action="store_true", help="Validate every record without writing.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or ("csv" if path.endswith(".csv") else "jsonl")
+
+        def progress(result):
+            self.stdout.write(
+                f"{result.created} created, {result.updated} updated, {result.skipped} skipped", ending="\r"
+            )
+
+        try:
+            with open(path, newline="", encoding="utf-8") as stream:
+                result = import_records(
+                    read_records(stream, file_format),
+                    chunk_size=options["chunk_size"],
+                    create_brands=options["create_brands"],
+                    dry_run=options["dry_run"],
+                    progress=progress,
+                )
+        except OSError as error:
+            raise CommandError(error)
+
+        self.stdout.write("")
+        for line_number, message in result.errors[:50]:
+            self.stderr.write(f"line {line_number}: {message}")
+        if len(result.errors) > 50:
+            self.stderr.write(f"... and {len(result.errors) - 50} more errors")
+        self.stdout.write(self.style.SUCCESS(
+            f"Products: {result.created} created, {result.updated} updated, {result.skipped} skipped; "
+            f"{result.variants} variants, {result.images} images."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from store.facets import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-scope facet counts used by the store filter sidebars."
+
+    def handle(self, *args, **options):
+        total = rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} facet counts."))
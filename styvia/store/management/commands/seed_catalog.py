@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from store.seeding import COLORS, seed_catalog
+
+
+class Command(BaseCommand):
+    help = "Create or refresh a synthetic catalog for development and benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1000)
+        parser.add_argument("--main-categories", type=int, default=3)
+        parser.add_argument("--subcategories", type=int, default=4, help="Per main category.")
+        parser.add_argument("--categories", type=int, default=4, help="Per subcategory.")
+        parser.add_argument("--brands", type=int, default=25)
+        parser.add_argument("--sellers", type=int, default=5)
+        parser.add_argument("--images", type=int, default=len(COLORS), help="Placeholder images, one per colour; 0 for none.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed gives the same catalog.")
+
+    def handle(self, *args, **options):
+        def progress(result):
+            self.stdout.write(f"{result.created} created, {result.updated} updated", ending="\r")
+
+        result = seed_catalog(
+            products=options["products"],
+            main_categories=options["main_categories"],
+            subcategories=options["subcategories"],
+            categories=options["categories"],
+            brands=options["brands"],
+            sellers=options["sellers"],
+            images=options["images"],
+            random_seed=options["seed"],
+            progress=progress,
+        )
+        self.stdout.write("")
+        for line_number, message in result.errors[:50]:
+            self.stderr.write(f"product {line_number}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded products: {result.created} created, {result.updated} updated; "
+            f"{result.variants} variants, {result.images} images."
+        ))
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_remove_brand_store_brand_show_in_315333_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope_type', models.CharField(choices=[('main', 'Main category'), ('sub', 'Sub category'), ('category', 'Category')], max_length=10)),
+                ('scope_id', models.PositiveIntegerField()),
+                ('facet', models.CharField(choices=[('brand', 'Brand'), ('color', 'Color'), ('price', 'Price band'), ('discount', 'Discount band')], max_length=10)),
+                ('value', models.CharField(max_length=100)),
+                ('label', models.CharField(blank=True, max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Facet count',
+                'verbose_name_plural': 'Facet counts',
+                'unique_together': {('scope_type', 'scope_id', 'facet', 'value')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, NullIf
+
+
+def backfill_primary_image_and_price(apps, schema_editor):
+    Product = apps.get_model("store", "Product")
+    ProductImage = apps.get_model("store", "ProductImage")
+    first_image = ProductImage.objects.filter(
+        product=OuterRef("pk")
+    ).order_by("-is_primary", "order", "pk").values("pk")[:1]
+    Product.objects.update(
+        primary_image=Subquery(first_image),
+        effective_price=Coalesce(NullIf(F("sale_price"), Value(0)), F("base_price")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0004_maincategory_main_category_image'),
+        ('sizemanager', '0001_initial'),
+        ('store', '0005_facetcount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, editable=False, help_text='Sale price if set, else base price', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='store.productimage'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'effective_price'], name='store_produ_is_acti_a51d03_idx'),
+        ),
+        migrations.RunPython(backfill_primary_image_and_price, migrations.RunPython.noop),
+    ]
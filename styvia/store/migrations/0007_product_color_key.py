@@ -0,0 +1,42 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:47
+
+from django.db import migrations, models
+
+from store.colors import color_family, normalize_color_name
+
+
+def backfill_color_index(apps, schema_editor):
+    Product = apps.get_model("store", "Product")
+    products = []
+    for product in Product.objects.only("pk", "color").iterator(chunk_size=2000):
+        product.color_key = normalize_color_name(product.color)
+        product.color_family = color_family(product.color_key)
+        products.append(product)
+    Product.objects.bulk_update(products, ["color_key", "color_family"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0004_maincategory_main_category_image'),
+        ('sizemanager', '0001_initial'),
+        ('store', '0006_product_primary_image_effective_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='color_family',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='color_key',
+            field=models.CharField(blank=True, editable=False, help_text='Normalized color used for filtering', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'color_key'], name='store_produ_is_acti_b54041_idx'),
+        ),
+        migrations.RunPython(backfill_color_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:52
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # The FTS5 index only exists on SQLite; other databases use their own
+    # search backend (see store/search.py).
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS store_product_search USING fts5("
+        "name, detailed_name, description, brand, categories, color, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO store_product_search "
+        "(rowid, name, detailed_name, description, brand, categories, color) "
+        "SELECT p.id, p.product_name, COALESCE(p.product_detailed_name, ''), p.description, "
+        "COALESCE(b.brand_name, ''), "
+        "TRIM(COALESCE(m.name, '') || ' ' || COALESCE(s.name, '') || ' ' || COALESCE(c.name, '')), "
+        "p.color "
+        "FROM store_product p "
+        "LEFT JOIN store_brand b ON b.id = p.brand_id "
+        "LEFT JOIN category_maincategory m ON m.id = p.product_main_category_id "
+        "LEFT JOIN category_subcategory s ON s.id = p.product_subcategory_id "
+        "LEFT JOIN category_category c ON c.id = p.product_category_id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS store_product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0004_maincategory_main_category_image'),
+        ('store', '0007_product_color_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
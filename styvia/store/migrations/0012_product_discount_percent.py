@@ -0,0 +1,86 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:13
+
+from django.db import migrations, models
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Cast, Floor
+from django.db.models.lookups import GreaterThan, LessThan
+
+
+def backfill_discount_percent(apps, schema_editor):
+    Product = apps.get_model("store", "Product")
+    Product.objects.update(
+        discount_percent=Case(
+            When(
+                Q(GreaterThan(F("sale_price"), Value(0)), LessThan(F("sale_price"), F("base_price"))),
+                then=Cast(Floor((F("base_price") - F("sale_price")) * Value(100) / F("base_price")), models.IntegerField()),
+            ),
+            default=Value(0),
+            output_field=models.PositiveSmallIntegerField(),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0004_maincategory_main_category_image'),
+        ('sizemanager', '0001_initial'),
+        ('store', '0011_skusequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='discount_percent',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Whole percent the sale price takes off the base price'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_on', 'id'], name='product_active_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['effective_price', 'id'], name='product_active_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['discount_percent', 'id'], name='product_active_discount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['view_count', 'id'], name='product_active_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product_main_category', 'created_on', 'id'], name='product_main_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product_main_category', 'effective_price', 'id'], name='product_main_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product_main_category', 'discount_percent', 'id'], name='product_main_discount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product_main_category', 'view_count', 'id'], name='product_main_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product_subcategory', 'created_on', 'id'], name='product_sub_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product_subcategory', 'effective_price', 'id'], name='product_sub_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product_subcategory', 'discount_percent', 'id'], name='product_sub_discount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product_subcategory', 'view_count', 'id'], name='product_sub_popular_idx'),
+        ),
+        migrations.RunPython(backfill_discount_percent, migrations.RunPython.noop),
+    ]
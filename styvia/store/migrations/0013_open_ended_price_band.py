@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:40
+
+from django.db import migrations
+
+
+def rename_top_price_band(apps, schema_editor):
+    FacetCount = apps.get_model("store", "FacetCount")
+    FacetCount.objects.filter(facet="price", value="5000-999999").update(value="5000-")
+
+
+def restore_top_price_band(apps, schema_editor):
+    FacetCount = apps.get_model("store", "FacetCount")
+    FacetCount.objects.filter(facet="price", value="5000-").update(value="5000-999999")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_product_discount_percent'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_top_price_band, restore_top_price_band),
+    ]
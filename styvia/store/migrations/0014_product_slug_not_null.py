@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:45
+
+from django.db import migrations, models
+from django.db.models import Q
+
+from core.slugs import unique_slugs
+
+
+def backfill_slugs(apps, schema_editor):
+    # Rows written around save() (bulk_create, raw imports) may lack a slug,
+    # and product cards cannot link to them.
+    Product = apps.get_model("store", "Product")
+    missing = Q(slug__isnull=True) | Q(slug="")
+    products = list(Product.objects.filter(missing).only("id", "product_name").order_by("id"))
+    if not products:
+        return
+    slugs = unique_slugs(Product.objects.exclude(missing), [product.product_name for product in products])
+    for product, slug in zip(products, slugs):
+        product.slug = slug
+    Product.objects.bulk_update(products, ["slug"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_open_ended_price_band'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='product',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=200, unique=True),
+        ),
+    ]
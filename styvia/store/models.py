@@ -1,10 +1,17 @@
 from django.db import models
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce, Floor, NullIf
+from django.db.models.lookups import Exact, GreaterThan, IsNull, LessThan
 from category.models import Category, MainCategory, SubCategory
-from django.utils.text import slugify
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.urls import reverse
 import uuid
+from core.renditions import queue_renditions
+from core.slugs import unique_slug
 from sizemanager.models import Size, SizeGroup
+from .colors import color_family, normalize_color_name
+from .pricing import discount_percent
 # Create your models here.
 
 class Brand(models.Model):
@@ -14,9 +21,12 @@ class Brand(models.Model):
     slug = models.SlugField(blank=True, null=True, unique=True)
     is_active = models.BooleanField(default=True)
     is_popular = models.BooleanField(default=False)
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    RENDITION_WIDTHS = {"brand_logo": (120, 240), "brand_images": (320, 640)}
+
     class Meta:
         verbose_name = "Brand"
         verbose_name_plural = "Brands"
@@ -27,8 +37,9 @@ class Brand(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.brand_name)
+            self.slug = unique_slug(self, self.brand_name)
         super().save(*args, **kwargs)
+        queue_renditions(self)
 
     def __str__(self):
         return self.brand_name
@@ -63,7 +74,7 @@ class Seller(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.business_name)
+            self.slug = unique_slug(self, self.business_name)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -71,6 +82,50 @@ class Seller(models.Model):
     
 
 
+class ProductQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        # Keep the stored color index and effective price in step with bulk edits.
+        if isinstance(kwargs.get("color"), str) and "color_key" not in kwargs:
+            kwargs["color_key"] = normalize_color_name(kwargs["color"])
+            kwargs["color_family"] = color_family(kwargs["color_key"])
+        if "base_price" in kwargs or "sale_price" in kwargs:
+            base_price = self._price_expression(kwargs.get("base_price", F("base_price")))
+            sale_price = self._price_expression(kwargs.get("sale_price", F("sale_price")))
+            if "effective_price" not in kwargs:
+                kwargs["effective_price"] = Coalesce(NullIf(sale_price, Value(0)), base_price)
+            if "discount_percent" not in kwargs:
+                kwargs["discount_percent"] = self._discount_expression(base_price, sale_price)
+        return super().update(**kwargs)
+
+    def refresh_primary_images(self):
+        """Point primary_image at each product's first image in display order."""
+        first_image = ProductImage.objects.filter(
+            product=OuterRef("pk")
+        ).order_by("-is_primary", "order", "pk").values("pk")[:1]
+        return self.update(primary_image=Subquery(first_image))
+
+    @staticmethod
+    def _price_expression(value):
+        if hasattr(value, "resolve_expression"):
+            return value
+        return Value(value, output_field=models.DecimalField(max_digits=10, decimal_places=2))
+
+    @staticmethod
+    def _discount_expression(base_price, sale_price):
+        # SQL version of pricing.discount_percent(): truncated, 0 when not on
+        # sale or without a base price to divide by.
+        return Case(
+            When(Q(IsNull(base_price, True)) | Q(Exact(base_price, Value(0))), then=Value(0)),
+            When(
+                Q(GreaterThan(sale_price, Value(0)), LessThan(sale_price, base_price)),
+                then=Cast(Floor((base_price - sale_price) * Value(100) / base_price), models.IntegerField()),
+            ),
+            default=Value(0),
+            output_field=models.PositiveSmallIntegerField(),
+        )
+
+
 class Product(models.Model):
     brand = models.ForeignKey(Brand, on_delete=models.SET_NULL, null=True, related_name="products")
     seller = models.ForeignKey(Seller, on_delete=models.SET_NULL, null=True, related_name="products")
@@ -81,7 +136,9 @@ class Product(models.Model):
     product_name = models.CharField(max_length=200)
     product_detailed_name = models.CharField(max_length=200, null=True, blank=True)
     color = models.CharField(max_length=50)
-    slug = models.SlugField(max_length=200, null=True, blank=True, unique=True)
+    color_key = models.CharField(max_length=100, blank=True, editable=False, help_text="Normalized color used for filtering")
+    color_family = models.CharField(max_length=20, blank=True, editable=False)
+    slug = models.SlugField(max_length=200, blank=True, unique=True)
     sku = models.CharField(max_length=50, unique=True, blank=True, editable=False, help_text="Auto-generated Stock Keeping Unit")
     description = models.TextField()
     product_type = models.CharField(choices=[
@@ -96,6 +153,9 @@ class Product(models.Model):
     
     base_price = models.DecimalField(max_digits=10, decimal_places=2)
     sale_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, editable=False, help_text="Sale price if set, else base price")
+    discount_percent = models.PositiveSmallIntegerField(default=0, editable=False, help_text="Whole percent the sale price takes off the base price")
+    primary_image = models.ForeignKey("ProductImage", on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="+")
 
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
@@ -104,6 +164,15 @@ class Product(models.Model):
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    # Stored columns recomputed in save() from the fields they depend on.
+    DERIVED_FIELDS = {
+        "base_price": ["effective_price", "discount_percent"],
+        "sale_price": ["effective_price", "discount_percent"],
+        "color": ["color_key", "color_family"],
+    }
+
     class Meta:
         verbose_name = "Product"
         verbose_name_plural = "Products"
@@ -113,35 +182,70 @@ class Product(models.Model):
             models.Index(fields=["slug"]),
             models.Index(fields=["sku"]),
             models.Index(fields=["product_type"]),
+            models.Index(fields=["is_active", "effective_price"]),
+            models.Index(fields=["is_active", "color_key"]),
+            # One index per listing scope and sort (see filters.SORTS), over
+            # active products only; SQLite can then read a page, first or
+            # keyset, in order straight off the index.
+            models.Index(fields=["created_on", "id"], condition=Q(is_active=True), name="product_active_newest_idx"),
+            models.Index(fields=["effective_price", "id"], condition=Q(is_active=True), name="product_active_price_idx"),
+            models.Index(fields=["discount_percent", "id"], condition=Q(is_active=True), name="product_active_discount_idx"),
+            models.Index(fields=["view_count", "id"], condition=Q(is_active=True), name="product_active_popular_idx"),
+            models.Index(fields=["product_main_category", "created_on", "id"], condition=Q(is_active=True), name="product_main_newest_idx"),
+            models.Index(fields=["product_main_category", "effective_price", "id"], condition=Q(is_active=True), name="product_main_price_idx"),
+            models.Index(fields=["product_main_category", "discount_percent", "id"], condition=Q(is_active=True), name="product_main_discount_idx"),
+            models.Index(fields=["product_main_category", "view_count", "id"], condition=Q(is_active=True), name="product_main_popular_idx"),
+            models.Index(fields=["product_subcategory", "created_on", "id"], condition=Q(is_active=True), name="product_sub_newest_idx"),
+            models.Index(fields=["product_subcategory", "effective_price", "id"], condition=Q(is_active=True), name="product_sub_price_idx"),
+            models.Index(fields=["product_subcategory", "discount_percent", "id"], condition=Q(is_active=True), name="product_sub_discount_idx"),
+            models.Index(fields=["product_subcategory", "view_count", "id"], condition=Q(is_active=True), name="product_sub_popular_idx"),
         ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.product_name)
+            self.slug = unique_slug(self, self.product_name)
 
         if not self.sku:
-            main_cat = self.product_main_category.name[:3].upper() if self.product_main_category else "XXX"
-            cat = self.product_category.name[:3].upper() if self.product_category else "XXX"
-            random_part = uuid.uuid4().hex[:4].upper()
-            color_code = self.color[:3].upper()
-            self.sku = f"{main_cat}-{cat}-{color_code}-{random_part}"
+            from .skus import assign_product_skus
+
+            assign_product_skus([self])
+
+        self.refresh_pricing()
+        self.refresh_color()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            for source, derived in self.DERIVED_FIELDS.items():
+                if source in update_fields:
+                    update_fields.update(derived)
+            kwargs["update_fields"] = update_fields
         super().save(*args, **kwargs)
 
+    def refresh_pricing(self):
+        self.effective_price = self.sale_price if self.sale_price else self.base_price
+        self.discount_percent = discount_percent(self.base_price, self.sale_price)
+
+    def refresh_color(self):
+        self.color_key = normalize_color_name(self.color)
+        self.color_family = color_family(self.color_key)
+
     
 
     def __str__(self):
         return self.product_name
+
+    def get_absolute_url(self):
+        return reverse("product_detail", args=[self.slug])
     
     @property
     def current_price(self):
+        if self.effective_price is not None:
+            return self.effective_price
         return self.sale_price if self.sale_price else self.base_price
     
     @property
     def get_primary_image(self):
-        image = self.product_images.filter(is_primary=True).first()
-        if not image:
-            image = self.product_images.first()
-        return image
+        return self.primary_image
 
 
 
@@ -150,9 +254,43 @@ class Product(models.Model):
         return self.sale_price is not None and self.sale_price<self.base_price
     
     def get_available_sizes(self):
-        if self.size_group:
-            return self.size_group.sizes.filter(is_active=True)
-        return Size.objects.none()
+        """Active sizes of the size group, from ``size_group.active_sizes`` when prefetched."""
+        if not self.size_group_id:
+            return []
+        sizes = getattr(self.size_group, "active_sizes", None)
+        if sizes is None:
+            sizes = list(self.size_group.sizes.filter(is_active=True))
+        return sizes
+
+    def get_size_options(self):
+        """
+        One entry per size of the size group, in size order, with the price
+        and stock of the product's active variant in that size (None and
+        False when there is none). Works from the prefetched
+        ``active_variants`` and ``size_group.active_sizes`` (see
+        views.product_detail_queryset) without further queries.
+        """
+        variants = getattr(self, "active_variants", None)
+        if variants is None:
+            variants = list(self.variants.filter(is_active=True).select_related("size"))
+        by_size = {variant.size_id: variant for variant in variants}
+        options = []
+        for size in self.get_available_sizes():
+            variant = by_size.pop(size.pk, None)
+            options.append(self._size_option(size, variant))
+        # Variants whose size was retired from the group are still for sale.
+        for variant in by_size.values():
+            options.append(self._size_option(variant.size, variant))
+        return options
+
+    def _size_option(self, size, variant):
+        return {
+            "size": size,
+            "variant": variant,
+            "price": self.current_price + variant.price_adjustment if variant else None,
+            "in_stock": variant is not None and variant.stock > 0,
+            "stock": variant.stock if variant else 0,
+        }
 
     
 class ProductVariant(models.Model):
@@ -180,11 +318,29 @@ class ProductVariant(models.Model):
         
     def save(self, *args, **kwargs):
         if not self.sku:
-            random_part = uuid.uuid4().hex[:4].upper()
-            size_code = self.size.name.upper() if self.size else "NA"
-            self.sku = f"{self.product.sku}-{size_code}-{random_part}"
+            from .skus import assign_variant_skus
+
+            product_skus = None
+            if not ProductVariant.product.is_cached(self):
+                # Only the parent's SKU is needed, not the whole product row.
+                product_skus = dict(Product.objects.filter(pk=self.product_id).values_list("pk", "sku"))
+            assign_variant_skus([self], product_skus)
         self.full_clean()
+        # Set by admin forms: the stock edit as a delta, so saving a variant
+        # never writes back a stale count over concurrent reservations.
+        stock_delta = getattr(self, "_stock_delta", None)
+        if stock_delta is not None and self.pk and not kwargs.get("update_fields"):
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "stock"
+            ]
         super().save(*args, **kwargs)
+        if stock_delta is not None and "update_fields" in kwargs:
+            from .inventory import adjust_stock
+
+            adjust_stock(self.pk, stock_delta)
+            self._stock_delta = None
+            self.stock = ProductVariant.objects.values_list("stock", flat=True).get(pk=self.pk)
         
 
     def __str__(self):
@@ -196,7 +352,9 @@ class ProductVariant(models.Model):
     
     @property
     def variant_price(self):
-        return self.product.current_price +self.price_adjustment
+        # Variants loaded through product.variants (or a prefetch) already
+        # have their product cached; otherwise this fetches it.
+        return self.product.current_price + self.price_adjustment
     
     
 
@@ -206,12 +364,17 @@ class ProductImage(models.Model):
     alt_text = models.CharField(max_length=200, blank=True)
     is_primary = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    RENDITION_WIDTHS = {"image": (320, 640, 960)}
+
     def save(self, *args, **kwargs):
         if not self.product.product_images.filter(is_primary=True).exists():
             self.is_primary =True
         super().save(*args, **kwargs)
+        queue_renditions(self)
+        Product.objects.filter(pk=self.product_id).refresh_primary_images()
 
     class Meta:
         verbose_name = "Product image"
@@ -229,3 +392,82 @@ class ProductImage(models.Model):
 
     
 
+
+
+class FacetCount(models.Model):
+    SCOPE_CHOICES = [
+        ("main", "Main category"),
+        ("sub", "Sub category"),
+        ("category", "Category"),
+    ]
+    FACET_CHOICES = [
+        ("brand", "Brand"),
+        ("color", "Color"),
+        ("price", "Price band"),
+        ("discount", "Discount band"),
+    ]
+
+    scope_type = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    scope_id = models.PositiveIntegerField()
+    facet = models.CharField(max_length=10, choices=FACET_CHOICES)
+    value = models.CharField(max_length=100)
+    label = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Facet count"
+        verbose_name_plural = "Facet counts"
+        unique_together = ["scope_type", "scope_id", "facet", "value"]
+
+    def __str__(self):
+        return f"{self.scope_type}:{self.scope_id} {self.facet}={self.value} ({self.count})"
+
+
+class StockReservation(models.Model):
+    """Stock held for a checkout; the held quantity is already taken out of ProductVariant.stock."""
+
+    HELD = "held"
+    COMMITTED = "committed"
+    RELEASED = "released"
+    EXPIRED = "expired"
+    STATUS_CHOICES = [
+        (HELD, "Held"),
+        (COMMITTED, "Committed"),
+        (RELEASED, "Released"),
+        (EXPIRED, "Expired"),
+    ]
+
+    token = models.UUIDField(default=uuid.uuid4, help_text="Shared by every line reserved together")
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name="reservations")
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=HELD)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Stock reservation"
+        verbose_name_plural = "Stock reservations"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["token"]),
+            models.Index(fields=["status", "expires_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.variant} x{self.quantity} ({self.status})"
+
+
+class SkuSequence(models.Model):
+    """Last number handed out for one SKU prefix (see store.skus)."""
+
+    prefix = models.CharField(max_length=50, unique=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "SKU sequence"
+        verbose_name_plural = "SKU sequences"
+
+    def __str__(self):
+        return f"{self.prefix}: {self.last_value}"
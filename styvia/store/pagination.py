@@ -0,0 +1,156 @@
+import base64
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a fixed ordering, e.g. ("-created_on", "-id").
+
+    Every page is fetched with a WHERE clause on the last seen sort key instead
+    of an OFFSET, so page N costs the same as page 1 and any prefetches on the
+    queryset only run for the rows on the current page.
+    """
+
+    def __init__(self, queryset, ordering, per_page=48):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip("-") for name in self.ordering]
+
+    def get_page(self, cursor=None):
+        """Return the page for ``cursor``; a bad or missing cursor gives the first page."""
+        try:
+            direction, values = self.decode_cursor(cursor) if cursor else ("next", None)
+        except InvalidCursor:
+            direction, values = "next", None
+
+        reverse = direction == "prev"
+        queryset = self.queryset.order_by(*self._order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+
+        if reverse:
+            next_cursor = self.encode_cursor("next", rows[-1])
+            previous_cursor = self.encode_cursor("prev", rows[0]) if has_more else None
+        else:
+            next_cursor = self.encode_cursor("next", rows[-1]) if has_more else None
+            previous_cursor = self.encode_cursor("prev", rows[0]) if values is not None else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+    def _order_by(self, reverse):
+        if not reverse:
+            return self.ordering
+        return [name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering]
+
+    def _seek(self, values, reverse):
+        # (a, b) after (x, y)  ==  a > x OR (a = x AND b > y), with the
+        # comparison flipped per column for descending keys.
+        condition = Q()
+        for position, name in enumerate(self.ordering):
+            descending = name.startswith("-") != reverse
+            lookup = "lt" if descending else "gt"
+            term = Q(**{f"{self.fields[position]}__{lookup}": values[position]})
+            for earlier in range(position):
+                term &= Q(**{self.fields[earlier]: values[earlier]})
+            condition |= term
+        # Implied by the OR above, but lets the database start an index range
+        # scan at the cursor instead of filtering from the first row.
+        descending = self.ordering[0].startswith("-") != reverse
+        return Q(**{f"{self.fields[0]}__{'lte' if descending else 'gte'}": values[0]}) & condition
+
+    def encode_cursor(self, direction, obj):
+        return self._encode(direction, [getattr(obj, name) for name in self.fields])
+
+    def normalize_cursor(self, cursor):
+        """The canonical spelling of ``cursor``, or None when it is not valid for this ordering."""
+        try:
+            direction, values = self.decode_cursor(cursor)
+        except InvalidCursor:
+            return None
+        return self._encode(direction, values)
+
+    def _encode(self, direction, values):
+        payload = json.dumps({"d": direction, "v": [self._serialize(value) for value in values]}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            direction = payload["d"]
+            raw_values = payload["v"]
+        except (ValueError, TypeError, KeyError):
+            raise InvalidCursor(cursor)
+
+        if direction not in ("next", "prev") or not isinstance(raw_values, list) or len(raw_values) != len(self.fields):
+            raise InvalidCursor(cursor)
+
+        try:
+            values = [self._deserialize(name, value) for name, value in zip(self.fields, raw_values)]
+        except (ValueError, TypeError, ValidationError):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _serialize(self, value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    def _deserialize(self, name, value):
+        # Cursors come from the query string: only the scalars _serialize
+        # writes are accepted, and each must be valid for its column.
+        if value is None or isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise TypeError(f"Bad cursor value for {name}: {value!r}")
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations (e.g. a search rank) are plain numbers.
+            if isinstance(value, str) or not math.isfinite(value):
+                raise TypeError(f"Bad cursor value for {name}: {value!r}")
+            return value
+        value = field.clean(value, None)
+        field.get_prep_value(value)
+        return value
@@ -0,0 +1,5 @@
+def discount_percent(base_price, sale_price):
+    """Whole percent a sale price takes off the base price (0 when not on sale)."""
+    if not sale_price or not base_price or sale_price >= base_price:
+        return 0
+    return int((base_price - sale_price) * 100 / base_price)
@@ -0,0 +1,211 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FloatField, IntegerField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+SEARCH_TABLE = "store_product_search"
+
+# Column order of the SQLite index, with the bm25 weight of each column.
+SEARCH_COLUMNS = (
+    ("name", 10.0),
+    ("detailed_name", 6.0),
+    ("description", 1.0),
+    ("brand", 8.0),
+    ("categories", 4.0),
+    ("color", 3.0),
+)
+
+
+def search_terms(query):
+    return re.findall(r"\w+", (query or "").lower())
+
+
+def product_document(product):
+    """Text indexed for a product, keyed by SEARCH_COLUMNS name."""
+    categories = [
+        category.name
+        for category in (product.product_main_category, product.product_subcategory, product.product_category)
+        if category is not None
+    ]
+    return {
+        "name": product.product_name,
+        "detailed_name": product.product_detailed_name or "",
+        "description": product.description,
+        "brand": product.brand.brand_name if product.brand else "",
+        "categories": " ".join(categories),
+        "color": product.color,
+    }
+
+
+def indexable_products(queryset=None):
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.select_related(
+        "brand", "product_main_category", "product_subcategory", "product_category"
+    ).order_by()
+
+
+def no_matches(products):
+    return products.none().annotate(search_rank=Value(0, output_field=IntegerField()))
+
+
+class BaseSearchBackend:
+    """Ranks products for a free-text query and keeps its index in sync."""
+
+    def filter(self, products, query):
+        """
+        ``products`` narrowed to the matches for ``query`` and annotated with
+        ``search_rank`` (lower = better match).
+        """
+        raise NotImplementedError
+
+    def search(self, query, limit):
+        """Ids of the best ``limit`` matches among all products."""
+        ranked = self.filter(Product.objects.all(), query).order_by("search_rank", "id")
+        return list(ranked.values_list("id", flat=True)[:limit])
+
+    def index_products(self, products):
+        pass
+
+    def remove_products(self, product_ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """FTS5 index in ``store_product_search`` keyed by product id (rowid)."""
+
+    def match_expression(self, query):
+        # Every term must match; the last one is a prefix so partial words work.
+        terms = search_terms(query)
+        if not terms:
+            return None
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+    def filter(self, products, query):
+        match = self.match_expression(query)
+        if match is None:
+            return no_matches(products)
+        weights = ", ".join(str(weight) for _column, weight in SEARCH_COLUMNS)
+        # Joined into the scoped query rather than looked up first, so scope
+        # filters apply to every match and bm25 runs in the same scan.
+        return products.extra(
+            tables=[SEARCH_TABLE],
+            where=[f'{SEARCH_TABLE}.rowid = "{products.model._meta.db_table}"."id"', f"{SEARCH_TABLE} MATCH %s"],
+            params=[match],
+        ).annotate(search_rank=RawSQL(f"bm25({SEARCH_TABLE}, {weights})", [], output_field=FloatField()))
+
+    def index_products(self, products):
+        products = list(products)
+        if not products:
+            return
+        columns = ", ".join(column for column, _weight in SEARCH_COLUMNS)
+        placeholders = ", ".join(["%s"] * (len(SEARCH_COLUMNS) + 1))
+        rows = []
+        for product in products:
+            document = product_document(product)
+            rows.append([product.pk, *(document[column] for column, _weight in SEARCH_COLUMNS)])
+        self.remove_products([product.pk for product in products])
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, {columns}) VALUES ({placeholders})",
+                rows,
+            )
+
+    def remove_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(product_ids))})",
+                product_ids,
+            )
+
+    def rebuild(self, chunk_size=1000):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        total = 0
+        chunk = []
+        for product in indexable_products().iterator(chunk_size=chunk_size):
+            chunk.append(product)
+            if len(chunk) == chunk_size:
+                self.index_products(chunk)
+                total += len(chunk)
+                chunk = []
+        self.index_products(chunk)
+        return total + len(chunk)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Weighted tsvector ranking computed by Postgres; there is no side table to
+    maintain. The vector spans joined tables, so it has no index: a search
+    builds it for every product left in the scope.
+    """
+
+    def filter(self, products, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        terms = search_terms(query)
+        if not terms:
+            return no_matches(products)
+        vector = (
+            SearchVector("product_name", weight="A", config="simple")
+            + SearchVector("brand__brand_name", weight="A", config="simple")
+            + SearchVector("product_detailed_name", weight="B", config="simple")
+            + SearchVector("product_category__name", "product_subcategory__name", weight="B", config="simple")
+            + SearchVector("color", weight="C", config="simple")
+            + SearchVector("description", weight="D", config="simple")
+        )
+        search_query = SearchQuery(" & ".join(f"{term}:*" for term in terms), search_type="raw", config="simple")
+        return products.annotate(search_rank=-SearchRank(vector, search_query)).filter(search_rank__lt=0)
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Unindexed fallback: every term must appear in the name, brand or color; newest first."""
+
+    def filter(self, products, query):
+        terms = search_terms(query)
+        if not terms:
+            return no_matches(products)
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(product_name__icontains=term)
+                | Q(product_detailed_name__icontains=term)
+                | Q(brand__brand_name__icontains=term)
+                | Q(color__icontains=term)
+            )
+        return products.filter(condition).annotate(search_rank=-F("id"))
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    backend_path = getattr(settings, "STORE_SEARCH_BACKEND", None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    if connection.vendor == "sqlite" and SEARCH_TABLE in connection.introspection.table_names():
+        return SQLiteFTSBackend()
+    return SimpleSearchBackend()
+
+
+def search_products(products, query):
+    """
+    Restrict ``products`` to the matches for ``query``.
+
+    The result is annotated with ``search_rank`` (lower = better match, always
+    a number) so it can be ordered and keyset-paginated by relevance.
+    """
+    return get_search_backend().filter(products, query)
@@ -0,0 +1,182 @@
+"""
+Synthetic catalog for development and benchmarks.
+
+The taxonomy, size groups, sellers and placeholder images are created with
+get_or_create, and products go through the catalog importer with fixed
+SKUs (SEED-000001, ...), so seeding again with the same options updates the
+same rows instead of adding more.
+"""
+import random
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F
+from PIL import Image
+
+from category.models import Category, MainCategory, SubCategory
+from core.renditions import build_renditions
+from sizemanager.models import Size, SizeGroup
+from .catalog import import_records
+from .models import Product, ProductImage, Seller
+
+SEED_SKU_PREFIX = "SEED-"
+IMAGE_DIR = "products/images/seed"
+
+MAIN_CATEGORIES = ["Men", "Women", "Kids", "Unisex", "Sports", "Ethnic"]
+
+# Subcategory -> (product_type, size group, categories)
+SUBCATEGORIES = {
+    "Topwear": ("topwear", "Apparel", ["T-Shirts", "Shirts", "Sweatshirts", "Jackets", "Polos", "Tank Tops"]),
+    "Bottomwear": ("bottomwear", "Apparel", ["Jeans", "Trousers", "Shorts", "Joggers", "Skirts", "Chinos"]),
+    "Footwear": ("footwear", "Footwear", ["Sneakers", "Sandals", "Boots", "Loafers", "Slippers", "Heels"]),
+    "Accessories": ("accessories", "Free Size", ["Caps", "Belts", "Bags", "Wallets", "Socks", "Scarves"]),
+}
+
+SIZE_GROUPS = {
+    "Apparel": ["XS", "S", "M", "L", "XL", "XXL"],
+    "Footwear": ["6", "7", "8", "9", "10", "11"],
+    "Free Size": ["One Size"],
+}
+
+COLORS = [
+    ("Black", (20, 20, 20)), ("White", (245, 245, 245)), ("Navy Blue", (20, 40, 90)),
+    ("Red", (200, 30, 40)), ("Olive Green", (100, 110, 50)), ("Grey", (128, 128, 128)),
+    ("Beige", (225, 205, 170)), ("Maroon", (110, 20, 40)), ("Sky Blue", (120, 180, 230)),
+    ("Mustard", (210, 160, 30)),
+]
+
+STYLES = ["Classic", "Slim Fit", "Relaxed", "Oversized", "Essential", "Premium", "Everyday", "Vintage"]
+
+
+def seed_taxonomy(main_categories, subcategories, categories):
+    """Create (or reuse) the category tree; returns [(main, sub, category, subcategory name)]."""
+    leaves = []
+    for main_order, main_name in enumerate(MAIN_CATEGORIES[:main_categories]):
+        main, _ = MainCategory.objects.get_or_create(name=main_name, defaults={"order": main_order})
+        for sub_order, sub_name in enumerate(list(SUBCATEGORIES)[:subcategories]):
+            sub, _ = SubCategory.objects.get_or_create(
+                main_category=main, name=sub_name, defaults={"order": sub_order}
+            )
+            for category_order, category_name in enumerate(SUBCATEGORIES[sub_name][2][:categories]):
+                category, _ = Category.objects.get_or_create(
+                    sub_category=sub, name=category_name, defaults={"order": category_order}
+                )
+                leaves.append((main, sub, category, sub_name))
+    return leaves
+
+
+def seed_size_groups():
+    for group_name, sizes in SIZE_GROUPS.items():
+        group, _ = SizeGroup.objects.get_or_create(name=group_name)
+        for order, size_name in enumerate(sizes):
+            Size.objects.get_or_create(group=group, name=size_name, defaults={"order": order})
+
+
+def seed_sellers(count):
+    """Sellers (and their user accounts) named seed-seller-1, seed-seller-2, ..."""
+    User = get_user_model()
+    slugs = []
+    for number in range(1, count + 1):
+        email = f"seed-seller-{number}@example.com"
+        user = User.objects.filter(email=email).first()
+        if user is None:
+            user = User.objects.create_user(
+                first_name="Seed", last_name=f"Seller {number}", username=f"seed-seller-{number}", email=email,
+            )
+        seller, _ = Seller.objects.get_or_create(
+            user=user,
+            defaults={
+                "business_name": f"Seed Seller {number}",
+                "slug": f"seed-seller-{number}",
+                "business_phone": f"90000{number:05d}",
+                "business_email": email,
+                "license": f"SEED-LICENSE-{number}",
+                "address_line1": f"{number} Market Road",
+                "city": "Bengaluru",
+                "state": "Karnataka",
+                "postal_code": "560001",
+                "is_verified": True,
+            },
+        )
+        slugs.append(seller.slug)
+    return slugs
+
+
+def seed_images(count):
+    """One solid-colour placeholder per colour (up to ``count``); returns {colour: storage path}."""
+    paths = {}
+    for color, rgb in COLORS[:count]:
+        name = f"{IMAGE_DIR}/{color.lower().replace(' ', '-')}.jpg"
+        if not default_storage.exists(name):
+            buffer = BytesIO()
+            Image.new("RGB", (1000, 1250), rgb).save(buffer, "JPEG", quality=85)
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        paths[color] = name
+    return paths
+
+
+def build_seed_renditions(paths):
+    """Build renditions once per placeholder and give every image using it the same manifest."""
+    for name in paths.values():
+        field_file = ProductImage(image=name).image
+        entry = build_renditions(field_file, ProductImage.RENDITION_WIDTHS["image"])
+        ProductImage.objects.filter(image=name).update(renditions={"image": entry})
+
+
+def synthetic_records(count, leaves, brands, sellers, image_paths, rng):
+    """Product records in the catalog import format, numbered SEED-000001 onwards."""
+    colors = [color for color, _rgb in COLORS]
+    for number in range(1, count + 1):
+        main, sub, category, sub_name = rng.choice(leaves)
+        product_type, size_group, _categories = SUBCATEGORIES[sub_name]
+        brand = rng.choice(brands)
+        color = rng.choice(colors)
+        base_price = rng.randrange(299, 5000, 100) + 99
+        on_sale = rng.random() < 0.6
+        sale_price = round(base_price * (100 - rng.randrange(10, 71, 5)) / 100) if on_sale else None
+        name = f"{brand} {rng.choice(STYLES)} {category.name.rstrip('s')}"
+        yield number, {
+            "sku": f"{SEED_SKU_PREFIX}{number:06d}",
+            "name": name,
+            "detailed_name": f"{name} in {color}",
+            "description": f"{rng.choice(STYLES)} {category.name.lower()} from {brand}.",
+            "color": color,
+            "product_type": product_type,
+            "brand": brand,
+            "seller": rng.choice(sellers) if sellers else "",
+            "main_category": main.slug,
+            "subcategory": sub.slug,
+            "category": category.slug,
+            "size_group": size_group,
+            "base_price": str(base_price),
+            "sale_price": str(sale_price) if sale_price else "",
+            "is_active": rng.random() < 0.97,
+            "is_featured": rng.random() < 0.05,
+            "variants": [
+                {"size": size, "stock": rng.randrange(0, 40), "price_adjustment": "0"}
+                for size in SIZE_GROUPS[size_group]
+            ],
+            "images": [{"path": image_paths[color], "is_primary": True}] if color in image_paths else [],
+        }
+
+
+def seed_catalog(products=1000, main_categories=3, subcategories=4, categories=4, brands=25, sellers=5,
+                 images=len(COLORS), random_seed=0, progress=None):
+    """Create or refresh the synthetic catalog; returns the catalog ImportResult."""
+    rng = random.Random(random_seed)
+    leaves = seed_taxonomy(main_categories, subcategories, categories)
+    seed_size_groups()
+    seller_slugs = seed_sellers(sellers)
+    image_paths = seed_images(images)
+    brand_names = [f"Seed Brand {number}" for number in range(1, brands + 1)]
+
+    result = import_records(
+        synthetic_records(products, leaves, brand_names, seller_slugs, image_paths, rng),
+        create_brands=True, progress=progress, queue_images=False,
+    )
+    build_seed_renditions(image_paths)
+    # A spread of view counts, so popularity sorting has something to order by.
+    Product.objects.filter(sku__startswith=SEED_SKU_PREFIX).update(view_count=F("id") * 7919 % 5000)
+    return result
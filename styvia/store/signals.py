@@ -0,0 +1,216 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from category.models import Category, MainCategory, SubCategory
+from sizemanager.models import Size, SizeGroup
+from core.pagecache import (
+    ALL_PRODUCTS_VERSION, HOME_VERSION, PAGES_VERSION, SIZES_VERSION, main_category_version, product_version,
+    sub_category_version,
+)
+from core.renditions import renditions_updated
+from core.versioning import bump_version
+from . import facets, suggest
+from .search import get_search_backend, indexable_products
+from .models import Brand, Product, ProductImage, ProductVariant, Seller
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_state(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None
+    if instance.pk:
+        previous = Product.objects.select_related("brand").filter(pk=instance.pk).first()
+    instance._facet_contributions = facets.product_contributions(previous)
+    instance._suggest_state = (
+        (previous.product_name, previous.slug, previous.is_active, previous.view_count) if previous else None
+    )
+    instance._page_versions = product_page_versions(previous)
+
+
+@receiver(post_save, sender=Product)
+def update_product_facets(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, "_facet_contributions", set())
+    facets.apply_contribution_change(before, facets.product_contributions(instance))
+    instance._facet_contributions = set()
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_facets(sender, instance, **kwargs):
+    facets.apply_contribution_change(facets.product_contributions(instance), set())
+
+
+@receiver(pre_save, sender=Brand)
+def remember_brand_state(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        instance._facet_state = None
+        return
+    instance._facet_state = Brand.objects.filter(pk=instance.pk).values_list("brand_name", "is_active").first()
+
+
+@receiver(post_save, sender=Brand)
+def update_brand_facets(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    if getattr(instance, "_facet_state", None) != (instance.brand_name, instance.is_active):
+        facets.refresh_brand(instance)
+
+
+@receiver(post_delete, sender=Brand)
+def remove_brand_facets(sender, instance, **kwargs):
+    facets.forget_brand(instance.pk)
+
+
+@receiver(post_delete, sender=MainCategory)
+@receiver(post_delete, sender=SubCategory)
+@receiver(post_delete, sender=Category)
+def remove_scope_facets(sender, instance, **kwargs):
+    scope_type = {MainCategory: "main", SubCategory: "sub", Category: "category"}[sender]
+    facets.forget_scope(scope_type, instance.pk)
+
+
+@receiver(post_delete, sender=ProductImage)
+def refresh_primary_image(sender, instance, **kwargs):
+    Product.objects.filter(pk=instance.product_id).refresh_primary_images()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    get_search_backend().index_products(indexable_products(Product.objects.filter(pk=instance.pk)))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove_products([instance.pk])
+
+
+@receiver(pre_save, sender=MainCategory)
+@receiver(pre_save, sender=SubCategory)
+@receiver(pre_save, sender=Category)
+def remember_category_name(sender, instance, raw=False, **kwargs):
+    instance._indexed_name = None
+    if not raw and instance.pk:
+        instance._indexed_name = sender.objects.filter(pk=instance.pk).values_list("name", flat=True).first()
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=MainCategory)
+@receiver(post_save, sender=SubCategory)
+@receiver(post_save, sender=Category)
+def reindex_renamed_products(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    if sender is Brand:
+        previous_name = (getattr(instance, "_facet_state", None) or (None,))[0]
+        current_name = instance.brand_name
+        products = Product.objects.filter(brand=instance)
+    else:
+        previous_name = getattr(instance, "_indexed_name", None)
+        current_name = instance.name
+        field = {MainCategory: "product_main_category", SubCategory: "product_subcategory", Category: "product_category"}[sender]
+        products = Product.objects.filter(**{field: instance})
+    if previous_name != current_name:
+        get_search_backend().index_products(indexable_products(products).iterator(chunk_size=1000))
+
+
+@receiver(post_save, sender=Product)
+def update_product_suggestion(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    state = (instance.product_name, instance.slug, instance.is_active, instance.view_count)
+    if getattr(instance, "_suggest_state", None) != state:
+        suggest.update_suggestions("product", instance)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+def update_suggestion(sender, instance, raw=False, **kwargs):
+    if not raw:
+        suggest.update_suggestions("brand" if sender is Brand else "category", instance)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Category)
+def remove_suggestion(sender, instance, **kwargs):
+    kind = {Product: "product", Brand: "brand", Category: "category"}[sender]
+    suggest.update_suggestions(kind, pk=instance.pk)
+
+
+@receiver(post_save, sender=MainCategory)
+@receiver(post_save, sender=SubCategory)
+@receiver(post_delete, sender=MainCategory)
+@receiver(post_delete, sender=SubCategory)
+def invalidate_suggestions(sender, raw=False, **kwargs):
+    # Category suggestions carry their parents' names and slugs.
+    if not raw:
+        suggest.invalidate_suggestions()
+
+
+def product_page_versions(product):
+    """Cached-page versions a product shows up under (see core.pagecache)."""
+    if product is None:
+        return set()
+    versions = {product_version(product.pk)}
+    if product.is_featured:
+        versions.add(HOME_VERSION)
+    if product.is_active:
+        versions.add(ALL_PRODUCTS_VERSION)
+        if product.product_main_category_id:
+            versions.add(main_category_version(product.product_main_category_id))
+        if product.product_subcategory_id:
+            versions.add(sub_category_version(product.product_subcategory_id))
+    return versions
+
+
+@receiver(post_save, sender=Product)
+def invalidate_product_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # A product moved between categories leaves both listings stale.
+    versions = getattr(instance, "_page_versions", set()) | product_page_versions(instance)
+    if versions:
+        bump_version(*versions)
+
+
+@receiver(post_delete, sender=Product)
+def invalidate_deleted_product_pages(sender, instance, **kwargs):
+    versions = product_page_versions(instance)
+    if versions:
+        bump_version(*versions)
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(renditions_updated, sender=ProductImage)
+def invalidate_product_child_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    versions = product_page_versions(Product.objects.filter(pk=instance.product_id).first())
+    if versions:
+        bump_version(*versions)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(renditions_updated, sender=Brand)
+@receiver(post_save, sender=Seller)
+@receiver(post_delete, sender=Seller)
+def invalidate_all_pages(sender, raw=False, **kwargs):
+    if not raw:
+        bump_version(PAGES_VERSION)
+
+
+@receiver(post_save, sender=Size)
+@receiver(post_delete, sender=Size)
+@receiver(post_save, sender=SizeGroup)
+@receiver(post_delete, sender=SizeGroup)
+def invalidate_product_pages_for_sizes(sender, raw=False, **kwargs):
+    if not raw:
+        bump_version(SIZES_VERSION)
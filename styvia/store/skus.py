@@ -0,0 +1,84 @@
+"""
+SKU allocation.
+
+Every SKU ends in a number taken from a per-prefix counter (SkuSequence), so
+codes are unique by construction: no random suffix, no existence check, no
+retry on IntegrityError. Numbers are reserved in blocks with one conditional
+UPDATE, so a bulk import pays one query per prefix rather than one per row.
+Generated numbers have at least five digits and never clash with the older
+4-hex-digit random suffixes.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import SkuSequence
+
+VARIANT_SEQUENCE = "variant"
+SEQUENCE_DIGITS = 5
+
+
+def allocate(prefix, count=1):
+    """Reserve ``count`` consecutive numbers for ``prefix`` and return them as a range."""
+    if count < 1:
+        return range(0)
+    with transaction.atomic():
+        # The UPDATE locks the row until commit, so the read below sees our own increment.
+        if not SkuSequence.objects.filter(prefix=prefix).update(last_value=F("last_value") + count):
+            try:
+                with transaction.atomic():
+                    SkuSequence.objects.create(prefix=prefix, last_value=count)
+                return range(1, count + 1)
+            except IntegrityError:
+                # Another process created the row first.
+                SkuSequence.objects.filter(prefix=prefix).update(last_value=F("last_value") + count)
+        last_value = SkuSequence.objects.values_list("last_value", flat=True).get(prefix=prefix)
+    return range(last_value - count + 1, last_value + 1)
+
+
+def _code(text, length=3):
+    return text[:length].upper() if text else "XXX"
+
+
+def product_prefix(product):
+    main_category = product.product_main_category.name if product.product_main_category_id else ""
+    category = product.product_category.name if product.product_category_id else ""
+    return f"{_code(main_category)}-{_code(category)}-{product.color[:3].upper()}"
+
+
+def size_code(size):
+    return size.name.upper() if size else "NA"
+
+
+def format_sku(prefix, number):
+    return f"{prefix}-{number:0{SEQUENCE_DIGITS}d}"
+
+
+def assign_product_skus(products):
+    """Give every product without a SKU a fresh one; one allocation per distinct prefix."""
+    by_prefix = defaultdict(list)
+    for product in products:
+        if not product.sku:
+            by_prefix[product_prefix(product)].append(product)
+    # Sorted, so concurrent imports lock sequence rows in the same order.
+    for prefix in sorted(by_prefix):
+        for product, number in zip(by_prefix[prefix], allocate(prefix, len(by_prefix[prefix]))):
+            product.sku = format_sku(prefix, number)
+
+
+def assign_variant_skus(variants, product_skus=None):
+    """
+    Give every variant without a SKU a fresh one: product SKU, size, then a
+    number from the shared variant sequence.
+
+    ``product_skus`` maps product ids to SKUs for variants whose product is
+    not loaded; otherwise ``variant.product`` is used.
+    """
+    pending = [variant for variant in variants if not variant.sku]
+    for variant, number in zip(pending, allocate(VARIANT_SEQUENCE, len(pending))):
+        if product_skus is not None and variant.product_id in product_skus:
+            product_sku = product_skus[variant.product_id]
+        else:
+            product_sku = variant.product.sku
+        variant.sku = format_sku(f"{product_sku}-{size_code(variant.size)}", number)
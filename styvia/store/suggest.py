@@ -0,0 +1,250 @@
+import re
+import threading
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.urls import reverse
+
+from category.models import Category
+from core.versioning import bump_version, get_version
+from .models import Brand, Product
+
+SUGGEST_VERSION = "suggest"
+SUGGEST_LIMIT = getattr(settings, "STORE_SUGGEST_LIMIT", 8)
+# Tries are only built this deep; longer queries are finished by filtering the
+# entries stored on the deepest node.
+MAX_PREFIX_LENGTH = 12
+
+# Brands and categories rank above individual products for the same prefix.
+KIND_WEIGHTS = {"brand": 1_000_000, "category": 500_000, "product": 0}
+
+
+def normalize(text):
+    return " ".join(re.findall(r"\w+", (text or "").lower()))
+
+
+def phrases(label):
+    """
+    The normalized strings a label is reachable by: the full name and every
+    later word start ("air max" and "max" in "nike air max"), so the words
+    after a brand prefix find the product too.
+    """
+    words = normalize(label).split()
+    return {" ".join(words[start:]) for start in range(len(words))}
+
+
+class _Node:
+    __slots__ = ("children", "entries", "top")
+
+    def __init__(self):
+        self.children = {}
+        # Keys whose phrase ends here, or is cut off here at MAX_PREFIX_LENGTH.
+        self.entries = set()
+        # Best keys anywhere under this node, best first.
+        self.top = []
+
+
+class PrefixTrie:
+    """
+    Character trie where every node keeps its own top-k entries.
+
+    A lookup walks len(prefix) nodes and returns the precomputed list, so the
+    cost does not depend on how many names share the prefix.
+    """
+
+    def __init__(self, limit=SUGGEST_LIMIT):
+        self.limit = limit
+        self.root = _Node()
+        self.items = {}
+        self._phrases = {}
+
+    def _rank(self, key):
+        item = self.items[key]
+        return (-item["weight"], item["label"].lower())
+
+    def add(self, key, item, item_phrases):
+        if key in self.items:
+            self.remove(key)
+        self.items[key] = item
+        self._phrases[key] = set(item_phrases)
+        for phrase in self._phrases[key]:
+            node = self.root
+            path = [node]
+            for char in phrase[:MAX_PREFIX_LENGTH]:
+                node = node.children.setdefault(char, _Node())
+                path.append(node)
+            node.entries.add(key)
+            for node in path:
+                if key not in node.top:
+                    node.top.append(key)
+                    node.top.sort(key=self._rank)
+                    del node.top[self.limit:]
+
+    def remove(self, key):
+        if key not in self.items:
+            return
+        for phrase in self._phrases.pop(key):
+            node = self.root
+            path = [node]
+            for char in phrase[:MAX_PREFIX_LENGTH]:
+                node = node.children[char]
+                path.append(node)
+            node.entries.discard(key)
+            # Recompute the top lists bottom-up, pruning branches left empty.
+            for depth in range(len(path) - 1, -1, -1):
+                node = path[depth]
+                if key in node.top:
+                    self._recompute(node, exclude=key)
+                if depth and not node.entries and not node.children:
+                    del path[depth - 1].children[phrase[depth - 1]]
+        del self.items[key]
+
+    def _recompute(self, node, exclude):
+        candidates = {key for key in node.entries if key != exclude}
+        for child in node.children.values():
+            candidates.update(key for key in child.top if key != exclude)
+        node.top = sorted(candidates, key=self._rank)[: self.limit]
+
+    def search(self, prefix, limit=None):
+        limit = limit or self.limit
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        node = self.root
+        for char in prefix[:MAX_PREFIX_LENGTH]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if len(prefix) <= MAX_PREFIX_LENGTH:
+            keys = list(node.top[:limit])
+        else:
+            matches = [
+                key for key in list(node.entries)
+                if any(phrase.startswith(prefix) for phrase in self._phrases.get(key, ()))
+            ]
+            keys = sorted(matches, key=self._rank)[:limit]
+        # Readers do not take the write lock; skip keys removed mid-lookup.
+        return [self.items[key] for key in keys if key in self.items]
+
+
+def product_suggestion(product):
+    return {
+        "label": product.product_name,
+        "kind": "product",
+        "url": reverse("product_detail", args=[product.slug]),
+        "weight": KIND_WEIGHTS["product"] + product.view_count,
+    }
+
+
+def brand_suggestion(brand):
+    return {
+        "label": brand.brand_name,
+        "kind": "brand",
+        "url": f"{reverse('store')}?{urlencode({'brand': brand.pk})}",
+        "weight": KIND_WEIGHTS["brand"] + (1 if brand.is_popular else 0),
+    }
+
+
+def category_suggestion(category):
+    sub_category = category.sub_category
+    url = reverse("product_by_sub_cat", args=[sub_category.main_category.slug, sub_category.slug])
+    return {
+        "label": f"{category.name} in {sub_category.main_category.name}",
+        "kind": "category",
+        "url": f"{url}?{urlencode({'category': category.slug})}",
+        "weight": KIND_WEIGHTS["category"],
+    }
+
+
+def suggestable_categories():
+    return Category.objects.filter(
+        is_active=True, sub_category__is_active=True, sub_category__main_category__is_active=True
+    ).select_related("sub_category__main_category")
+
+
+class SuggestionIndex:
+    """The trie for this process, stamped with the ``suggest`` version it reflects."""
+
+    def __init__(self, version):
+        self.version = version
+        self.trie = PrefixTrie()
+
+    @classmethod
+    def build(cls, version):
+        index = cls(version)
+        products = Product.objects.filter(is_active=True).only("id", "product_name", "slug", "view_count")
+        for product in products.iterator(chunk_size=2000):
+            index.add_product(product)
+        for brand in Brand.objects.filter(is_active=True):
+            index.add_brand(brand)
+        for category in suggestable_categories():
+            index.add_category(category)
+        return index
+
+    def add_product(self, product):
+        self.trie.add(("product", product.pk), product_suggestion(product), phrases(product.product_name))
+
+    def add_brand(self, brand):
+        self.trie.add(("brand", brand.pk), brand_suggestion(brand), phrases(brand.brand_name))
+
+    def add_category(self, category):
+        self.trie.add(("category", category.pk), category_suggestion(category), phrases(category.name))
+
+    def remove(self, kind, pk):
+        self.trie.remove((kind, pk))
+
+    def search(self, prefix, limit=None):
+        return [
+            {"label": item["label"], "kind": item["kind"], "url": item["url"]}
+            for item in self.trie.search(prefix, limit)
+        ]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_suggestion_index():
+    """
+    Return this process's index, rebuilding it when another process has
+    bumped the ``suggest`` version since it was built.
+    """
+    global _index
+    version = get_version(SUGGEST_VERSION)
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = SuggestionIndex.build(version)
+            index = _index
+    return index
+
+
+def update_suggestions(kind, instance=None, pk=None):
+    """
+    Apply one changed object to the local index and tell other processes to
+    rebuild theirs. ``instance`` is None when the object was deleted.
+    """
+    with _lock:
+        if _index is not None:
+            _index.remove(kind, pk if instance is None else instance.pk)
+            if instance is not None and _is_suggestable(kind, instance):
+                getattr(_index, f"add_{kind}")(instance)
+        version = bump_version(SUGGEST_VERSION)[SUGGEST_VERSION]
+        if _index is not None:
+            _index.version = version
+
+
+def invalidate_suggestions():
+    """Drop every index, e.g. after a category tree change that moves many URLs."""
+    global _index
+    with _lock:
+        _index = None
+        bump_version(SUGGEST_VERSION)
+
+
+def _is_suggestable(kind, instance):
+    if kind == "category":
+        sub_category = instance.sub_category
+        return instance.is_active and sub_category.is_active and sub_category.main_category.is_active
+    return instance.is_active
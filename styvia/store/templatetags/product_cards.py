@@ -0,0 +1,12 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from store.cards import render_product_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def product_cards(products, style="grid"):
+    """{% product_cards products %} -> every product's cached card; style "grid" or "compact"."""
+    return mark_safe("".join(render_product_cards(list(products), style)))
@@ -1,3 +1,796 @@
-from django.test import TestCase
+import base64
+import csv
+import html
+import json
+import os
+import re
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, models, transaction
+from django.http import QueryDict
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+
+from category.models import MainCategory, SubCategory
+from core import tasks
+from core.models import Task
+from core.renditions import process_images
+from sizemanager.models import Size
+from . import facets, inventory, skus
+from .admin import ProductVariantInlineForm
+from .facets import PRICE_BANDS, price_band
+from .filters import MAX_ID, SORT_ORDERINGS, FilterSpec, filter_products
+from .listings import listing_params
+from .models import Brand, FacetCount, Product, ProductImage, ProductVariant, SkuSequence, StockReservation
+from .pagination import KeysetPaginator
+from .popularity import ViewCountBuffer, view_counts
+from .pricing import discount_percent
+from .search import search_products
+from .suggest import MAX_PREFIX_LENGTH, PrefixTrie, phrases
+from .seeding import seed_catalog
+
+NEXT_PAGE_URL = re.compile(r'data-next-page-url="([^"]+)"')
+PRODUCT_LINK = re.compile(r'href="/store/product/([^/"]+)/"')
+
+
+def seed_small_catalog(products=30):
+    """A few dozen products over one main category and two of its subcategories, no images."""
+    seed_catalog(products=products, main_categories=1, subcategories=2, categories=2, brands=3, sellers=0, images=0)
+
+
+class CatalogTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_small_catalog()
+        cls.main = MainCategory.objects.get(name="Men")
+        cls.sub = SubCategory.objects.get(main_category=cls.main, name="Topwear")
+
+    def setUp(self):
+        # Page caches and version tokens would otherwise leak between tests.
+        cache.clear()
+        # Product pages record views in a process-wide buffer; left there, its
+        # exit flush would write them to whatever database is configured then.
+        view_counts.clear()
+        self.addCleanup(view_counts.clear)
+
+
+@mock.patch("store.views.PRODUCTS_PER_PAGE", 4)
+class ProductGridPageTests(CatalogTestCase):
+    def scroll(self, url):
+        """Slugs on a listing page and on every fragment its next-page URLs lead to."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        slugs = PRODUCT_LINK.findall(content)
+        match = NEXT_PAGE_URL.search(content)
+        while match:
+            response = self.client.get(html.unescape(match.group(1)))
+            self.assertEqual(response.status_code, 200)
+            content = response.content.decode()
+            slugs += PRODUCT_LINK.findall(content)
+            match = NEXT_PAGE_URL.search(content)
+        return slugs
+
+    def expected(self, **filters):
+        return set(Product.objects.filter(is_active=True, **filters).values_list("slug", flat=True))
+
+    def test_fragments_continue_every_listing(self):
+        listings = [
+            ("/store/", {}),
+            ("/store/?sort=price_asc", {}),
+            (f"/store/{self.main.slug}/", {"product_main_category": self.main}),
+            (f"/store/{self.main.slug}/{self.sub.slug}/", {"product_subcategory": self.sub}),
+            (f"/store/{self.main.slug}/{self.sub.slug}/?sort=discount", {"product_subcategory": self.sub}),
+        ]
+        for url, filters in listings:
+            with self.subTest(url=url):
+                slugs = self.scroll(url)
+                self.assertEqual(len(slugs), len(set(slugs)))
+                self.assertEqual(set(slugs), self.expected(**filters))
+
+    def test_fragments_continue_searches(self):
+        word = Product.objects.filter(product_subcategory=self.sub).first().product_name.split()[-1]
+        for url in (f"/store/?q={word}", f"/store/{self.main.slug}/{self.sub.slug}/?q={word}"):
+            with self.subTest(url=url):
+                first_page = self.client.get(url).content.decode()
+                slugs = self.scroll(url)
+                self.assertEqual(len(slugs), len(set(slugs)))
+                self.assertIn(f"Showing <span class=\"text-slate-900 font-bold\">{len(slugs)}</span>", first_page)
+
+
+def make_cursor(values, direction="next"):
+    payload = json.dumps({"d": direction, "v": values}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+class KeysetPaginatorTests(CatalogTestCase):
+    def test_walks_every_sort_forward_and_back(self):
+        products = Product.objects.filter(is_active=True)
+        for sort, ordering in SORT_ORDERINGS.items():
+            with self.subTest(sort=sort):
+                expected = list(products.order_by(*ordering).values_list("pk", flat=True))
+                paginator = KeysetPaginator(products, ordering, per_page=7)
+                pages = [paginator.get_page()]
+                while pages[-1].has_next():
+                    pages.append(paginator.get_page(pages[-1].next_cursor))
+                self.assertEqual([product.pk for page in pages for product in page], expected)
+                self.assertFalse(pages[0].has_previous())
+
+                backwards = [pages[-1]]
+                while backwards[-1].has_previous():
+                    backwards.append(paginator.get_page(backwards[-1].previous_cursor))
+                self.assertEqual(
+                    [[product.pk for product in page] for page in reversed(backwards)],
+                    [[product.pk for product in page] for page in pages],
+                )
+
+    def test_tampered_cursors_give_the_first_page(self):
+        products = Product.objects.filter(is_active=True)
+        paginator = KeysetPaginator(products, ("-created_on", "-id"), per_page=5)
+        first = [product.pk for product in paginator.get_page()]
+        created_on = products.order_by("-created_on").first().created_on.isoformat()
+        cursors = [
+            "not base64!", make_cursor([created_on, 1], direction="up"), make_cursor([created_on]),
+            make_cursor([None, 1]), make_cursor([[1], 1]), make_cursor([created_on, {}]),
+            make_cursor([created_on, True]), make_cursor(["yesterday", 1]), make_cursor([created_on, 10 ** 30]),
+            base64.urlsafe_b64encode(b'{"d": "next", "v": [NaN, 1]}').decode(),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                page = paginator.get_page(cursor)
+                self.assertEqual([product.pk for product in page], first)
+                self.assertFalse(page.has_previous())
+
+    def test_tampered_search_cursor(self):
+        paginator = KeysetPaginator(Product.objects.annotate(search_rank=models.Value(0)), ("search_rank", "id"))
+        for rank in ("x", {}, None, float("inf")):
+            with self.subTest(rank=rank):
+                self.assertFalse(paginator.get_page(make_cursor([rank, 1])).has_previous())
+
+    def test_listing_and_api_ignore_tampered_cursors(self):
+        cursor = make_cursor([None, 1])
+        for url in (f"/store/?cursor={cursor}", f"/store/{self.main.slug}/?q=shirt&cursor={make_cursor(['x', 1])}",
+                    f"/api/products/?cursor={cursor}", f"/api/products/?q=shirt&cursor={make_cursor([{}, 1])}"):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class ListingParamsTests(CatalogTestCase):
+    def params(self, query):
+        return listing_params(RequestFactory().get("/store/", QueryDict(query)))
+
+    def test_out_of_range_ids_are_dropped(self):
+        filters = FilterSpec.from_querydict(QueryDict(f"brand=1&brand={MAX_ID + 1}&brand=10{'0' * 30}&brand={MAX_ID}"))
+        self.assertEqual(filters.brands, (1, MAX_ID))
+        for url in (f"/store/?brand=1{'0' * 30}", f"/api/products/?brand=1{'0' * 30}"):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_cursor_is_canonical_in_cache_keys(self):
+        created_on = Product.objects.order_by("-created_on").first().created_on.isoformat()
+        cursor = make_cursor([created_on, 5])
+        spaced = base64.urlsafe_b64encode(json.dumps({"v": [created_on, 5], "d": "next"}, indent=1).encode()).decode()
+        self.assertEqual(self.params(f"cursor={cursor}"), self.params(f"cursor={spaced}"))
+        self.assertEqual(self.params(f"cursor={cursor}")[-1][0], "cursor")
+        for junk in ("junk", make_cursor([None, 5]), make_cursor([0.5, 5])):
+            with self.subTest(cursor=junk):
+                self.assertEqual(self.params(f"cursor={junk}"), [])
+        # A numeric first key is only valid for searches, which order by rank.
+        self.assertEqual(self.params(f"q=shirt&cursor={make_cursor([0.5, 5])}")[-1][0], "cursor")
+
+
+class BulkPriceUpdateTests(CatalogTestCase):
+    def test_discount_matches_pricing_for_every_price_pair(self):
+        product = Product.objects.order_by("id").first()
+        pairs = [("1000", "750"), ("999", "1"), ("1000", "1000"), ("500", "800"), ("1000", None), ("0", "100"), ("0", None)]
+        for base_price, sale_price in pairs:
+            with self.subTest(base_price=base_price, sale_price=sale_price):
+                base_price = Decimal(base_price)
+                sale_price = sale_price and Decimal(sale_price)
+                Product.objects.filter(pk=product.pk).update(base_price=base_price, sale_price=sale_price)
+                self.assertEqual(
+                    Product.objects.values_list("discount_percent", flat=True).get(pk=product.pk),
+                    discount_percent(base_price, sale_price),
+                )
+
+
+class PriceRangeTests(CatalogTestCase):
+    def matching(self, price_range):
+        filters = FilterSpec.from_querydict(QueryDict(f"price_range={price_range}"))
+        return set(filter_products(Product.objects.all(), filters).values_list("pk", flat=True))
+
+    def test_boundary_prices_fall_in_exactly_one_band(self):
+        products = list(Product.objects.order_by("id")[:5])
+        prices = ["499.99", "500", "999.99", "5000", "250000"]
+        for product, price in zip(products, prices):
+            Product.objects.filter(pk=product.pk).update(effective_price=Decimal(price))
+        bands = {price: price_band(Decimal(price)) for price in prices}
+        self.assertEqual(bands, {
+            "499.99": "0-500", "500": "500-1000", "999.99": "500-1000", "5000": "5000-", "250000": "5000-",
+        })
+        for product, price in zip(products, prices):
+            with self.subTest(price=price):
+                self.assertIn(product.pk, self.matching(bands[price]))
+                others = {value for value, _label in PRICE_BANDS if value != bands[price]}
+                self.assertFalse(any(product.pk in self.matching(value) for value in others))
+
+    def test_price_range_parsing(self):
+        for value, expected in [("500-1000", "500-1000"), ("5000-", "5000-"), ("500-500", None), ("-5", None), ("x-", None)]:
+            with self.subTest(value=value):
+                self.assertEqual(FilterSpec.from_querydict(QueryDict(f"price_range={value}")).price_range, expected)
+
+
+class ProductSlugTests(CatalogTestCase):
+    def test_every_product_has_a_slug_to_link_to(self):
+        product = Product.objects.order_by("id").first()
+        product.slug = ""
+        product.save()
+        self.assertTrue(product.slug)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Product.objects.filter(pk=product.pk).update(slug=None)
+        self.assertIn(f'href="/store/product/{product.slug}/"', self.client.get("/store/").content.decode())
+
+
+class SearchTests(CatalogTestCase):
+    def rename(self, products, name=None, description=None):
+        for product in products:
+            product.product_name = name or product.product_name
+            product.description = description or product.description
+            product.save()  # reindexes through the post_save handler
+
+    def test_scope_applies_before_ranking(self):
+        in_scope = Product.objects.filter(product_subcategory=self.sub, is_active=True).first()
+        elsewhere = Product.objects.filter(is_active=True).exclude(product_subcategory=self.sub)
+        self.rename(elsewhere, name="Zephyr Zephyr Tee")
+        self.rename([in_scope], description="A zephyr weave")
+
+        scoped = search_products(Product.objects.filter(product_subcategory=self.sub), "zephyr")
+        self.assertEqual(list(scoped.values_list("pk", flat=True)), [in_scope.pk])
+        everywhere = search_products(Product.objects.all(), "zephyr").order_by("search_rank", "id")
+        self.assertEqual(everywhere.count(), len(elsewhere) + 1)
+        # A name match outranks a description match.
+        self.assertEqual(everywhere.last().pk, in_scope.pk)
+
+        response = self.client.get(f"/store/{self.main.slug}/{self.sub.slug}/?q=zephyr")
+        self.assertEqual(PRODUCT_LINK.findall(response.content.decode()), [in_scope.slug])
+
+    def test_ranks_are_numbers(self):
+        ranks = search_products(Product.objects.all(), "t").values_list("search_rank", flat=True)
+        self.assertTrue(ranks)
+        for rank in ranks:
+            self.assertIsInstance(rank, float)
+
+    def test_blank_query_matches_nothing(self):
+        self.assertFalse(search_products(Product.objects.all(), " !? ").exists())
+
+
+class InventoryTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.first, self.second = ProductVariant.objects.filter(is_active=True).order_by("id")[:2]
+        ProductVariant.objects.filter(pk__in=[self.first.pk, self.second.pk]).update(stock=5)
+
+    def stock(self, variant):
+        return ProductVariant.objects.values_list("stock", flat=True).get(pk=variant.pk)
+
+    def test_reservations_never_oversell(self):
+        inventory.reserve({self.first.pk: 3})
+        with self.assertRaises(inventory.OutOfStock) as raised:
+            # The second checkout read stock 5 too, but only 2 are left.
+            inventory.reserve({self.first.pk: 3})
+        self.assertEqual(raised.exception.variant_id, self.first.pk)
+        self.assertEqual(self.stock(self.first), 2)
+        inventory.reserve({self.first.pk: 2})
+        self.assertEqual(self.stock(self.first), 0)
+
+    def test_short_line_rolls_back_the_whole_reservation(self):
+        with self.assertRaises(inventory.OutOfStock):
+            inventory.reserve([(self.first.pk, 2), (self.second.pk, 6)])
+        self.assertEqual((self.stock(self.first), self.stock(self.second)), (5, 5))
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_release_returns_stock_once(self):
+        token = inventory.reserve({self.first.pk: 2, self.second.pk: 1})
+        self.assertEqual(inventory.release(token), 2)
+        self.assertEqual(inventory.release(token), 0)
+        self.assertEqual((self.stock(self.first), self.stock(self.second)), (5, 5))
+
+    def test_committed_stock_stays_taken(self):
+        token = inventory.reserve({self.first.pk: 2})
+        self.assertEqual(inventory.commit(token), 1)
+        self.assertEqual(inventory.release(token), 0)
+        self.assertEqual(self.stock(self.first), 3)
+
+    def test_release_expired_only_touches_lapsed_holds(self):
+        expired = inventory.reserve({self.first.pk: 2}, hold=timedelta(seconds=-1))
+        held = inventory.reserve({self.first.pk: 1})
+        committed = inventory.reserve({self.second.pk: 1}, hold=timedelta(seconds=-1))
+        inventory.commit(committed)
+
+        self.assertEqual(inventory.release_expired(batch_size=1), 1)
+        self.assertEqual(self.stock(self.first), 4)
+        self.assertEqual(self.stock(self.second), 4)
+        statuses = dict(StockReservation.objects.values_list("token", "status"))
+        self.assertEqual(statuses[expired], StockReservation.EXPIRED)
+        self.assertEqual(statuses[held], StockReservation.HELD)
+        self.assertEqual(statuses[committed], StockReservation.COMMITTED)
+
+    def test_adjust_stock_never_goes_negative(self):
+        inventory.adjust_stock(self.first.pk, -10)
+        self.assertEqual(self.stock(self.first), 0)
+
+    def admin_post(self, variant, displayed, entered):
+        data = {
+            "product": variant.product_id,
+            "size": variant.size_id,
+            "size_display": variant.size_display,
+            "stock": entered,
+            "initial-stock": displayed,
+            "price_adjustment": variant.price_adjustment,
+            "is_active": "on",
+        }
+        # As the admin does on POST: the instance is fetched again.
+        form = ProductVariantInlineForm(data, instance=ProductVariant.objects.get(pk=variant.pk))
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+
+    def test_admin_edit_keeps_reservations_made_while_the_form_was_open(self):
+        inventory.reserve({self.first.pk: 2})  # after the form showed 5
+        self.admin_post(self.first, displayed=5, entered=15)
+        self.assertEqual(self.stock(self.first), 13)
+
+    def test_admin_save_without_stock_change_keeps_reservations(self):
+        inventory.reserve({self.first.pk: 4})
+        self.admin_post(self.first, displayed=5, entered=5)
+        self.assertEqual(self.stock(self.first), 1)
+
+
+class FacetMaintenanceTests(CatalogTestCase):
+    def counts(self):
+        return set(
+            FacetCount.objects.filter(count__gt=0).values_list("scope_type", "scope_id", "facet", "value", "label", "count")
+        )
+
+    def assert_matches_rebuild(self):
+        maintained = self.counts()
+        facets.rebuild_facets()
+        self.assertEqual(maintained, self.counts())
+
+    def test_seeded_counts_match_a_rebuild(self):
+        self.assert_matches_rebuild()
+
+    def test_product_edits_move_counts(self):
+        products = list(Product.objects.filter(is_active=True).order_by("id")[:5])
+        other_sub = SubCategory.objects.filter(main_category=self.main).exclude(pk=self.sub.pk).first()
+        other_brand = Brand.objects.exclude(pk=products[1].brand_id).first()
+
+        products[0].base_price, products[0].sale_price = Decimal("7000"), None
+        products[1].brand = other_brand
+        products[2].product_subcategory, products[2].product_category = other_sub, None
+        products[3].is_active = False
+        products[4].color = "Olive"
+        for product in products:
+            product.save()
+        Product.objects.filter(is_active=True).exclude(pk__in=[p.pk for p in products]).first().delete()
+        self.assert_matches_rebuild()
+
+        products[3].is_active = True
+        products[3].save()
+        self.assert_matches_rebuild()
+
+    def test_brand_rename_and_deactivation(self):
+        brand = Product.objects.filter(is_active=True, brand__isnull=False).first().brand
+        brand.brand_name = "Renamed"
+        brand.save()
+        self.assertTrue(FacetCount.objects.filter(facet="brand", value=str(brand.pk), label="Renamed").exists())
+        self.assert_matches_rebuild()
+
+        brand.is_active = False
+        brand.save()
+        self.assertFalse(FacetCount.objects.filter(facet="brand", value=str(brand.pk)).exists())
+        self.assert_matches_rebuild()
+
+
+class SkuTests(CatalogTestCase):
+    def test_allocate_hands_out_consecutive_blocks(self):
+        self.assertEqual(list(skus.allocate("TST", 3)), [1, 2, 3])
+        self.assertEqual(list(skus.allocate("TST", 2)), [4, 5])
+        self.assertEqual(list(skus.allocate("TST", 0)), [])
+        self.assertEqual(list(skus.allocate("OTH")), [1])
+        self.assertEqual(SkuSequence.objects.get(prefix="TST").last_value, 5)
+
+    def test_assigned_skus_are_unique_and_keep_existing_ones(self):
+        products = list(Product.objects.order_by("id")[:6])
+        kept = products[0].sku
+        for product in products[1:]:
+            product.sku = ""
+        skus.assign_product_skus(products)
+        self.assertEqual(products[0].sku, kept)
+        new = [product.sku for product in products[1:]]
+        self.assertEqual(len(set(new)), len(new))
+        for product in products[1:]:
+            self.assertRegex(product.sku, rf"^{re.escape(skus.product_prefix(product))}-\d{{5}}$")
+        self.assertFalse(Product.objects.filter(sku__in=new).exists())
+
+    def test_variant_skus_extend_the_product_sku(self):
+        variants = list(ProductVariant.objects.select_related("product", "size").order_by("id")[:4])
+        for variant in variants:
+            variant.sku = ""
+        skus.assign_variant_skus(variants)
+        self.assertEqual(len({variant.sku for variant in variants}), len(variants))
+        for variant in variants:
+            self.assertTrue(variant.sku.startswith(f"{variant.product.sku}-{skus.size_code(variant.size)}-"))
+
+
+class PageCacheTests(CatalogTestCase):
+    def get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def save(self, product):
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+    def test_unchanged_pages_revalidate_with_304(self):
+        for url in ("/store/", f"/store/{self.main.slug}/", "/api/products/"):
+            with self.subTest(url=url):
+                response = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("no-cache", response["Cache-Control"])
+                self.assertEqual(self.get(url, if_none_match=response["ETag"]).status_code, 304)
+
+    def test_etag_depends_on_the_path(self):
+        # Same versions and parameters: the full listing and its first fragment.
+        listing, fragment = self.get("/store/"), self.get("/store/cards/")
+        self.assertNotEqual(listing["ETag"], fragment["ETag"])
+        self.assertEqual(self.get("/store/cards/", if_none_match=listing["ETag"]).status_code, 200)
+
+    def test_last_modified_waits_until_its_second_is_over(self):
+        now = 1_800_000_000
+        with mock.patch("core.versioning.time.time_ns", return_value=now * 10**9 + 200_000_000):
+            with mock.patch("core.pagecache.time.time", return_value=now + 0.5):
+                response = self.get("/store/")
+                self.assertNotIn("Last-Modified", response)
+                # A change later in this second would carry the same date.
+                self.assertEqual(self.get("/store/", if_modified_since=http_date(now)).status_code, 200)
+            with mock.patch("core.pagecache.time.time", return_value=now + 1.5):
+                response = self.get("/store/")
+                self.assertEqual(response["Last-Modified"], http_date(now))
+                self.assertEqual(self.get("/store/", if_modified_since=response["Last-Modified"]).status_code, 304)
+
+    def test_product_edits_invalidate_the_pages_showing_it(self):
+        product = Product.objects.filter(product_subcategory=self.sub, is_active=True).order_by("-created_on", "-id").first()
+        urls = ["/store/", f"/store/{self.main.slug}/{self.sub.slug}/", f"/store/product/{product.slug}/"]
+        etags = {url: self.get(url)["ETag"] for url in urls}
+        unrelated = SubCategory.objects.filter(main_category=self.main).exclude(pk=self.sub.pk).first()
+        unrelated_url = f"/store/{self.main.slug}/{unrelated.slug}/"
+        unrelated_etag = self.get(unrelated_url)["ETag"]
+
+        product.product_name = "Freshly Renamed Shirt"
+        self.save(product)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.get(url, if_none_match=etags[url])
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("Freshly Renamed Shirt", response.content.decode())
+        self.assertEqual(self.get(unrelated_url, if_none_match=unrelated_etag).status_code, 304)
+
+    def test_cached_page_is_served_until_invalidated(self):
+        product = Product.objects.filter(is_active=True).order_by("-created_on", "-id").first()
+        self.get("/store/")
+        Product.objects.filter(pk=product.pk).update(product_name="Changed Behind The Cache")
+        self.assertNotIn("Changed Behind The Cache", self.get("/store/").content.decode())
+        self.save(Product.objects.get(pk=product.pk))
+        self.assertIn("Changed Behind The Cache", self.get("/store/").content.decode())
+
+
+class ViewCountBufferTests(CatalogTestCase):
+    def view_counts(self, products):
+        return dict(Product.objects.filter(pk__in=[p.pk for p in products]).values_list("pk", "view_count"))
+
+    def test_flush_adds_views_with_one_update_per_distinct_increment(self):
+        products = list(Product.objects.order_by("id")[:3])
+        before = self.view_counts(products)
+        buffer = ViewCountBuffer(flush_interval=3600, max_pending=100)
+        buffer.record(products[0].pk, views=2)
+        buffer.record(products[1].pk)
+        buffer.record(products[2].pk)
+        buffer.record(products[1].pk)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(buffer.flush(), 3)
+        # Two products gained 2 views and one gained 1: one UPDATE per increment.
+        self.assertEqual(sum(query["sql"].startswith("UPDATE") for query in queries), 2)
+        self.assertEqual(
+            self.view_counts(products),
+            {products[0].pk: before[products[0].pk] + 2, products[1].pk: before[products[1].pk] + 2,
+             products[2].pk: before[products[2].pk] + 1},
+        )
+        self.assertEqual(buffer.pending(), {})
+
+    def test_flushes_once_enough_products_are_waiting(self):
+        products = list(Product.objects.order_by("id")[:3])
+        before = self.view_counts(products)
+        buffer = ViewCountBuffer(flush_interval=3600, max_pending=3)
+        buffer.record(products[0].pk)
+        buffer.record(products[1].pk)
+        self.assertEqual(self.view_counts(products), before)
+        buffer.record(products[2].pk)
+        self.assertEqual(buffer.pending(), {})
+        self.assertEqual(self.view_counts(products), {pk: views + 1 for pk, views in before.items()})
+
+    def test_flushes_once_the_interval_has_passed(self):
+        product = Product.objects.order_by("id").first()
+        buffer = ViewCountBuffer(flush_interval=0)
+        buffer.record(product.pk)
+        self.assertEqual(buffer.pending(), {})
+
+    def test_clear_drops_pending_views(self):
+        product = Product.objects.order_by("id").first()
+        buffer = ViewCountBuffer(flush_interval=3600)
+        buffer.record(product.pk)
+        buffer.clear()
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_product_pages_record_views(self):
+        product = Product.objects.filter(is_active=True).first()
+        self.client.get(f"/store/product/{product.slug}/")
+        self.assertEqual(view_counts.pending(), {product.pk: 1})
+
+
+class ProductDetailTests(CatalogTestCase):
+    def test_queries_do_not_grow_with_sizes_or_images(self):
+        plain, busy = Product.objects.filter(is_active=True, size_group__isnull=False).order_by("id")[:2]
+        ProductVariant.objects.filter(product=plain).exclude(
+            pk=ProductVariant.objects.filter(product=plain).order_by("id").values("pk")[:1]
+        ).update(is_active=False)
+        ProductImage.objects.bulk_create([
+            ProductImage(product=busy, image=f"products/test-{number}.jpg", order=number) for number in range(4)
+        ])
+        Product.objects.filter(pk=busy.pk).refresh_primary_images()
+        self.assertLess(
+            ProductVariant.objects.filter(product=plain, is_active=True).count(),
+            ProductVariant.objects.filter(product=busy, is_active=True).count(),
+        )
+        self.client.get("/")  # warms the nav menu cache
+
+        for product in (plain, busy):
+            with self.subTest(product=product.slug):
+                # The slug lookup, then product_detail_queryset(): product,
+                # variants, sizes and images.
+                with self.assertNumQueries(5):
+                    response = self.client.get(f"/store/product/{product.slug}/")
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode().count("products/test-"), 4)
+
+    def test_size_edits_invalidate_product_pages(self):
+        product = Product.objects.filter(is_active=True, variants__size__isnull=False).first()
+        size = product.variants.filter(is_active=True).exclude(size=None).first().size
+        urls = [f"/store/product/{product.slug}/", f"/api/products/{product.slug}/?fields=sizes"]
+        etags = {url: self.client.get(url)["ETag"] for url in urls}
+
+        size.name = "XXXL-Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            size.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, headers={"if_none_match": etags[url]})
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("XXXL-Renamed", response.content.decode())
+
+        etags = {url: self.client.get(url)["ETag"] for url in urls}
+        with self.captureOnCommitCallbacks(execute=True):
+            Size.objects.get(pk=size.pk).delete()
+        for url in urls:
+            with self.subTest(url=url, deleted=True):
+                self.assertEqual(self.client.get(url, headers={"if_none_match": etags[url]}).status_code, 200)
+
+
+class ProductImageTests(CatalogTestCase):
+    def image(self):
+        return ProductImage(product=Product.objects.first(), image="products/images/upload.jpg")
+
+    def test_saving_an_image_queues_its_renditions(self):
+        with transaction.atomic():
+            self.image().save()
+            transaction.set_rollback(True)
+        self.assertFalse(Task.objects.filter(name=process_images.task_name).exists())
+
+        image = self.image()
+        image.save()
+        queued = Task.objects.get(name=process_images.task_name)
+        self.assertEqual((queued.args, queued.status), ([ProductImage._meta.label, image.pk], Task.QUEUED))
+
+    def test_eager_renditions_wait_for_the_commit(self):
+        run = mock.Mock()
+        with mock.patch("core.tasks.ALWAYS_EAGER", True), mock.patch.dict(tasks._registry, {process_images.task_name: run}):
+            with self.captureOnCommitCallbacks(execute=True):
+                image = self.image()
+                image.save()
+                run.assert_not_called()
+        run.assert_called_once_with(ProductImage._meta.label, image.pk)
+
+
+class ApiTests(CatalogTestCase):
+    def get_json(self, url, status=200):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def test_sparse_fields_load_only_their_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get_json("/api/products/?fields=name,id&limit=3")
+        self.assertEqual([set(result) for result in data["results"]], [{"id", "name"}] * 3)
+        listing = next(query["sql"] for query in queries if "ORDER BY" in query["sql"])
+        self.assertIn('"product_name"', listing)
+        for column in ('"description"', '"base_price"', "store_brand"):
+            self.assertNotIn(column, listing)
+
+    def test_bad_parameters_give_a_400(self):
+        slug = Product.objects.filter(is_active=True).first().slug
+        for url in ("/api/products/?fields=id,secret", "/api/products/?limit=ten", f"/api/products/{slug}/?fields=stock"):
+            with self.subTest(url=url):
+                self.assertIn("error", self.get_json(url, status=400))
+
+    def test_unknown_scope_gives_a_json_404(self):
+        for url in ("/api/products/?main_category=nope", f"/api/products/?main_category={self.main.slug}&sub_category=nope",
+                    "/api/products/?sub_category=topwear", "/api/facets/?main_category=nope"):
+            with self.subTest(url=url):
+                self.assertEqual(self.get_json(url, status=404), {"error": "No such category"})
+
+    def test_cursor_pages_cover_the_listing_once(self):
+        url = f"/api/products/?main_category={self.main.slug}&fields=id&limit=4"
+        page = self.get_json(url)
+        self.assertEqual(page["count"], Product.objects.filter(is_active=True, product_main_category=self.main).count())
+        self.assertIsNone(page["previous_cursor"])
+        ids = [result["id"] for result in page["results"]]
+        while page["next_cursor"]:
+            page = self.get_json(f"{url}&cursor={page['next_cursor']}")
+            self.assertNotIn("count", page)
+            self.assertIsNotNone(page["previous_cursor"])
+            ids += [result["id"] for result in page["results"]]
+        expected = Product.objects.filter(is_active=True, product_main_category=self.main).order_by("-created_on", "-id")
+        self.assertEqual(ids, list(expected.values_list("pk", flat=True)))
+
+    def test_detail_sizes(self):
+        product = Product.objects.filter(is_active=True, size_group__isnull=False).first()
+        variants = {variant.size_id: variant for variant in product.variants.filter(is_active=True)}
+        ProductVariant.objects.filter(pk=next(iter(variants.values())).pk).update(stock=0)
+        data = self.get_json(f"/api/products/{product.slug}/?fields=id,sizes")
+        self.assertEqual(set(data), {"id", "sizes"})
+        sizes = list(product.size_group.sizes.filter(is_active=True))
+        self.assertEqual([entry["size"] for entry in data["sizes"]], [size.name for size in sizes])
+        for entry, size in zip(data["sizes"], sizes):
+            variant = variants.get(size.pk)
+            with self.subTest(size=size.name):
+                self.assertEqual(entry["variant_id"], variant.pk if variant else None)
+                if variant:
+                    variant.refresh_from_db()
+                    self.assertEqual(entry["in_stock"], variant.stock > 0)
+                    self.assertEqual(entry["price"], str(product.current_price + variant.price_adjustment))
+        self.assertIn(False, [entry["in_stock"] for entry in data["sizes"]])
+
+
+class CatalogRoundTripTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def export(self, name):
+        path = os.path.join(self.directory, name)
+        call_command("export_catalog", path)
+        return path
+
+    def import_file(self, path):
+        stdout, stderr = StringIO(), StringIO()
+        call_command("import_catalog", path, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_unchanged_export_imports_as_updates_only(self):
+        path = self.export("catalog.jsonl")
+        total = Product.objects.count()
+        variants = ProductVariant.objects.count()
+        stdout, stderr = self.import_file(path)
+        self.assertIn(f"Products: 0 created, {total} updated, 0 skipped; 0 variants, 0 images.", stdout)
+        self.assertEqual(stderr, "")
+        self.assertEqual((Product.objects.count(), ProductVariant.objects.count()), (total, variants))
+
+    def test_csv_round_trip_creates_updates_and_skips(self):
+        path = self.export("catalog.csv")
+        with open(path, newline="", encoding="utf-8") as stream:
+            rows = list(csv.DictReader(stream))
+        total = len(rows)
+        edited, copied = rows[0], dict(rows[1])
+
+        # An edited price and one variant restocked through the SIZE:stock:adj string.
+        edited["base_price"], edited["sale_price"] = "1234.00", ""
+        size, _stock, _adjustment = edited["variants"].split(";")[0].split(":")
+        edited["variants"] = f"{size}:17:25.00"
+        # A row without a SKU is a new product.
+        copied.update(sku="", name="Imported Copy Tee", variants=f"{size}:3")
+        # And a row that cannot be imported.
+        broken = dict(rows[2], sku="", name="Broken Row", base_price="cheap")
+        rows += [copied, broken]
+        with open(path, "w", newline="", encoding="utf-8") as stream:
+            writer = csv.DictWriter(stream, fieldnames=rows[0].keys())
+            writer.writeheader()
+            writer.writerows(rows)
+
+        stdout, stderr = self.import_file(path)
+        # The restocked variant and the copy's one; the rest round-trip unchanged.
+        self.assertIn(f"Products: 1 created, {total} updated, 1 skipped; 2 variants, 0 images.", stdout)
+        self.assertEqual(stderr.strip(), f"line {total + 3}: base_price is not a number: 'cheap'")
+
+        product = Product.objects.get(sku=edited["sku"])
+        self.assertEqual((product.base_price, product.effective_price), (Decimal("1234.00"), Decimal("1234.00")))
+        variant = product.variants.get(size__name=size)
+        self.assertEqual((variant.stock, variant.price_adjustment), (17, Decimal("25.00")))
+
+        new = Product.objects.get(product_name="Imported Copy Tee")
+        self.assertTrue(new.sku and new.slug)
+        self.assertEqual(list(new.variants.values_list("size__name", "stock", "price_adjustment")), [(size, 3, Decimal("0"))])
+        self.assertFalse(Product.objects.filter(product_name="Broken Row").exists())
+
+
+class PrefixTrieTests(SimpleTestCase):
+    def trie(self, limit=2, **weights):
+        trie = PrefixTrie(limit=limit)
+        for label, weight in weights.items():
+            self.add(trie, label, weight)
+        return trie
+
+    def add(self, trie, label, weight):
+        label = label.replace("_", " ")
+        trie.add(label, {"label": label, "weight": weight}, phrases(label))
+
+    def labels(self, trie, prefix):
+        return [item["label"] for item in trie.search(prefix)]
+
+    def test_remove_refills_the_top_list_from_below(self):
+        trie = self.trie(shirt=3, shorts=2, shoes=1, boots=5)
+        self.assertEqual(self.labels(trie, "sh"), ["shirt", "shorts"])
+        trie.remove("shirt")
+        self.assertEqual(self.labels(trie, "sh"), ["shorts", "shoes"])
+        self.assertEqual(self.labels(trie, "s"), ["shorts", "shoes"])
+        self.assertEqual(self.labels(trie, ""), [])
+        self.assertEqual(self.labels(trie, "shi"), [])
+
+    def test_reweighting_moves_an_entry(self):
+        trie = self.trie(shirt=3, shorts=2, shoes=1)
+        self.add(trie, "shoes", 10)
+        self.assertEqual(self.labels(trie, "sh"), ["shoes", "shirt"])
+        self.add(trie, "shoes", 0)
+        self.assertEqual(self.labels(trie, "sh"), ["shirt", "shorts"])
+
+    def test_removing_everything_prunes_every_branch(self):
+        trie = self.trie(slim_fit_shirt=1, shirt=2)
+        trie.remove("slim fit shirt")
+        self.assertEqual(self.labels(trie, "fit"), [])
+        self.assertEqual(self.labels(trie, "sh"), ["shirt"])
+        trie.remove("shirt")
+        self.assertEqual(trie.root.children, {})
+        self.assertEqual(trie.root.top, [])
+
+    def test_queries_longer_than_the_trie(self):
+        long_name = "supercalifragilistic boots"
+        self.assertGreater(len(long_name), MAX_PREFIX_LENGTH)
+        trie = self.trie(limit=5, supercalifragilistic_boots=1, supercalifragilistic_belt=2, supercalifrag=3)
+        self.assertEqual(self.labels(trie, "supercalifragilistic b"), ["supercalifragilistic belt", long_name])
+        self.assertEqual(self.labels(trie, "supercalifragilistic bo"), [long_name])
+        self.assertEqual(self.labels(trie, "supercalifragilisticx"), [])
+        self.assertEqual(self.labels(trie, "supercalifrag"), ["supercalifrag", "supercalifragilistic belt", long_name])
+
+    def test_every_word_start_is_indexed(self):
+        trie = self.trie(limit=5, Seed_Brand_1_Relaxed_Trouser=1)
+        for prefix in ("seed", "brand 1", "relax", "trouser", "relaxed tr"):
+            with self.subTest(prefix=prefix):
+                self.assertEqual(self.labels(trie, prefix), ["Seed Brand 1 Relaxed Trouser"])
+        self.assertEqual(self.labels(trie, "trouser relaxed"), [])
@@ -3,6 +3,9 @@ from .views import *
 
 urlpatterns = [
     path("", store, name="store"),
+    path("suggest/", suggest, name="store_suggest"),
+    path("cards/", product_grid_page, name="product_grid_page"),
+    path("product/<slug:product_slug>/", product_detail, name="product_detail"),
     path("<slug:main_cat_slug>/", store, name="products_by_main_cat"),
     path("<slug:main_cat_slug>/<slug:sub_cat_slug>/",sub_category_store,name="product_by_sub_cat"),
 ]
@@ -1,39 +1,68 @@
+from urllib.parse import urlencode
+
+from django.db.models import Prefetch
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Min, Max, Q
-import re
-from .models import Product
+from django.urls import reverse
+from .models import Product, ProductVariant
+from .facets import get_facets
+from .filters import SORT_CHOICES, FilterSpec, filter_products
+from .listings import (
+    PRODUCT_ORDERING, listing_ordering, listing_params, listing_products, resolve_scope, scope_params, scope_version,
+)
+from .pagination import KeysetPaginator
+from .popularity import record_view
+from .search import search_products
+from .suggest import SUGGEST_LIMIT, get_suggestion_index
 from category.models import MainCategory, SubCategory, Category
-from store.models import Brand
+from core.navigation import get_menu_tree
+from core.pagecache import (
+    ALL_PRODUCTS_VERSION, SIZES_VERSION, cache_page_versions, main_category_version, product_version,
+    sub_category_version,
+)
 from design.models import MainCategoryBannerImage
+from sizemanager.models import Size
+
+PRODUCTS_PER_PAGE = 48
+
+
+def paginate_products(request, products, ordering=PRODUCT_ORDERING):
+    """Keyset-paginate a product listing on the ``cursor`` query parameter."""
+    paginator = KeysetPaginator(products, ordering, per_page=PRODUCTS_PER_PAGE)
+    return paginator.get_page(request.GET.get("cursor"))
 
 
-def normalize_color_name(value):
-    """Normalize color text for deduping/filtering (case, spaces, stray symbols)."""
-    if not value:
-        return ""
+def product_grid_url(page, filters, main_category=None, sub_category=None):
+    """URL of the product_grid_page fragment continuing a listing after ``page``, or None on the last page."""
+    if not page.has_next():
+        return None
+    params = [("main_category", main_category), ("sub_category", sub_category)]
+    params = [item for item in params if item[1]] + filters.query_items() + [("cursor", page.next_cursor)]
+    return f"{reverse('product_grid_page')}?{urlencode(params)}"
 
-    cleaned = re.sub(r"[^a-zA-Z0-9\s/&,+-]", " ", str(value)).lower()
-    parts = [
-        re.sub(r"\s+", " ", part).strip(" -_")
-        for part in re.split(r"\s*(?:and|&|/|,|\+)\s*", cleaned)
-        if part and part.strip(" -_")
-    ]
 
-    if not parts:
-        single = re.sub(r"\s+", " ", cleaned).strip(" -_")
-        return single
+def _menu_entry(entries, slug):
+    return next((entry for entry in entries if entry["slug"] == slug), None)
 
-    # Keep order while removing duplicates in multi-color names.
-    seen = set()
-    unique_parts = []
-    for part in parts:
-        if part not in seen:
-            seen.add(part)
-            unique_parts.append(part)
 
-    return " and ".join(unique_parts)
+def store_page_versions(request, main_cat_slug=None):
+    # Slugs are resolved through the cached menu tree, so a cache hit costs
+    # no queries. Unknown slugs 404 and are never cached.
+    if main_cat_slug is None:
+        return [ALL_PRODUCTS_VERSION]
+    main_cat = _menu_entry(get_menu_tree(), main_cat_slug)
+    return [main_category_version(main_cat["id"])] if main_cat else []
 
 
+def sub_category_page_versions(request, main_cat_slug, sub_cat_slug):
+    main_cat = _menu_entry(get_menu_tree(), main_cat_slug)
+    sub_cat = _menu_entry(main_cat["subcategories"], sub_cat_slug) if main_cat else None
+    if sub_cat is None:
+        return []
+    return [sub_category_version(sub_cat["id"])]
+
+
+@cache_page_versions(store_page_versions, listing_params)
 def store(request, main_cat_slug=None):
     """Main category and all products view with filters"""
     main_cat = None
@@ -42,12 +71,10 @@ def store(request, main_cat_slug=None):
     products = Product.objects.filter(is_active=True)
     
     # Get filter parameters
-    subcategory_slugs = request.GET.getlist('subcategory')
-    category_slugs = request.GET.getlist('category')
-    brand_ids = request.GET.getlist('brand')
-    price_range = request.GET.get('price_range')
-    colors = request.GET.getlist('color')
-    discount = request.GET.get('discount')
+    filters = FilterSpec.from_querydict(request.GET)
+    subcategory_slugs = filters.subcategories
+    category_slugs = filters.categories
+    search_query = filters.query
     
     # Filter by main category
     if main_cat_slug:
@@ -62,40 +89,21 @@ def store(request, main_cat_slug=None):
         ).select_related("banner__main_category").order_by("order")
 
     # Apply filters
-    if subcategory_slugs:
-        products = products.filter(product_subcategory__slug__in=subcategory_slugs)
-    
-    if category_slugs:
-        products = products.filter(product_category__slug__in=category_slugs)
-    
-    if brand_ids:
-        products = products.filter(brand_id__in=brand_ids)
-    
-    if price_range:
-        try:
-            min_price, max_price = price_range.split('-')
-            min_price = int(min_price)
-            max_price = int(max_price)
-            
-            products = products.filter(
-                Q(sale_price__gte=min_price, sale_price__lte=max_price) |
-                Q(sale_price__isnull=True, base_price__gte=min_price, base_price__lte=max_price)
-            )
-        except ValueError:
-            pass
-    
-    if colors:
-        products = products.filter(color__in=colors)
+    products = filter_products(products, filters)
+
+    if search_query:
+        products = search_products(products, search_query)
 
     # Build filter data
     filter_data = {}
     
     if main_cat:
         # Get subcategories
-        filter_data['subcategories'] = SubCategory.objects.filter(
+        subcategories = list(SubCategory.objects.filter(
             main_category=main_cat,
             is_active=True
-        ).order_by('order', 'name')
+        ).order_by('order', 'name'))
+        filter_data['subcategories'] = subcategories
 
         # Get categories (with dynamic filtering)
         categories_qs = Category.objects.filter(
@@ -103,70 +111,44 @@ def store(request, main_cat_slug=None):
             is_active=True
         )
 
-        # Get brands (with dynamic filtering)
-        brands_qs = Brand.objects.filter(
-            products__product_main_category=main_cat,
-            products__is_active=True,
-            is_active=True
-        )
-
         # Filter categories by selected subcategories
         if subcategory_slugs:
             categories_qs = categories_qs.filter(sub_category__slug__in=subcategory_slugs)
-            brands_qs = brands_qs.filter(products__product_subcategory__slug__in=subcategory_slugs)
 
-        # Filter brands by selected categories
-        if category_slugs:
-            brands_qs = brands_qs.filter(products__product_category__slug__in=category_slugs)
+        categories = list(categories_qs.select_related('sub_category').order_by('order', 'name'))
+        filter_data['categories'] = categories
 
-        filter_data['categories'] = categories_qs.select_related('sub_category').order_by('order', 'name')
-        filter_data['brands'] = brands_qs.distinct().order_by('brand_name')
-        
-        # Get available colors
-        filter_data['colors'] = Product.objects.filter(
-            product_main_category=main_cat,
-            is_active=True
-        ).values_list('color', flat=True).distinct().order_by('color')
-        
-        # Get price range
-        price_range_data = Product.objects.filter(
-            product_main_category=main_cat,
-            is_active=True
-        ).aggregate(
-            min_price=Min('base_price'),
-            max_price=Max('base_price')
-        )
-        filter_data['price_range'] = price_range_data
-    
-    # Apply prefetch/select for optimization
-    products = products.prefetch_related(
-        "product_images",
-        "variants"
-    ).select_related(
-        "brand",
-        "seller",
-        "product_main_category"
-    )
+        # Brand, color, price and discount counts for the narrowest selected scope
+        if category_slugs:
+            filter_data.update(get_facets("category", [c.pk for c in categories if c.slug in category_slugs]))
+        elif subcategory_slugs:
+            filter_data.update(get_facets("sub", [sc.pk for sc in subcategories if sc.slug in subcategory_slugs]))
+        else:
+            filter_data.update(get_facets("main", [main_cat.pk]))
+    else:
+        filter_data.update(get_facets())
     
-    # Build selected filters for template
-    selected_filters = {
-        "subcategory_slugs": subcategory_slugs,
-        "category_slugs": category_slugs,
-        "brand_ids": brand_ids,
-        "price_range": price_range,
-        "colors": colors,
-        "discount": discount,
-    }
+    total_count = products.count()
+
+    # Only what the product cards show (see store.cards); only the current page is fetched
+    products = products.select_related("brand", "primary_image")
+    page = paginate_products(request, products, listing_ordering(filters))
     
     return render(request, "store/store.html", {
-        "products": products,
+        "products": page,
+        "page": page,
+        "total_count": total_count,
         "main_cat": main_cat,
         "main_cat_banner_slides": main_cat_banner_slides,
         "filter_data": filter_data,
-        "selected_filters": selected_filters,
+        "filters": filters,
+        "selected_filters": filters.selected(),
+        "sort_choices": SORT_CHOICES,
+        "next_page_url": product_grid_url(page, filters, main_cat and main_cat.slug),
     })
 
 
+@cache_page_versions(sub_category_page_versions, listing_params)
 def sub_category_store(request, main_cat_slug, sub_cat_slug):
     """Subcategory view with filters"""
     # Get main category and subcategory
@@ -184,104 +166,132 @@ def sub_category_store(request, main_cat_slug, sub_cat_slug):
     )
     
     # Get filter parameters
-    category_slugs = request.GET.getlist('category')
-    brand_ids = request.GET.getlist('brand')
-    selected_color_keys = [normalize_color_name(c) for c in request.GET.getlist('color')]
-    selected_color_keys = [c for c in selected_color_keys if c]
-    price_range = request.GET.get('price_range')
-    discount = request.GET.get('discount')
+    filters = FilterSpec.from_querydict(request.GET)
+    category_slugs = filters.categories
     
     # Apply filters
-    if category_slugs:
-        products = products.filter(product_category__slug__in=category_slugs)
-    
-    if brand_ids:
-        products = products.filter(brand_id__in=brand_ids)
+    products = filter_products(products, filters)
 
-    # Build raw->normalized color mapping for this subcategory scope.
-    base_color_qs = Product.objects.filter(
-        product_subcategory=sub_cat,
-        is_active=True
-    )
-    if category_slugs:
-        base_color_qs = base_color_qs.filter(product_category__slug__in=category_slugs)
-
-    color_key_to_raw_values = {}
-    for raw_color in base_color_qs.values_list("color", flat=True):
-        color_key = normalize_color_name(raw_color)
-        if not color_key:
-            continue
-        color_key_to_raw_values.setdefault(color_key, set()).add(raw_color)
-
-    if selected_color_keys:
-        raw_values_to_filter = set()
-        for color_key in selected_color_keys:
-            raw_values_to_filter.update(color_key_to_raw_values.get(color_key, set()))
-        if raw_values_to_filter:
-            products = products.filter(color__in=raw_values_to_filter)
-    
-    if price_range:
-        try:
-            min_price, max_price = price_range.split('-')
-            min_price = int(min_price)
-            max_price = int(max_price)
-            
-            products = products.filter(
-                Q(sale_price__gte=min_price, sale_price__lte=max_price) |
-                Q(sale_price__isnull=True, base_price__gte=min_price, base_price__lte=max_price)
-            )
-        except ValueError:
-            pass
+    if filters.query:
+        products = search_products(products, filters.query)
     
     # Build filter data
     filter_data = {}
     
     # Get categories for this subcategory
-    filter_data['categories'] = Category.objects.filter(
+    categories = list(Category.objects.filter(
         sub_category=sub_cat,
         is_active=True
-    ).order_by('order', 'name')
-    
-    # Get brands (with dynamic filtering)
-    brands_qs = Brand.objects.filter(
-        products__product_subcategory=sub_cat,
-        products__is_active=True,
-        is_active=True
-    )
-    
-    # Filter brands by selected categories
+    ).order_by('order', 'name'))
+    filter_data['categories'] = categories
+
+    # Brand, color, price and discount counts for the selected categories or the whole subcategory
     if category_slugs:
-        brands_qs = brands_qs.filter(products__product_category__slug__in=category_slugs)
+        filter_data.update(get_facets("category", [c.pk for c in categories if c.slug in category_slugs]))
+    else:
+        filter_data.update(get_facets("sub", [sub_cat.pk]))
     
-    filter_data['brands'] = brands_qs.distinct().order_by('brand_name')
+    total_count = products.count()
 
-    # Deduped, normalized colors for filter UI.
-    filter_data['colors'] = sorted(color_key_to_raw_values.keys())
-    
-    # Apply prefetch/select for optimization
-    products = products.prefetch_related(
-        "product_images",
-        "variants"
-    ).select_related(
-        "brand",
-        "seller",
-        "product_main_category",
-        "product_subcategory"
-    )
-    
-    # Build selected filters for template
-    selected_filters = {
-        "category_slugs": category_slugs,
-        "brand_ids": brand_ids,
-        "colors": selected_color_keys,
-        "price_range": price_range,
-        "discount": discount,
-    }
+    # Only what the product cards show (see store.cards); only the current page is fetched
+    products = products.select_related("brand", "primary_image")
+    # The same ordering as product_grid_page, so its cursors carry over
+    page = paginate_products(request, products, listing_ordering(filters))
     
     return render(request, "store/sub_cat_page.html", {
         "main_cat": main_cat,
         "sub_cat": sub_cat,
-        "products": products,
+        "products": page,
+        "page": page,
+        "total_count": total_count,
         "filter_data": filter_data,
-        "selected_filters": selected_filters,
+        "filters": filters,
+        "selected_filters": filters.selected(),
+        "sort_choices": SORT_CHOICES,
+        "next_page_url": product_grid_url(page, filters, main_cat.slug, sub_cat.slug),
+    })
+
+
+def product_grid_page_versions(request):
+    return [scope_version(*resolve_scope(request.GET))]
+
+
+def product_grid_page_params(request):
+    return scope_params(*resolve_scope(request.GET)) + listing_params(request)
+
+
+@cache_page_versions(product_grid_page_versions, product_grid_page_params)
+def product_grid_page(request):
+    """
+    The next page of product cards for infinite scroll, as an HTML fragment.
+
+    Takes the listing's filters and cursor plus its ``main_category`` /
+    ``sub_category`` slugs, and renders only the cards (from the card
+    cache) and a marker with the URL of the page after; no facets, banners
+    or menu, and no count.
+    """
+    main, sub = resolve_scope(request.GET)
+    filters = FilterSpec.from_querydict(request.GET)
+    products = listing_products(main, sub, filters).select_related("brand", "primary_image")
+    page = paginate_products(request, products, listing_ordering(filters))
+    return render(request, "store/partials/product_grid_page.html", {
+        "products": page,
+        "next_page_url": product_grid_url(
+            page, filters, main and main["slug"], sub and sub["slug"]
+        ),
     })
+
+
+def product_detail_queryset():
+    """
+    Active products with everything the detail page shows, in four queries
+    whatever the number of sizes or images: the product with its brand,
+    seller, categories, size group and primary image; its active variants with their sizes;
+    the group's active sizes; and its images.
+    """
+    return Product.objects.filter(is_active=True).select_related(
+        "brand", "seller", "product_main_category", "product_subcategory", "product_category", "size_group",
+        "primary_image",
+    ).prefetch_related(
+        Prefetch(
+            "variants",
+            queryset=ProductVariant.objects.filter(is_active=True).select_related("size").order_by("size__order", "size__name"),
+            to_attr="active_variants",
+        ),
+        Prefetch("size_group__sizes", queryset=Size.objects.filter(is_active=True), to_attr="active_sizes"),
+        "product_images",
+    )
+
+
+def product_detail(request, product_slug):
+    """Product page: sizes with their price and availability, images and brand"""
+    # Looked up on every request, cached or not, so views are counted and the
+    # cached page is keyed on the product rather than on a slug it may lose.
+    product_id = Product.objects.filter(slug=product_slug, is_active=True).values_list("pk", flat=True).first()
+    if product_id is None:
+        raise Http404("No such product")
+    record_view(product_id)
+    return product_page(request, product_slug, product_id)
+
+
+@cache_page_versions(lambda request, product_slug, product_id: [product_version(product_id), SIZES_VERSION])
+def product_page(request, product_slug, product_id):
+    product = get_object_or_404(product_detail_queryset(), pk=product_id)
+    size_options = product.get_size_options()
+    return render(request, "store/product_detail.html", {
+        "product": product,
+        "images": product.product_images.all(),
+        "size_options": size_options,
+        "in_stock": any(option["in_stock"] for option in size_options),
+    })
+
+
+def suggest(request):
+    """Search-as-you-type suggestions for the header search box, served from memory."""
+    query = request.GET.get("q", "").strip()
+    try:
+        limit = min(max(int(request.GET.get("limit", SUGGEST_LIMIT)), 1), 20)
+    except ValueError:
+        limit = SUGGEST_LIMIT
+    suggestions = get_suggestion_index().search(query, limit) if query else []
+    return JsonResponse({"query": query, "suggestions": suggestions})
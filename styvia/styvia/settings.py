@@ -57,12 +57,18 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # After the auth middleware, so ?profile=1 is checked against
+    # request.user before anything is instrumented; inactive unless
+    # PROFILING_ENABLED is set below.
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'styvia.urls'
 
+# With no explicit 'loaders', Django wraps the app-directories loader in
+# its cached loader, so templates are compiled once per process.
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -95,6 +101,29 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Cached content is invalidated through version keys bumped by model signals
+# (see core/versioning.py), so production needs a cache shared by all workers
+# (Redis/Memcached) rather than the per-process local-memory default.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'styvia',
+    }
+}
+
+
+# Request profiling (see core/profiling.py)
+# Sampled requests report query counts, DB and template time per URL name
+# under Core > Request profiles in the admin; staff can profile a single
+# page with ?profile=1 and read its Server-Timing header in dev tools.
+
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 0.05
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
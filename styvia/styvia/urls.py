@@ -21,5 +21,6 @@ from django.conf.urls.static import static
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("", include("core.urls")),
-    path("store/", include("store.urls"))
+    path("store/", include("store.urls")),
+    path("api/", include("store.api_urls")),
 ]+static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -473,3 +473,171 @@
     desktopMedia.addEventListener("change", syncResponsiveState);
     syncResponsiveState();
 })();
+
+(() => {
+    const forms = document.querySelectorAll("form[data-suggest-url]");
+    if (!forms.length) return;
+
+    const DEBOUNCE_MS = 120;
+
+    forms.forEach((form) => {
+        const input = form.querySelector('input[name="q"]');
+        if (!input) return;
+
+        const list = document.createElement("ul");
+        list.className = "absolute left-0 right-0 top-full mt-1 z-50 hidden bg-white border border-gray-200 rounded-md shadow-md text-sm text-text-main-light overflow-hidden";
+        list.setAttribute("role", "listbox");
+        form.appendChild(list);
+
+        const cache = new Map();
+        let timer = null;
+        let controller = null;
+        let activeIndex = -1;
+
+        const hide = () => {
+            list.classList.add("hidden");
+            activeIndex = -1;
+        };
+
+        const render = (suggestions) => {
+            list.innerHTML = "";
+            activeIndex = -1;
+            if (!suggestions.length) {
+                hide();
+                return;
+            }
+            suggestions.forEach((suggestion) => {
+                const item = document.createElement("li");
+                const link = document.createElement("a");
+                link.href = suggestion.url;
+                link.className = "flex items-center justify-between gap-3 px-4 py-2 hover:bg-gray-100";
+                link.setAttribute("role", "option");
+
+                const label = document.createElement("span");
+                label.textContent = suggestion.label;
+                const kind = document.createElement("span");
+                kind.className = "text-xs text-gray-400 capitalize";
+                kind.textContent = suggestion.kind;
+
+                link.append(label, kind);
+                item.appendChild(link);
+                list.appendChild(item);
+            });
+            list.classList.remove("hidden");
+        };
+
+        const highlight = (index) => {
+            const links = list.querySelectorAll("a");
+            if (!links.length) return;
+            activeIndex = (index + links.length) % links.length;
+            links.forEach((link, position) => link.classList.toggle("bg-gray-100", position === activeIndex));
+        };
+
+        const fetchSuggestions = async (query) => {
+            if (cache.has(query)) {
+                render(cache.get(query));
+                return;
+            }
+            controller?.abort();
+            controller = new AbortController();
+            try {
+                const url = `${form.dataset.suggestUrl}?q=${encodeURIComponent(query)}`;
+                const response = await fetch(url, { signal: controller.signal });
+                if (!response.ok) return;
+                const data = await response.json();
+                cache.set(query, data.suggestions);
+                if (input.value.trim() === query) render(data.suggestions);
+            } catch (error) {
+                if (error.name !== "AbortError") hide();
+            }
+        };
+
+        input.addEventListener("input", () => {
+            clearTimeout(timer);
+            const query = input.value.trim();
+            if (!query) {
+                hide();
+                return;
+            }
+            timer = setTimeout(() => fetchSuggestions(query), DEBOUNCE_MS);
+        });
+
+        input.addEventListener("keydown", (event) => {
+            if (list.classList.contains("hidden")) return;
+            if (event.key === "ArrowDown" || event.key === "ArrowUp") {
+                event.preventDefault();
+                highlight(activeIndex + (event.key === "ArrowDown" ? 1 : -1));
+            } else if (event.key === "Enter" && activeIndex >= 0) {
+                event.preventDefault();
+                window.location.href = list.querySelectorAll("a")[activeIndex].href;
+            } else if (event.key === "Escape") {
+                hide();
+            }
+        });
+
+        input.addEventListener("blur", () => setTimeout(hide, 150));
+    });
+})();
+
+(() => {
+    const grid = document.querySelector("[data-product-grid][data-next-page-url]");
+    if (!grid || !("IntersectionObserver" in window)) return;
+
+    const pagination = document.querySelector("[data-product-pagination]");
+    const nextLink = pagination?.querySelector('[rel="next"]');
+    let nextUrl = grid.dataset.nextPageUrl;
+    let loading = false;
+
+    // Scrolling replaces "Next"; keep "Previous" when the page was opened mid-listing.
+    const showPagination = (visible) => {
+        if (!pagination) return;
+        const hasPrevious = pagination.querySelector('[rel="prev"]');
+        pagination.classList.toggle("hidden", !visible && !hasPrevious);
+        nextLink?.classList.toggle("hidden", !visible);
+    };
+
+    const sentinel = document.createElement("div");
+    sentinel.setAttribute("aria-hidden", "true");
+    grid.after(sentinel);
+
+    const loadMore = async () => {
+        if (loading || !nextUrl) return;
+        loading = true;
+        try {
+            const response = await fetch(nextUrl);
+            if (!response.ok) throw new Error(`${response.status}`);
+            const fragment = document.createElement("template");
+            fragment.innerHTML = await response.text();
+            const marker = fragment.content.querySelector("[data-next-page-url]");
+            nextUrl = marker ? marker.dataset.nextPageUrl : null;
+            marker?.remove();
+            grid.appendChild(fragment.content);
+        } catch (error) {
+            // Leave the rest to the pagination links.
+            nextUrl = null;
+            showPagination(true);
+        } finally {
+            loading = false;
+        }
+
+        if (!nextUrl) {
+            observer.disconnect();
+            sentinel.remove();
+            return;
+        }
+        // Observing again reports whether the sentinel is still in range,
+        // e.g. on tall screens where one batch does not fill the viewport.
+        observer.unobserve(sentinel);
+        observer.observe(sentinel);
+    };
+
+    const observer = new IntersectionObserver(
+        (entries) => {
+            if (entries.some((entry) => entry.isIntersecting)) loadMore();
+        },
+        { rootMargin: "0px 0px 800px 0px" }
+    );
+
+    showPagination(false);
+    observer.observe(sentinel);
+})();